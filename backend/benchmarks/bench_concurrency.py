@@ -0,0 +1,175 @@
+"""
+Конкурентное оформление заказов на заполненной базе (см. src.db.seed).
+
+N параллельных писателей оформляют заказы через OrderPlacement на небольшом
+наборе "горячих" пар продукт/склад, чтобы заказы боролись за одни и те же партии.
+Замеряется пропускная способность, латентность, число повторов из-за конфликтов
+версий, после прогона проверяется корректность: ни одна партия не ушла в минус,
+а в order_list_items записано ровно то, что заказали успешные заказы.
+
+Запуск из каталога backend:
+    python -m src.db.seed --scale small --reset
+    python -m benchmarks.bench_concurrency --writers 100 --orders 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import delete, func, select
+
+from src.core.db_config import async_session, engine
+from src.db.allocation import InsufficientStockError
+from src.db.db_service import VersionConflictError, products_service
+from src.db.models import Customer, OrderListItems, Orders, SupplyListItems, WriteOffsList
+from src.db.order_placement import order_placement, order_placement_conflicts_total
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def pick_hot_keys(count: int) -> List[Tuple[int, int]]:
+    """Пары продукт/склад с остатком — за них и будут бороться писатели"""
+    async with async_session() as db:
+        stock = await products_service.get_stock(db)
+    stock = [row for row in stock if (row["remaining"] or 0) > 0 and row["warehouse_id"] is not None]
+    stock.sort(key=lambda row: row["remaining"], reverse=True)
+    return [(row["id_products"], row["warehouse_id"]) for row in stock[:count]]
+
+
+async def writer(
+    writer_id: int,
+    orders: int,
+    keys: List[Tuple[int, int]],
+    customer_id: int,
+    max_amount: int,
+    stats: Dict[str, Any],
+    seed: int,
+) -> None:
+    rnd = random.Random(seed + writer_id)
+    for _ in range(orders):
+        lines = [
+            {"id_products": product, "id_warehous": warehouse, "amount": rnd.randint(1, max_amount),
+             "price_with_discount": None}
+            for product, warehouse in rnd.sample(keys, k=min(2, len(keys)))
+        ]
+        started = time.perf_counter()
+        async with async_session() as db:
+            try:
+                order, items = await order_placement.place(
+                    db, {"id_customer": customer_id, "comments": "bench_concurrency"}, lines
+                )
+            except InsufficientStockError:
+                stats["insufficient"] += 1
+                continue
+            except VersionConflictError:
+                stats["exhausted"] += 1
+                continue
+        stats["latencies"].append((time.perf_counter() - started) * 1000)
+        stats["orders"].append(order.id_orders)
+        stats["requested"] += sum(line["amount"] for line in lines)
+
+
+async def check_consistency(order_ids: List[int], requested: int, keys: List[Tuple[int, int]]) -> List[str]:
+    """Проверить, что остатки не ушли в минус и записано ровно заказанное"""
+    problems = []
+    async with async_session() as db:
+        written = 0
+        for i in range(0, len(order_ids), 500):
+            chunk = order_ids[i:i + 500]
+            written += (await db.execute(
+                select(func.coalesce(func.sum(OrderListItems.amount), 0))
+                .where(OrderListItems.id_orders.in_(chunk))
+            )).scalar()
+        if written != requested:
+            problems.append(f"записано {written} шт., заказано {requested} шт.")
+
+        sold = select(func.coalesce(func.sum(OrderListItems.amount), 0)).where(
+            OrderListItems.id_supply_list_items == SupplyListItems.id_supply_list_items
+        ).scalar_subquery()
+        written_off = select(func.coalesce(func.sum(WriteOffsList.amount), 0)).where(
+            WriteOffsList.id_supply_list_items == SupplyListItems.id_supply_list_items
+        ).scalar_subquery()
+        remaining = func.coalesce(SupplyListItems.amount, 0) - sold - written_off
+        for product, warehouse in keys:
+            oversold = (await db.execute(
+                select(func.count()).select_from(SupplyListItems).where(
+                    SupplyListItems.id_products == product,
+                    SupplyListItems.id_warehous == warehouse,
+                    remaining < 0
+                )
+            )).scalar()
+            if oversold:
+                problems.append(f"продукт {product} на складе {warehouse}: {oversold} партий в минусе")
+    return problems
+
+
+async def cleanup(order_ids: List[int]) -> None:
+    async with async_session() as db:
+        for i in range(0, len(order_ids), 500):
+            chunk = order_ids[i:i + 500]
+            await db.execute(delete(OrderListItems).where(OrderListItems.id_orders.in_(chunk)))
+            await db.execute(delete(Orders).where(Orders.id_orders.in_(chunk)))
+        await db.commit()
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=100)
+    parser.add_argument("--orders", type=int, default=5, help="заказов на писателя")
+    parser.add_argument("--hot-keys", type=int, default=5, help="число пар продукт/склад под нагрузкой")
+    parser.add_argument("--max-amount", type=int, default=3, help="максимум штук в позиции")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="не удалять созданные заказы")
+    args = parser.parse_args()
+
+    try:
+        keys = await pick_hot_keys(args.hot_keys)
+        if not keys:
+            print("Нет остатков: заполните базу (python -m src.db.seed)", file=sys.stderr)
+            return 1
+        async with async_session() as db:
+            customer_id = (await db.execute(select(func.min(Customer.id_customer)))).scalar()
+
+        stats: Dict[str, Any] = {"latencies": [], "orders": [], "requested": 0, "insufficient": 0, "exhausted": 0}
+        conflicts_before = order_placement_conflicts_total.get()
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            writer(i, args.orders, keys, customer_id, args.max_amount, stats, args.seed)
+            for i in range(args.writers)
+        ))
+        elapsed = time.perf_counter() - started
+        conflicts = order_placement_conflicts_total.get() - conflicts_before
+
+        placed = len(stats["orders"])
+        attempted = args.writers * args.orders
+        print(f"диалект {engine.dialect.name}, писателей {args.writers}, горячих пар {len(keys)}")
+        print(f"заказов оформлено {placed}/{attempted} за {elapsed:.2f} с ({placed / elapsed:.1f} заказов/с)")
+        print(f"не хватило остатка {stats['insufficient']}, исчерпаны повторы {stats['exhausted']}, "
+              f"повторов из-за конфликтов {conflicts:.0f}")
+        if stats["latencies"]:
+            latencies = stats["latencies"]
+            print(f"латентность p50 {_percentile(latencies, 50):.1f}  p95 {_percentile(latencies, 95):.1f}  "
+                  f"p99 {_percentile(latencies, 99):.1f}  mean {statistics.fmean(latencies):.1f} ms")
+
+        problems = await check_consistency(stats["orders"], stats["requested"], keys)
+        for problem in problems:
+            print(f"НАРУШЕНИЕ {problem}", file=sys.stderr)
+        if not problems:
+            print("проверка согласованности пройдена: перепродаж нет")
+
+        if not args.keep:
+            await cleanup(stats["orders"])
+    finally:
+        await engine.dispose()
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,104 @@
+"""
+Бенчмарк сериализации: 50k строк order_list_items.
+
+Сравнивает стандартный путь FastAPI (jsonable_encoder + json.dumps)
+с orjson-ответом и стратегиями Decimal, плюс размер ответа после сжатия.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_serialization [--rows 50000] [--repeat 5]
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from decimal import Decimal
+from typing import Callable, List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from src.api.responses import make_default
+from src.db.db_service import model_to_dict
+from src.db.models import OrderListItems
+from src.db.schemas import OrderListItemsRead
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_rows(count: int) -> List[OrderListItems]:
+    """Сгенерировать строки заказов в памяти (без БД)"""
+    rnd = random.Random(42)
+    return [
+        OrderListItems(
+            id_order_list_items=i,
+            amount=rnd.randint(1, 50),
+            price_with_discount=Decimal(rnd.randint(100, 500000)) / Decimal(100),
+            id_orders=i // 10 + 1,
+            id_supply_list_items=rnd.randint(1, 100000),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(func: Callable[[], bytes], repeat: int) -> tuple:
+    best = float("inf")
+    payload = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = func()
+        best = min(best, time.perf_counter() - started)
+    return best, payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    str_default = make_default("str")
+    fixed_default = make_default("fixed")
+    adapter = TypeAdapter(List[OrderListItemsRead])
+
+    cases = {
+        # Стандартный путь FastAPI с response_model: валидация схемой + jsonable_encoder
+        "fastapi response_model": lambda: json.dumps(
+            jsonable_encoder([OrderListItemsRead.model_validate(row) for row in rows])
+        ).encode(),
+        "jsonable_encoder + json": lambda: json.dumps(
+            jsonable_encoder([model_to_dict(row) for row in rows])
+        ).encode(),
+        "pydantic TypeAdapter.dump_json": lambda: adapter.dump_json(
+            adapter.validate_python(rows, from_attributes=True)
+        ),
+        "orjson, Decimal str": lambda: orjson.dumps([model_to_dict(row) for row in rows], default=str_default),
+        "orjson, Decimal fixed": lambda: orjson.dumps([model_to_dict(row) for row in rows], default=fixed_default),
+    }
+
+    print(f"rows={args.rows} repeat={args.repeat} (лучшее время)")
+    baseline = None
+    payload = b""
+    for name, func in cases.items():
+        elapsed, payload = measure(func, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:32s} {elapsed * 1000:9.1f} ms  x{baseline / elapsed:5.1f}  {len(payload) / 1024:9.1f} KiB")
+
+    print()
+    print(f"{'без сжатия':32s} {len(payload) / 1024:9.1f} KiB")
+    started = time.perf_counter()
+    gzipped = gzip.compress(payload, compresslevel=6)
+    print(f"{'gzip level 6':32s} {len(gzipped) / 1024:9.1f} KiB  {(time.perf_counter() - started) * 1000:7.1f} ms")
+    if brotli is not None:
+        started = time.perf_counter()
+        compressed = brotli.compress(payload, quality=4)
+        print(f"{'brotli quality 4':32s} {len(compressed) / 1024:9.1f} KiB  {(time.perf_counter() - started) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
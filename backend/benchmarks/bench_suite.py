@@ -0,0 +1,236 @@
+"""
+Набор бенчмарков сервисного слоя на заполненной базе (см. src.db.seed).
+
+Для каждого сценария замеряет латентность (p50/p95/p99) и число SQL-запросов
+на вызов. Результат сохраняется в JSON и сравнивается с базовой линией, чтобы
+регрессии были видны в ревью.
+
+Запуск из каталога backend:
+    python -m src.db.seed --scale small --reset
+    python -m benchmarks.bench_suite --iterations 200 --save benchmarks/baseline.json
+    python -m benchmarks.bench_suite --compare benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.db_config import async_session, engine
+from src.core.profiling import install_query_hooks, profile_block
+from src.db.db_service import *
+from src.db.dashboard import dashboard
+from src.db.pricing import pricing_engine
+from src.db.query_cache import query_cache
+
+BenchCase = Callable[[AsyncSession, "BenchContext"], Awaitable[Any]]
+
+CASES: Dict[str, BenchCase] = {}
+
+
+def bench_case(name: str):
+    """Зарегистрировать сценарий бенчмарка"""
+    def decorator(func: BenchCase) -> BenchCase:
+        CASES[name] = func
+        return func
+    return decorator
+
+
+class BenchContext:
+    """Случайные, но воспроизводимые идентификаторы существующих записей"""
+
+    def __init__(self, seed: int):
+        self.rnd = random.Random(seed)
+        self.max_ids: Dict[str, int] = {}
+
+    async def load(self, db: AsyncSession) -> None:
+        for model in (Customer, Products, Orders, Warehouse, ProductCategory):
+            primary_key = model.__table__.primary_key.columns.values()[0]
+            self.max_ids[model.__tablename__] = (await db.execute(select(func.max(primary_key)))).scalar() or 0
+
+    def random_id(self, table: str) -> int:
+        return self.rnd.randint(1, max(self.max_ids[table], 1))
+
+
+@bench_case("crud.create_update_delete")
+async def _crud(db: AsyncSession, ctx: BenchContext):
+    product = await products_service.create(db, {"products_name": "bench", "id_product_category": 1})
+    await products_service.update(db, product.id_products, {"prod_description": "bench"})
+    await products_service.delete(db, product.id_products)
+
+
+@bench_case("crud.get")
+async def _get(db: AsyncSession, ctx: BenchContext):
+    await customer_service.get(db, ctx.random_id("customer"))
+
+
+@bench_case("list.orders_first_page")
+async def _orders_first_page(db: AsyncSession, ctx: BenchContext):
+    await orders_service.get_all(db, skip=0, limit=100)
+
+
+@bench_case("list.orders_deep_page")
+async def _orders_deep_page(db: AsyncSession, ctx: BenchContext):
+    await orders_service.get_all(db, skip=max(ctx.max_ids["orders"] - 200, 0), limit=100)
+
+
+@bench_case("orders.get_order_with_items")
+async def _order_with_items(db: AsyncSession, ctx: BenchContext):
+    await orders_service.get_order_with_items(db, ctx.random_id("orders"))
+
+
+@bench_case("orders.get_customer_orders")
+async def _customer_orders(db: AsyncSession, ctx: BenchContext):
+    await orders_service.get_customer_orders(db, ctx.random_id("customer"))
+
+
+@bench_case("customers.summary")
+async def _customer_summary(db: AsyncSession, ctx: BenchContext):
+    await customer_service.get_summary(db, ctx.random_id("customer"))
+
+
+@bench_case("customers.summary_page")
+async def _customer_summary_page(db: AsyncSession, ctx: BenchContext):
+    await customer_service.get_summaries(db, skip=0, limit=50)
+
+
+@bench_case("products.get_with_price")
+async def _with_price(db: AsyncSession, ctx: BenchContext):
+    await products_service.get_with_price(db, ctx.random_id("products"))
+
+
+@bench_case("products.get_by_category")
+async def _by_category(db: AsyncSession, ctx: BenchContext):
+    await products_service.get_by_category(db, ctx.random_id("product_category"))
+
+
+@bench_case("report.price_list")
+async def _price_list(db: AsyncSession, ctx: BenchContext):
+    await products_service.get_price_list(db)
+
+
+@bench_case("report.stock_by_warehouse")
+async def _stock(db: AsyncSession, ctx: BenchContext):
+    await products_service.get_stock(db, ctx.random_id("warehouse"))
+
+
+@bench_case("report.dashboard")
+async def _dashboard(db: AsyncSession, ctx: BenchContext):
+    # Разделы сводки выполняются на своих сессиях, параллельно
+    await dashboard.build()
+
+
+@bench_case("pricing.quote_200_lines")
+async def _quote(db: AsyncSession, ctx: BenchContext):
+    lines = [{"id_products": ctx.random_id("products"), "amount": ctx.rnd.randint(1, 5)} for _ in range(200)]
+    await pricing_engine.quote(db, lines, customer_id=ctx.random_id("customer"))
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def run_case(name: str, case: BenchCase, ctx: BenchContext, iterations: int, warmup: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    queries: List[int] = []
+    for i in range(warmup + iterations):
+        async with async_session() as db:
+            with profile_block(name) as profile:
+                started = time.perf_counter()
+                await case(db, ctx)
+                elapsed = time.perf_counter() - started
+        if i >= warmup:
+            latencies.append(elapsed * 1000)
+            queries.append(profile.query_count)
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "queries_per_call": round(statistics.fmean(queries), 2),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Найти регрессии: рост p95 больше допуска или больше SQL-запросов на вызов"""
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current["queries_per_call"] > previous["queries_per_call"]:
+            regressions.append(f"{name}: queries {previous['queries_per_call']} -> {current['queries_per_call']}")
+    return regressions
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", help="запустить только сценарии с этими префиксами")
+    parser.add_argument("--save", help="сохранить результат в JSON")
+    parser.add_argument("--compare", help="сравнить с базовой линией из JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимый рост p95 (доля)")
+    parser.add_argument("--query-cache", action="store_true",
+                        help="не отключать кэш результатов запросов (по умолчанию замеряются сами запросы)")
+    args = parser.parse_args()
+    query_cache.enabled = args.query_cache
+
+    # Запросы считаются хуками движка независимо от PROFILING_ENABLED
+    install_query_hooks(engine)
+
+    ctx = BenchContext(args.seed)
+    results: Dict[str, Any] = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "dialect": engine.dialect.name,
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "query_cache": args.query_cache,
+        },
+        "results": {},
+    }
+    try:
+        async with async_session() as db:
+            await ctx.load(db)
+        results["meta"]["rows"] = ctx.max_ids
+
+        for name, case in CASES.items():
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            stats = await run_case(name, case, ctx, args.iterations, args.warmup)
+            results["results"][name] = stats
+            print(f"{name:36s} p50 {stats['p50_ms']:8.2f}  p95 {stats['p95_ms']:8.2f}  "
+                  f"p99 {stats['p99_ms']:8.2f} ms  queries {stats['queries_per_call']:5.1f}")
+    finally:
+        await engine.dispose()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"РЕГРЕССИЯ {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,112 @@
+import gzip
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli не обязателен, без него используется только gzip
+    brotli = None
+
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов brotli/gzip больше заданного размера.
+
+    Сжимаются только ответы, отданные одним сообщением (обычные JSON-ответы);
+    потоковые ответы и SSE проходят без изменений.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        """
+        Кодировка с наибольшим q из Accept-Encoding (RFC 9110, 12.5.3).
+
+        q=0 запрещает кодировку, "*" задаёт q для неперечисленных; при равном q
+        brotli предпочтительнее gzip.
+        """
+        weights: Dict[str, float] = {}
+        for part in accept_encoding.lower().split(","):
+            coding, *params = [item.strip() for item in part.split(";")]
+            if not coding:
+                continue
+            weight = 1.0
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip() == "q":
+                    try:
+                        weight = float(value)
+                    except ValueError:
+                        weight = 0.0
+            weights[coding] = weight
+
+        chosen, chosen_weight = None, 0.0
+        for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+            weight = weights.get(coding, weights.get("*", 0.0))
+            if weight > chosen_weight:
+                chosen, chosen_weight = coding, weight
+        return chosen
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or content_type.startswith(EXCLUDED_CONTENT_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body and len(body) >= self.minimum_size:
+                body = self._compress(encoding, body)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                message = {**message, "body": body}
+
+            await send(start_message)
+            start_message = None
+            passthrough = True
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,77 @@
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from fastapi import Request, Response
+
+from src.api.responses import ORJSONDecimalResponse
+from src.core.metrics import record_cache
+from src.db.table_versions import table_versions
+
+# Справочники меняются редко — клиенту можно держать их в кэше,
+# списки заказов и остатков должны перепроверяться при каждом запросе
+CACHE_REVALIDATE = "no-cache"
+CACHE_SHORT = "private, max-age=30, must-revalidate"
+CACHE_REFERENCE = "public, max-age=300"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Сравнить If-None-Match с ETag (слабое сравнение)"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    weak = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == weak for tag in candidates)
+
+
+def _not_modified_since(if_modified_since: str, last_modified: float) -> bool:
+    """Проверить If-Modified-Since (точность заголовка — секунда)"""
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(last_modified) <= int(since)
+
+
+async def conditional_response(
+    request: Request,
+    tables: Iterable[str],
+    build: Callable[[], Awaitable[Any]],
+    cache_control: str = CACHE_REVALIDATE,
+    vary_on_query: bool = True,
+    vary_on: Optional[str] = None,
+) -> Response:
+    """
+    Условный GET по версиям таблиц.
+
+    ETag считается из версий таблиц, которые читает эндпоинт, и параметров запроса.
+    vary_on — что ещё, кроме таблиц, меняет ответ (например, текущая дата для
+    статистики «за сегодня»); входит в ETag, а If-Modified-Since для таких ответов
+    не проверяется — дата изменения таблиц такие изменения не учитывает.
+    Если клиент прислал актуальный ETag (или дату), возвращается 304 без обращения к БД,
+    иначе вызывается build() и результат отдаётся с ETag/Last-Modified/Cache-Control.
+    """
+    tables = list(tables)
+    parts = [str(request.url.query) if vary_on_query else None, vary_on]
+    extra: Optional[str] = "&".join(part for part in parts if part) or None
+    etag = table_versions.etag(tables, extra)
+    last_modified = table_versions.last_modified(tables)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": table_versions.last_modified_http(tables),
+        "Cache-Control": cache_control,
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            record_cache("http_etag", hit=True)
+            return Response(status_code=304, headers=headers)
+    elif vary_on is None:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and _not_modified_since(if_modified_since, last_modified):
+            record_cache("http_etag", hit=True)
+            return Response(status_code=304, headers=headers)
+
+    record_cache("http_etag", hit=False)
+    data = await build()
+    return ORJSONDecimalResponse(content=data, headers=headers)
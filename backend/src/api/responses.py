@@ -0,0 +1,139 @@
+import asyncio
+import functools
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.dependencies.utils import get_typed_return_annotation
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from fastapi.utils import lenient_issubclass
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from src.core.config import DECIMAL_MODE
+
+
+def _decimal_as_str(value: Decimal) -> str:
+    return format(value, "f")
+
+
+def _decimal_as_fixed(value: Decimal) -> orjson.Fragment:
+    # Fragment вставляется в JSON как есть: число без потерь точности float
+    return orjson.Fragment(format(value, "f"))
+
+
+DECIMAL_ENCODERS: Dict[str, Callable[[Decimal], Any]] = {
+    "str": _decimal_as_str,
+    "fixed": _decimal_as_fixed,
+}
+
+
+def make_default(decimal_mode: str = DECIMAL_MODE) -> Callable[[Any], Any]:
+    """Собрать функцию default для orjson с нужной стратегией Decimal"""
+    encode_decimal = DECIMAL_ENCODERS.get(decimal_mode)
+    if encode_decimal is None:
+        raise ValueError(
+            f"Неизвестный DECIMAL_MODE {decimal_mode!r}, допустимые значения: {', '.join(DECIMAL_ENCODERS)}"
+        )
+
+    def default(value: Any) -> Any:
+        if isinstance(value, Decimal):
+            return encode_decimal(value)
+        if isinstance(value, BaseModel):
+            return value.model_dump()
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+    return default
+
+
+_default = make_default()
+
+
+def dumps(content: Any) -> bytes:
+    """Сериализовать ответ в JSON (orjson + стратегия Decimal из настроек)"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONDecimalResponse(JSONResponse):
+    """
+    JSON-ответ через orjson.
+
+    Даты и datetime orjson сериализует сам, Decimal — по DECIMAL_MODE,
+    поэтому jsonable_encoder для больших списков не нужен.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _render_decimal(
+    endpoint: Callable[..., Any], status_code: Optional[int], response_model: Any = None
+) -> Callable[..., Any]:
+    """
+    Обернуть обработчик: результат, который не Response, сразу рендерится ORJSONDecimalResponse.
+
+    С response_model результат сначала проверяется схемой и выгружается в dict
+    без приведения к JSON-типам, так что Decimal остаётся Decimal до orjson.
+    """
+    if getattr(endpoint, "__renders_decimal__", False):
+        return endpoint
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+
+    def render(result: Any) -> Any:
+        if isinstance(result, Response):
+            return result
+        if adapter is not None:
+            try:
+                result = adapter.dump_python(adapter.validate_python(result, from_attributes=True), by_alias=True)
+            except ValidationError as e:
+                raise ResponseValidationError(errors=e.errors(include_url=False), body=result)
+        return ORJSONDecimalResponse(content=result, status_code=status_code or 200)
+
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            return render(await endpoint(*args, **kwargs))
+        wrapper: Callable[..., Any] = async_wrapper
+    else:
+        @functools.wraps(endpoint)
+        def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+            return render(endpoint(*args, **kwargs))
+        wrapper = sync_wrapper
+
+    setattr(wrapper, "__renders_decimal__", True)
+    return wrapper
+
+
+class ORJSONDecimalRoute(APIRoute):
+    """
+    Маршрут, отдающий ответы через ORJSONDecimalResponse с Decimal по DECIMAL_MODE.
+
+    Без response_model FastAPI прогоняет результат через jsonable_encoder (Decimal
+    становится float), с response_model — сериализует схему в режиме JSON (Decimal
+    становится строкой), и до orjson Decimal не доходит. Поэтому обработчики
+    оборачиваются: результат проверяется response_model (если она есть) и сразу
+    рендерится с DECIMAL_MODE и кодом статуса маршрута, Response возвращается как есть.
+    response_model по-прежнему описывает ответ в OpenAPI.
+    Все APIRouter приложения создаются с route_class=ORJSONDecimalRoute.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        endpoint: Callable[..., Any],
+        *,
+        response_model: Any = Default(None),
+        status_code: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        model = response_model
+        if isinstance(model, DefaultPlaceholder):
+            model = get_typed_return_annotation(endpoint)
+        if lenient_issubclass(model, Response):
+            model = None
+        endpoint = _render_decimal(endpoint, status_code, model)
+        super().__init__(path, endpoint, response_model=response_model, status_code=status_code, **kwargs)
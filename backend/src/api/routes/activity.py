@@ -0,0 +1,54 @@
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.conditional import conditional_response, CACHE_REVALIDATE
+from src.api.responses import ORJSONDecimalRoute
+from src.core.db_config import read_db
+from src.db.activity_log import activity_buffer, activity_stats, FORM_VISIT, REPORT_RUN
+from src.db.schemas import ActivityEvent, FormStats
+
+router = APIRouter(prefix="/activity", tags=["Activity"], route_class=ORJSONDecimalRoute)
+
+STATS_TABLES = ["reports_and_froms"]
+
+
+async def _record(event: ActivityEvent, event_type: int) -> dict:
+    if not await activity_buffer.record(event.name, event_type, event.object_id):
+        raise HTTPException(status_code=503, detail="Журнал перегружен, событие не записано",
+                            headers={"Retry-After": "1"})
+    return {"queued": True}
+
+
+@router.post("/form-visits", status_code=202)
+async def record_form_visit(event: ActivityEvent):
+    """Записать посещение формы (пишется в БД пачкой, с задержкой)"""
+    return await _record(event, FORM_VISIT)
+
+
+@router.post("/report-runs", status_code=202)
+async def record_report_run(event: ActivityEvent):
+    """Записать запуск отчёта (пишется в БД пачкой, с задержкой)"""
+    return await _record(event, REPORT_RUN)
+
+
+@router.get("/form-stats", response_model=FormStats)
+async def get_form_stats(
+    request: Request,
+    period: Literal["all", "today", "week", "month"] = "all",
+    event_type: int = FORM_VISIT,
+    db: AsyncSession = Depends(read_db(*STATS_TABLES)),
+):
+    """Посещения форм за период (для страницы статистики форм)"""
+    # Границы периода сдвигаются со сменой дня, а не только с записью в журнал
+    today = date.today()
+
+    async def build():
+        return await activity_stats.get(db, period, event_type, today)
+
+    return await conditional_response(
+        request, STATS_TABLES, build, CACHE_REVALIDATE,
+        vary_on=today.isoformat() if period != "all" else None,
+    )
@@ -0,0 +1,31 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.responses import ORJSONDecimalRoute
+from src.core.db_config import get_db
+from src.db.archive import archive_mover
+
+router = APIRouter(prefix="/archive", tags=["Archive"], route_class=ORJSONDecimalRoute)
+
+
+@router.post("/run")
+async def run_archive(
+    year: Optional[int] = None,
+    dry_run: bool = True,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Перенести закрытые на сегодня годы (по year включительно) в архивные таблицы; dry_run — только посчитать
+    """
+    try:
+        return await archive_mover.run(db, year=year, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/periods")
+async def list_archive_periods(db: AsyncSession = Depends(get_db)):
+    """Состояние переноса в архив по годам"""
+    return await archive_mover.periods(db)
@@ -0,0 +1,56 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.conditional import conditional_response, CACHE_REVALIDATE
+from src.api.responses import ORJSONDecimalRoute
+from src.core.db_config import read_db
+from src.db.db_service import customer_service
+from src.db.schemas import CustomerSummary
+
+router = APIRouter(prefix="/customers", tags=["Customers"], route_class=ORJSONDecimalRoute)
+
+# Таблицы, из которых собирается сводка по клиенту
+SUMMARY_TABLES = [
+    "customer", "cust_conts", "cont_type", "district", "customer_type",
+    "orders", "order_list_items", "order_status",
+]
+
+
+@router.get("/summary", response_model=List[CustomerSummary])
+async def list_customer_summaries(
+    request: Request,
+    ids: Optional[str] = Query(None, description="id клиентов через запятую"),
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    recent: int = Query(5, ge=0, le=50, description="сколько последних заказов показать"),
+    db: AsyncSession = Depends(read_db(*SUMMARY_TABLES)),
+):
+    """Сводки по списку клиентов (для списка клиентов отдела продаж) одним запросом"""
+    try:
+        customer_ids = [int(value) for value in ids.split(",") if value.strip()] if ids else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids должен быть списком чисел через запятую")
+
+    async def build():
+        return await customer_service.get_summaries(db, customer_ids, skip=skip, limit=limit, recent=recent)
+
+    return await conditional_response(request, SUMMARY_TABLES, build, CACHE_REVALIDATE)
+
+
+@router.get("/{customer_id}/summary", response_model=CustomerSummary)
+async def get_customer_summary(
+    customer_id: int,
+    request: Request,
+    recent: int = Query(5, ge=0, le=50, description="сколько последних заказов показать"),
+    db: AsyncSession = Depends(read_db(*SUMMARY_TABLES)),
+):
+    """Клиент целиком: профиль, контакты, итоги по заказам и последние заказы"""
+    async def build():
+        summary = await customer_service.get_summary(db, customer_id, recent=recent)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="Клиент не найден")
+        return summary
+
+    return await conditional_response(request, SUMMARY_TABLES, build, CACHE_REVALIDATE)
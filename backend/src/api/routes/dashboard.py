@@ -0,0 +1,27 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from src.api.responses import ORJSONDecimalRoute
+from src.core.db_routing import client_key
+from src.db.dashboard import dashboard
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"], route_class=ORJSONDecimalRoute)
+
+
+@router.get("")
+async def get_dashboard(
+    request: Request,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    sections: Optional[List[str]] = Query(None),
+):
+    """
+    Сводка главной страницы: продажи, топ продуктов, клиенты, поставки, расходы.
+    Разделы считаются параллельно; не успевшие за таймаут приходят пустыми и перечислены в failed.
+    """
+    try:
+        return await dashboard.build(client_key(request), date_from, date_to, sections)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
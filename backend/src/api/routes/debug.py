@@ -0,0 +1,34 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from src.api.responses import ORJSONDecimalRoute
+from src.core.config import DEBUG_TOKEN
+from src.core.profiling import profile_store
+
+
+async def require_debug_token(x_debug_token: Optional[str] = Header(None)) -> None:
+    """Пропустить запрос к /debug только с верным X-Debug-Token; без DEBUG_TOKEN эндпоинты скрыты"""
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_debug_token is None or not secrets.compare_digest(x_debug_token, DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Нужен заголовок X-Debug-Token")
+
+
+router = APIRouter(
+    prefix="/debug", tags=["Debug"], dependencies=[Depends(require_debug_token)], route_class=ORJSONDecimalRoute
+)
+
+
+@router.get("/profiling")
+async def get_profiling():
+    """Сводка профилирования: маршруты, медленные запросы, случаи N+1"""
+    return profile_store.snapshot()
+
+
+@router.delete("/profiling")
+async def reset_profiling():
+    """Сбросить накопленную статистику профилирования"""
+    profile_store.reset()
+    return {"status": "ok"}
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from src.api.responses import ORJSONDecimalRoute
+from src.core.config import SSE_HEARTBEAT_SECONDS
+from src.db.order_events import subscribe_orders
+
+router = APIRouter(prefix="/events", tags=["Events"], route_class=ORJSONDecimalRoute)
+
+# Через сколько миллисекунд браузер переподключается после обрыва
+RETRY_MS = 3000
+
+
+@router.get("/orders")
+async def order_events_stream(
+    customer_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    last_event_id: Optional[str] = Header(default=None),
+    since: Optional[str] = Query(default=None, description="id последнего полученного события"),
+):
+    """
+    Поток событий заказов (Server-Sent Events): order.created и order.status_changed.
+
+    Фильтр по клиенту и/или сотруднику; без фильтров — все заказы. При переподключении
+    браузер присылает Last-Event-ID, и пропущенные события досылаются из буфера.
+    """
+    subscription = subscribe_orders(customer_id, employee_id, last_event_id if last_event_id is not None else since)
+
+    async def stream():
+        try:
+            yield b"retry: %d\n\n" % RETRY_MS
+            async for message in subscription.messages(SSE_HEARTBEAT_SECONDS):
+                yield message
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
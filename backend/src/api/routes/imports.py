@@ -0,0 +1,61 @@
+import tempfile
+from typing import IO
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.responses import ORJSONDecimalRoute
+from src.core.config import IMPORT_MAX_MB
+from src.core.db_config import get_db
+from src.db.bulk_import import bulk_importer
+
+router = APIRouter(prefix="/imports", tags=["Imports"], route_class=ORJSONDecimalRoute)
+
+
+async def _spool(request: Request) -> IO[bytes]:
+    """Тело запроса — во временный файл на диске, не в память; больше IMPORT_MAX_MB — 413"""
+    max_bytes = int(IMPORT_MAX_MB * 1024 * 1024)
+    file = tempfile.TemporaryFile()
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            file.close()
+            raise HTTPException(status_code=413, detail=f"Файл больше {IMPORT_MAX_MB:g} МБ")
+        file.write(chunk)
+    file.seek(0)
+    return file
+
+
+@router.post("/price-list")
+async def import_price_list(
+    request: Request,
+    dry_run: bool = False,
+    encoding: str = "utf-8-sig",
+    db: AsyncSession = Depends(get_db),
+):
+    """Загрузить цены из CSV/XLSX (файл — тело запроса); отчёт с ошибками по строкам"""
+    file = await _spool(request)
+    try:
+        return await bulk_importer.import_price_list(db, file, encoding=encoding, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        file.close()
+
+
+@router.post("/supplies")
+async def import_supplies(
+    request: Request,
+    dry_run: bool = False,
+    encoding: str = "utf-8-sig",
+    db: AsyncSession = Depends(get_db),
+):
+    """Загрузить поставки с позициями из CSV/XLSX (файл — тело запроса); отчёт с ошибками по строкам"""
+    file = await _spool(request)
+    try:
+        return await bulk_importer.import_supplies(db, file, encoding=encoding, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        file.close()
@@ -0,0 +1,112 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.conditional import conditional_response, CACHE_REVALIDATE
+from src.api.responses import ORJSONDecimalRoute
+from src.core.db_config import get_db, read_db
+from src.db.db_service import orders_service, model_to_dict, VersionConflictError
+from src.db.allocation import fifo_allocator, InsufficientStockError
+from src.db.order_placement import order_placement
+from src.db.pricing import pricing_engine, PriceNotFoundError
+from src.db.schemas import (
+    AllocatedItem, AllocationLine, OrderCreate, OrdersRead, OrderUpdate, OrderWithItems, PlacedOrder
+)
+
+router = APIRouter(prefix="/orders", tags=["Orders"], route_class=ORJSONDecimalRoute)
+
+ORDERS_TABLES = ["orders"]
+ORDER_DETAIL_TABLES = ["orders", "order_list_items", "supply_list_items", "products", "customer"]
+
+
+@router.get("", response_model=List[OrdersRead])
+async def list_orders(
+    request: Request,
+    customer_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(read_db(*ORDERS_TABLES)),
+):
+    """Список заказов (с условным GET); период date_from/date_to может заходить в архивные годы"""
+    async def build():
+        if customer_id is not None:
+            orders = await orders_service.get_customer_orders(
+                db, customer_id, date_from, date_to, skip=skip, limit=limit
+            )
+        else:
+            orders = await orders_service.get_all(db, skip=skip, limit=limit, date_from=date_from, date_to=date_to)
+        return [model_to_dict(order) for order in orders]
+
+    return await conditional_response(request, ORDERS_TABLES, build, CACHE_REVALIDATE)
+
+
+@router.post("", response_model=PlacedOrder, status_code=201)
+async def place_order(order_in: OrderCreate, db: AsyncSession = Depends(get_db)):
+    """Оформить заказ: создать его и зарезервировать остаток по партиям (FIFO)"""
+    order_data = order_in.model_dump(exclude={"items"}, exclude_none=True)
+    lines = [line.model_dump() for line in order_in.items]
+    if any(line["price_with_discount"] is None for line in lines):
+        # Позиции без цены оцениваются по прайс-листу и акциям
+        unpriced = [line for line in lines if line["price_with_discount"] is None]
+        try:
+            quote = await pricing_engine.quote_order(
+                db, unpriced, customer_id=order_in.id_customer, discount_id=order_in.id_discounts,
+                on_date=order_in.order_date,
+            )
+        except PriceNotFoundError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        for line, priced in zip(unpriced, quote["items"]):
+            line["price_with_discount"] = priced["price_with_discount"]
+        # Заказ ссылается на скидку, по которой оценены его позиции
+        if quote["id_discounts"] is not None:
+            order_data["id_discounts"] = quote["id_discounts"]
+    try:
+        order, items = await order_placement.place(db, order_data, lines)
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except VersionConflictError:
+        raise HTTPException(status_code=409, detail="Остатки меняются слишком часто, повторите попытку",
+                            headers={"Retry-After": "1"})
+    return {"order": model_to_dict(order), "items": items}
+
+
+@router.get("/{order_id}", response_model=OrderWithItems)
+async def get_order(order_id: int, request: Request, db: AsyncSession = Depends(read_db(*ORDER_DETAIL_TABLES))):
+    """Заказ с позициями"""
+    async def build():
+        order = await orders_service.get_order_with_items(db, order_id)
+        if order is None:
+            raise HTTPException(status_code=404, detail="Заказ не найден")
+        return order
+
+    return await conditional_response(request, ORDER_DETAIL_TABLES, build, CACHE_REVALIDATE)
+
+
+@router.patch("/{order_id}", response_model=OrdersRead)
+async def update_order(order_id: int, order_in: OrderUpdate, db: AsyncSession = Depends(get_db)):
+    """Изменить заказ; 409, если его изменили после того, как клиент прочитал версию"""
+    try:
+        order = await orders_service.update(db, order_id, order_in)
+    except VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if order is None:
+        raise HTTPException(status_code=404, detail="Заказ не найден")
+    return model_to_dict(order)
+
+
+@router.post("/{order_id}/allocate", response_model=List[AllocatedItem])
+async def allocate_order(order_id: int, lines: List[AllocationLine], db: AsyncSession = Depends(get_db)):
+    """Распределить позиции заказа по партиям поставок (FIFO)"""
+    if await orders_service.get(db, order_id) is None:
+        raise HTTPException(status_code=404, detail="Заказ не найден")
+    try:
+        return await fifo_allocator.allocate(db, order_id, [line.model_dump() for line in lines])
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except VersionConflictError:
+        raise HTTPException(status_code=409, detail="Остатки меняются слишком часто, повторите попытку",
+                            headers={"Retry-After": "1"})
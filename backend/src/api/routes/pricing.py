@@ -0,0 +1,46 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.responses import ORJSONDecimalRoute
+from src.core.db_config import get_db
+from src.db.models import Customer
+from src.db.pricing import pricing_engine, PriceNotFoundError
+from src.db.schemas import PromotionRow, Quote, QuoteRequest
+
+router = APIRouter(prefix="/pricing", tags=["Pricing"], route_class=ORJSONDecimalRoute)
+
+
+@router.post("/quote", response_model=Quote)
+async def quote(request: QuoteRequest, db: AsyncSession = Depends(get_db)):
+    """Цены со скидкой для позиций заказа (текущий прайс-лист и действующие акции)"""
+    try:
+        return await pricing_engine.quote(
+            db,
+            [line.model_dump() for line in request.items],
+            customer_id=request.id_customer,
+            customer_type=request.id_customer_type,
+            event_type=request.id_event_type,
+            discount_id=request.id_discounts,
+            on_date=request.on_date,
+        )
+    except PriceNotFoundError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/promotions", response_model=List[PromotionRow])
+async def promotions(
+    customer_id: Optional[int] = None,
+    on_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Акции, действующие на дату (для клиента — с учётом его типа)"""
+    customer_type = None
+    if customer_id is not None:
+        customer_type = (await db.execute(
+            select(Customer.id_customer_type).where(Customer.id_customer == customer_id)
+        )).scalar()
+    return await pricing_engine.active_promotions(db, customer_type, on_date)
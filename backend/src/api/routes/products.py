@@ -0,0 +1,41 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.responses import ORJSONDecimalRoute
+from src.api.conditional import conditional_response, CACHE_REVALIDATE, CACHE_SHORT
+from src.core.db_config import read_db
+from src.db.db_service import products_service
+from src.db.schemas import PriceListRow, StockRow
+
+router = APIRouter(tags=["Products"], route_class=ORJSONDecimalRoute)
+
+PRICE_LIST_TABLES = ["products", "prise_list"]
+STOCK_TABLES = ["supply_list_items", "order_list_items", "write_offs_list", "products"]
+
+
+@router.get("/price-list", response_model=List[PriceListRow])
+async def get_price_list(
+    request: Request,
+    category_id: Optional[int] = None,
+    db: AsyncSession = Depends(read_db(*PRICE_LIST_TABLES)),
+):
+    """Прайс-лист с текущими ценами"""
+    async def build():
+        return await products_service.get_price_list(db, category_id)
+
+    return await conditional_response(request, PRICE_LIST_TABLES, build, CACHE_SHORT)
+
+
+@router.get("/stock", response_model=List[StockRow])
+async def get_stock(
+    request: Request,
+    warehouse_id: Optional[int] = None,
+    db: AsyncSession = Depends(read_db(*STOCK_TABLES)),
+):
+    """Остатки продуктов по складам"""
+    async def build():
+        return await products_service.get_stock(db, warehouse_id)
+
+    return await conditional_response(request, STOCK_TABLES, build, CACHE_REVALIDATE)
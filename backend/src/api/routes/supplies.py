@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.responses import ORJSONDecimalRoute
+from src.core.db_config import get_db
+from src.db.db_service import supplies_service, model_to_dict, UnknownReferenceError
+from src.db.schemas import CreatedSupply, SupplyCreate
+
+router = APIRouter(prefix="/supplies", tags=["Supplies"], route_class=ORJSONDecimalRoute)
+
+
+@router.post("", response_model=CreatedSupply, status_code=201)
+async def create_supply(supply_in: SupplyCreate, db: AsyncSession = Depends(get_db)):
+    """Создать поставку вместе с позициями одной транзакцией"""
+    supply_data = supply_in.model_dump(exclude={"items", "id_warehous"}, exclude_none=True)
+    items = []
+    for line in supply_in.items:
+        item = line.model_dump()
+        if item["id_warehous"] is None:
+            item["id_warehous"] = supply_in.id_warehous
+        if item["id_warehous"] is None:
+            raise HTTPException(status_code=422, detail=f"Не указан склад для продукта {item['id_products']}")
+        items.append(item)
+    try:
+        supply, rows = await supplies_service.create_with_items(db, supply_data, items)
+    except UnknownReferenceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"supply": model_to_dict(supply), "items": rows}
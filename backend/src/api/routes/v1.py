@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+
+from src.api.responses import ORJSONDecimalRoute
+from src.api.routes import (
+    activity, archive, customers, dashboard, debug, events, imports, orders, pricing, products, supplies, write_offs
+)
+
+router = APIRouter(route_class=ORJSONDecimalRoute)
+router.include_router(orders.router)
+router.include_router(products.router)
+router.include_router(debug.router)
+router.include_router(write_offs.router)
+router.include_router(activity.router)
+router.include_router(events.router)
+router.include_router(pricing.router)
+router.include_router(customers.router)
+router.include_router(supplies.router)
+router.include_router(archive.router)
+router.include_router(dashboard.router)
+router.include_router(imports.router)
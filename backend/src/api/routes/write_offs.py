@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.responses import ORJSONDecimalRoute
+from src.core.db_config import get_db
+from src.db.db_service import VersionConflictError
+from src.db.expiry import expiry_scanner
+
+router = APIRouter(prefix="/write-offs", tags=["Write-offs"], route_class=ORJSONDecimalRoute)
+
+
+@router.post("/expiry-scan")
+async def run_expiry_scan(
+    dry_run: bool = True,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Найти просроченные партии на сегодня и (если dry_run=false) списать их пачками.
+    Без EXPIRY_WRITE_OFF_TYPE_ID списание не выполняется, ответ всегда dry_run.
+    """
+    try:
+        return await expiry_scanner.scan(db, dry_run=dry_run)
+    except VersionConflictError:
+        raise HTTPException(status_code=409, detail="Остатки меняются слишком часто, повторите попытку",
+                            headers={"Retry-After": "1"})
@@ -1,5 +1,6 @@
 # src/core/config.py
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,10 +11,120 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "SQLConnect1$")
 DB_NAME = os.getenv("DB_NAME", "flowers_db_2025")
 DB_PORT = os.getenv("DB_PORT", "1433")
 
-# Формат для асинхронного подключения к MSSQL через aioodbc+pyodbc
-database_url = f"mssql+aioodbc:///?odbc_connect=DRIVER={{ODBC Driver 18 for SQL Server}};SERVER={DB_HOST};DATABASE={DB_NAME};UID={DB_USER};PWD={DB_PASSWORD};TrustServerCertificate=yes;Encrypt=no"
+# Бэкенд хранения: "mssql" (Azure SQL Edge / SQL Server) или "sqlite" (локальный файл через aiosqlite)
+DB_BACKEND = os.getenv("DB_BACKEND", "mssql")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "flowers_db_2025.sqlite3")
+
+
+def mssql_url(database: str) -> str:
+    """URL для асинхронного подключения к MSSQL через aioodbc+pyodbc"""
+    return f"mssql+aioodbc:///?odbc_connect=DRIVER={{ODBC Driver 18 for SQL Server}};SERVER={DB_HOST};DATABASE={database};UID={DB_USER};PWD={DB_PASSWORD};TrustServerCertificate=yes;Encrypt=no"
+
+
+def sqlite_url(path: str) -> str:
+    """URL для асинхронного подключения к файлу SQLite через aiosqlite"""
+    return f"sqlite+aiosqlite:///{path}"
+
+
+# Пул соединений (для SQLite с одним файлом большой пул не нужен)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+# DATABASE_URL из окружения имеет приоритет над DB_BACKEND
+if os.getenv("DATABASE_URL"):
+    database_url = os.environ["DATABASE_URL"]
+elif DB_BACKEND == "sqlite":
+    database_url = sqlite_url(SQLITE_PATH)
+else:
+    database_url = mssql_url(DB_NAME)
+
+# Реплика для чтения (отчёты и списки): READ_DATABASE_URL или файл READ_SQLITE_PATH;
+# не задана — все запросы идут в основную БД
+if os.getenv("READ_DATABASE_URL"):
+    read_database_url = os.environ["READ_DATABASE_URL"]
+elif os.getenv("READ_SQLITE_PATH"):
+    read_database_url = sqlite_url(os.environ["READ_SQLITE_PATH"])
+else:
+    read_database_url = None
+# После записи клиента (и после изменения таблиц эндпоинта) чтения столько секунд идут
+# в основную БД — реплика могла ещё не получить изменения
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
+# Реплика, упавшая посреди запроса, не используется столько секунд
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "10"))
 
 
 # Настройки приложения
 API_V1_STR = "/api/v1"
 PROJECT_NAME = "Flowers DB API"
+
+# Сериализация ответов: Decimal как строка ("str") или как число с фиксированной точкой ("fixed")
+DECIMAL_MODE = os.getenv("DECIMAL_MODE", "str")
+# Ответы меньше этого размера (в байтах) не сжимаются
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Профилирование запросов: порог медленного SQL (мс) и число повторов одного запроса для пометки N+1
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Токен для /debug (заголовок X-Debug-Token); без него отладочные эндпоинты отключены
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+# Логировать все SQL-запросы SQLAlchemy (медленные пишутся в лог и без этого)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# Списание просроченных партий: срок годности по умолчанию и по категориям ({"id категории": дней}, 0 — не портится)
+SHELF_LIFE_DAYS = int(os.getenv("SHELF_LIFE_DAYS", "14"))
+SHELF_LIFE_BY_CATEGORY = {
+    int(category): int(days)
+    for category, days in json.loads(os.getenv("SHELF_LIFE_BY_CATEGORY", "{}")).items()
+}
+# Тип списания для просрочки (write_offs_type); 0 — не задан: партии только находятся, но не списываются
+EXPIRY_WRITE_OFF_TYPE_ID = int(os.getenv("EXPIRY_WRITE_OFF_TYPE_ID", "0")) or None
+# Сколько дней после истечения срока партия ещё проверяется (более старые разбираются вручную)
+EXPIRY_LOOKBACK_DAYS = int(os.getenv("EXPIRY_LOOKBACK_DAYS", "30"))
+# Сколько партий списывается одной транзакцией
+EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "500"))
+# Период фонового сканирования, 0 — отключено
+EXPIRY_SCAN_INTERVAL_SECONDS = int(os.getenv("EXPIRY_SCAN_INTERVAL_SECONDS", "0"))
+
+# Журнал посещений форм и запусков отчётов: события копятся в памяти и пишутся пачкой
+# раз в ACTIVITY_FLUSH_INTERVAL_MS или по ACTIVITY_BATCH_SIZE событий
+ACTIVITY_FLUSH_INTERVAL_MS = int(os.getenv("ACTIVITY_FLUSH_INTERVAL_MS", "1000"))
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", "500"))
+# Размер очереди и сколько ждать места в ней, прежде чем отбросить событие
+ACTIVITY_QUEUE_SIZE = int(os.getenv("ACTIVITY_QUEUE_SIZE", "10000"))
+ACTIVITY_ENQUEUE_TIMEOUT_MS = int(os.getenv("ACTIVITY_ENQUEUE_TIMEOUT_MS", "100"))
+
+# Оформление заказа: число повторов при конфликте версий партий и базовая пауза между ними (мс)
+ORDER_PLACEMENT_RETRIES = int(os.getenv("ORDER_PLACEMENT_RETRIES", "5"))
+ORDER_PLACEMENT_BACKOFF_MS = int(os.getenv("ORDER_PLACEMENT_BACKOFF_MS", "10"))
+
+# Поток событий заказов (SSE): интервал пинга в секундах, чтобы прокси не закрывали простаивающее соединение
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# Типы скидок (discount_type), значение которых — сумма, а не процент
+FIXED_DISCOUNT_TYPE_IDS = {int(type_id) for type_id in os.getenv("FIXED_DISCOUNT_TYPE_IDS", "2").split(",") if type_id}
+
+# Кэш результатов запросов (прайс-лист, остатки, отчёты): бюджет памяти в МБ и страховочный
+# срок жизни записи в секундах — на случай записи в БД в обход сервисов; false — отключён
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", "64"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "300"))
+
+# Архив истории: заказы и поставки старше ARCHIVE_KEEP_YEARS полных лет (плюс текущий год)
+# переносятся в архивные таблицы по годам, пачками по ARCHIVE_BATCH_SIZE документов
+ARCHIVE_KEEP_YEARS = int(os.getenv("ARCHIVE_KEEP_YEARS", "1"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+# Наибольшая группа связанных заказов и партий, которая читается в память; более крупные остаются на месте
+ARCHIVE_MAX_GROUP_SIZE = int(os.getenv("ARCHIVE_MAX_GROUP_SIZE", "50000"))
+
+# Сводка главной страницы: сколько её запросов выполняется одновременно (каждый на своём
+# соединении из пула) и сколько секунд ждать каждый — не успевший раздел возвращается пустым
+DASHBOARD_CONCURRENCY = int(os.getenv("DASHBOARD_CONCURRENCY", "4"))
+DASHBOARD_QUERY_TIMEOUT_SECONDS = float(os.getenv("DASHBOARD_QUERY_TIMEOUT_SECONDS", "2"))
+
+# Загрузка прайс-листов и поставок из CSV/XLSX: файл читается и записывается пачками по
+# IMPORT_CHUNK_ROWS строк (каждая пачка — своя транзакция), в отчёте не больше IMPORT_MAX_ERRORS
+# ошибок по строкам; файлы больше IMPORT_MAX_MB отклоняются
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+IMPORT_MAX_MB = float(os.getenv("IMPORT_MAX_MB", "200"))
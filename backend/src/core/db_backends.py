@@ -0,0 +1,96 @@
+import sqlite3
+from typing import Any, Dict
+
+from sqlalchemy import Date, cast, event, func
+from sqlalchemy.engine import Dialect, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+
+# Настройки SQLite: WAL позволяет читать параллельно с записью,
+# synchronous=NORMAL в режиме WAL безопасен и заметно быстрее FULL
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",      # 64 МБ страничного кэша
+    "mmap_size": "268435456",    # 256 МБ memory-mapped I/O
+    "busy_timeout": "5000",
+}
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Параметры create_async_engine для бэкенда по URL"""
+    backend = make_url(url).get_backend_name()
+    if backend == "mssql":
+        return {
+            # pyodbc отправляет executemany одним пакетом вместо запроса на строку
+            "fast_executemany": True,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_pre_ping": True,
+        }
+    if backend == "sqlite":
+        return {"connect_args": {"timeout": 30}}
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_pre_ping": True}
+
+
+def install_sqlite_pragmas(engine: AsyncEngine) -> None:
+    """Выставлять PRAGMA на каждом новом соединении SQLite"""
+    in_memory = engine.url.database in (None, "", ":memory:")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            if in_memory and name in ("journal_mode", "mmap_size"):
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def configure_engine(engine: AsyncEngine) -> None:
+    """Донастроить движок под бэкенд после создания"""
+    if engine.dialect.name == "sqlite":
+        install_sqlite_pragmas(engine)
+
+
+class DialectFeatures:
+    """
+    Возможности диалекта, от которых зависят быстрые пути сервисов.
+
+    bulk_returning — вставка пачки строк с возвратом ключей одним запросом
+    (OUTPUT inserted.* в MSSQL, RETURNING в SQLite >= 3.35);
+    window_functions — ROW_NUMBER() OVER (...) и т.п. (SQLite >= 3.25).
+    """
+
+    def __init__(self, dialect: Dialect):
+        self.name = dialect.name
+        self.bulk_returning = bool(getattr(dialect, "insert_executemany_returning", False))
+        self.returning = bool(getattr(dialect, "insert_returning", False))
+        if self.name == "sqlite":
+            # aiosqlite работает поверх стандартного sqlite3
+            self.window_functions = sqlite3.sqlite_version_info >= (3, 25)
+        else:
+            self.window_functions = True
+
+
+_features: Dict[int, DialectFeatures] = {}
+
+
+def dialect_features(dialect: Dialect) -> DialectFeatures:
+    """Возможности диалекта (кэшируются на экземпляр диалекта)"""
+    features = _features.get(id(dialect))
+    if features is None:
+        features = _features[id(dialect)] = DialectFeatures(dialect)
+    return features
+
+
+def day_bucket(column, dialect: Dialect):
+    """Выражение "дата без времени" для группировки по дням"""
+    if dialect.name == "sqlite":
+        # В SQLite CAST(... AS DATE) даёт число, а date() — строку 'YYYY-MM-DD'
+        return func.date(column)
+    return cast(column, Date)
@@ -4,20 +4,49 @@ import os
 from typing import Any, AsyncGenerator
 
 from dotenv import load_dotenv
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from src.core.config import database_url 
+from src.core.config import database_url, read_database_url, DB_ECHO, PROFILING_ENABLED
+from src.core.profiling import install_query_hooks
+from src.core.metrics import install_db_metrics
+from src.core.health import DatabaseProbe
+from src.core.db_backends import engine_options, configure_engine
+from src.core.db_routing import ReadRouter, client_key
 
 load_dotenv()
 
 DATABASE_URL = database_url 
 
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_async_engine(DATABASE_URL, echo=DB_ECHO, **engine_options(DATABASE_URL))
+configure_engine(engine)
+
+if PROFILING_ENABLED:
+    install_query_hooks(engine)
+install_db_metrics(engine)
+
+# Проверка БД для /health и /ready
+db_probe = DatabaseProbe(engine)
 
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Реплика для чтения отчётов и списков (если настроена)
+read_engine = None
+read_session = None
+read_probe = None
+if read_database_url:
+    read_engine = create_async_engine(read_database_url, echo=DB_ECHO, **engine_options(read_database_url))
+    configure_engine(read_engine)
+    if PROFILING_ENABLED:
+        install_query_hooks(read_engine)
+    install_db_metrics(read_engine, pool_name="replica")
+    read_probe = DatabaseProbe(read_engine)
+    read_session = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+read_router = ReadRouter(async_session, read_session, read_probe)
+
 Base = declarative_base()
 
 
@@ -29,6 +58,24 @@ async def get_db() -> AsyncGenerator[AsyncSession, Any]:
             await session.close()
 
 
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, Any]:
+    """Сессия для чтения: на реплике, если она доступна и клиент недавно не писал"""
+    async for session in read_router.session(client_key(request)):
+        yield session
+
+
+def read_db(*tables: str):
+    """
+    Зависимость get_read_db для эндпоинта, читающего tables: пока эти таблицы
+    недавно менялись, чтение идёт в основную БД
+    """
+    async def dependency(request: Request) -> AsyncGenerator[AsyncSession, Any]:
+        async for session in read_router.session(client_key(request), tables):
+            yield session
+
+    return dependency
+
+
 @asynccontextmanager
 async def get_db_manager() -> AsyncGenerator[AsyncSession, Any]:
     async with async_session() as session:
@@ -0,0 +1,145 @@
+import logging
+import time
+from typing import Any, AsyncGenerator, Dict, Iterable, Optional
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import READ_AFTER_WRITE_SECONDS, REPLICA_RETRY_SECONDS
+from src.core.health import DatabaseProbe
+from src.core.metrics import registry
+from src.db.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+db_read_routing_total = registry.counter(
+    "db_read_routing_total", "Read sessions by target database and reason", ("target", "reason")
+)
+
+# Методы, после которых чтения клиента на время идут в основную БД
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+# Заголовок, по которому различаются клиенты (иначе — по адресу)
+CLIENT_ID_HEADER = "x-client-id"
+
+# Старые отметки о записи вычищаются, когда их набирается столько
+MAX_TRACKED_CLIENTS = 10000
+
+
+def client_key(connection: HTTPConnection) -> str:
+    """Ключ клиента для read-your-writes"""
+    client_id = connection.headers.get(CLIENT_ID_HEADER)
+    if client_id:
+        return client_id
+    return connection.client.host if connection.client else ""
+
+
+class ReadRouter:
+    """
+    Выбор БД для чтения: реплика или основная.
+
+    Читающие эндпоинты получают сессию на реплике, кроме случаев, когда:
+    - реплика не настроена, не отвечает на проверку или недавно упала посреди запроса;
+    - клиент сам писал в последние read_after_write секунд (read-your-writes);
+    - таблицы эндпоинта менялись в последние read_after_write секунд — реплика могла
+      не догнать основную БД, а ответ и ETag посчитаются по новым версиям таблиц
+      и закэшировались бы устаревшими.
+    """
+
+    def __init__(
+        self,
+        primary_session,
+        replica_session=None,
+        replica_probe: Optional[DatabaseProbe] = None,
+        read_after_write: float = READ_AFTER_WRITE_SECONDS,
+        retry_after: float = REPLICA_RETRY_SECONDS,
+    ):
+        self.primary_session = primary_session
+        self.replica_session = replica_session
+        self.replica_probe = replica_probe
+        self.read_after_write = read_after_write
+        self.retry_after = retry_after
+        self._writes: Dict[str, float] = {}
+        self._down_until = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica_session is not None
+
+    def record_write(self, key: str) -> None:
+        """Отметить запись клиента"""
+        now = time.monotonic()
+        if len(self._writes) >= MAX_TRACKED_CLIENTS:
+            self._writes = {
+                client: at for client, at in self._writes.items() if now - at < self.read_after_write
+            }
+        self._writes[key] = now
+
+    def wrote_recently(self, key: str) -> bool:
+        at = self._writes.get(key)
+        return at is not None and time.monotonic() - at < self.read_after_write
+
+    def mark_down(self, error: Exception) -> None:
+        """Не использовать реплику retry_after секунд"""
+        logger.error(f"Реплика недоступна, чтения идут в основную БД: {error}")
+        self._down_until = time.monotonic() + self.retry_after
+
+    async def _replica_available(self) -> bool:
+        if time.monotonic() < self._down_until:
+            return False
+        return self.replica_probe is None or await self.replica_probe.is_ready()
+
+    async def choose(self, key: str, tables: Iterable[str] = ()) -> str:
+        """Куда направить чтение: "replica" или "primary" (с причиной в метрике)"""
+        if not self.enabled:
+            return "primary"
+        if self.wrote_recently(key):
+            reason = "read_your_writes"
+        elif table_versions.modified_within(tables, self.read_after_write):
+            reason = "recent_table_write"
+        elif not await self._replica_available():
+            reason = "replica_down"
+        else:
+            db_read_routing_total.inc(target="replica", reason="read")
+            return "replica"
+        db_read_routing_total.inc(target="primary", reason=reason)
+        return "primary"
+
+    async def session(self, key: str, tables: Iterable[str] = ()) -> AsyncGenerator[AsyncSession, Any]:
+        """Сессия для чтения; ошибка соединения с репликой выключает её на retry_after"""
+        target = await self.choose(key, tables)
+        factory = self.replica_session if target == "replica" else self.primary_session
+        async with factory() as session:
+            try:
+                yield session
+            except (OperationalError, InterfaceError) as e:
+                if target == "replica":
+                    self.mark_down(e)
+                raise
+            finally:
+                await session.close()
+
+
+class ReadYourWritesMiddleware:
+    """Запоминает клиентов, отправивших изменяющий запрос, чтобы их чтения шли в основную БД"""
+
+    def __init__(self, app: ASGIApp, router: ReadRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS or not self.router.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        key = client_key(HTTPConnection(scope))
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Запись закоммичена до ответа — отметка ставится до того, как клиент пойдёт читать
+                self.router.record_write(key)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
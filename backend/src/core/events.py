@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import logging
+import uuid
+from collections import deque
+from decimal import Decimal
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+import orjson
+
+from src.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+events_published_total = registry.counter(
+    "events_published_total", "Events published to the in-process bus", ("bus", "type")
+)
+event_subscribers_dropped_total = registry.counter(
+    "event_subscribers_dropped_total", "Subscribers disconnected because they could not keep up", ("bus",)
+)
+
+# Маркер закрытия подписки в очереди подписчика
+_CLOSED = object()
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return format(value, "f")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class Event:
+    """
+    Событие шины: тип, данные, темы и готовое SSE-сообщение.
+
+    id — порядковый номер в процессе; клиенту уходит id вида «<запуск>-<номер>»,
+    чтобы после рестарта процесса номера из старого запуска не путались с новыми.
+    """
+
+    __slots__ = ("id", "type", "data", "topics", "message")
+
+    def __init__(self, id: int, type: str, data: Dict[str, Any], topics: Iterable[str], boot_id: str):
+        self.id = id
+        self.type = type
+        self.data = data
+        self.topics = frozenset(topics)
+        # Сериализуется один раз на событие, подписчикам уходят одни и те же байты
+        payload = orjson.dumps(data, default=_default)
+        self.message = b"id: %s-%d\nevent: %s\ndata: %s\n\n" % (boot_id.encode(), id, type.encode(), payload)
+
+
+class Subscription:
+    """Подписка на темы шины с ограниченной очередью"""
+
+    def __init__(self, bus: "EventBus", topics: Iterable[str], predicate: Optional[Callable[[Event], bool]],
+                 max_queue: int):
+        self.bus = bus
+        self.topics = frozenset(topics)
+        self.predicate = predicate
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def accepts(self, event: Event) -> bool:
+        return self.predicate is None or self.predicate(event)
+
+    def deliver(self, message: bytes) -> bool:
+        """Положить сообщение в очередь; False, если подписчик не успевает его забирать"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self) -> None:
+        """Завершить подписку: поток подписчика закончится после уже полученных событий"""
+        if self.closed:
+            return
+        self.closed = True
+        self.bus.unsubscribe(self)
+        try:
+            self.queue.put_nowait(_CLOSED)
+        except asyncio.QueueFull:
+            # Очередь забита — подписчик всё равно будет отключён, маркер положим вместо последнего события
+            self.queue.get_nowait()
+            self.queue.put_nowait(_CLOSED)
+
+    async def messages(self, heartbeat: float):
+        """
+        SSE-сообщения подписки; при простое — комментарий-пинг, чтобы прокси не закрыли соединение
+        """
+        while True:
+            try:
+                message = await asyncio.wait_for(self.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if message is _CLOSED:
+                return
+            yield message
+
+
+class EventBus:
+    """
+    Внутрипроцессная шина событий с подпиской по темам.
+
+    Публикация находит подписчиков по темам события через индекс тема → подписки,
+    так что стоимость события зависит от числа подходящих подписчиков, а не от всех
+    открытых соединений. Каждый подписчик получает событие в свою ограниченную
+    очередь; не успевающий подписчик отключается (клиент переподключится с
+    Last-Event-ID и дочитает пропущенное из буфера последних событий).
+
+    Номера событий начинаются с 1 в каждом процессе, поэтому в id события входит
+    идентификатор запуска. Last-Event-ID из другого запуска (или без него) означает,
+    что клиент не видел ни одного события этого процесса, и ему досылается весь буфер.
+    """
+
+    def __init__(self, name: str, replay_size: int = 1000, max_queue: int = 100):
+        self.name = name
+        self.max_queue = max_queue
+        self._boot_id = uuid.uuid4().hex[:12]
+        self._ids = itertools.count(1)
+        self._recent: Deque[Event] = deque(maxlen=replay_size)
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._subscriptions: Set[Subscription] = set()
+
+        registry.gauge(
+            f"{name}_subscribers", f"Open subscriptions to the {name} event bus",
+            collect=lambda: {(): len(self._subscriptions)},
+        )
+
+    def subscribe(
+        self,
+        topics: Iterable[str],
+        predicate: Optional[Callable[[Event], bool]] = None,
+        last_event_id: Optional[str] = None,
+    ) -> Subscription:
+        """
+        Подписаться на темы. Если передан last_event_id, сначала в очередь попадут
+        события из буфера, пропущенные после него.
+        """
+        subscription = Subscription(self, topics, predicate, self.max_queue)
+        position = self._position(last_event_id)
+        if position is not None:
+            for event in self._recent:
+                if event.id > position and event.topics & subscription.topics and subscription.accepts(event):
+                    if not subscription.deliver(event.message):
+                        break
+        for topic in subscription.topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def _position(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Номер последнего полученного клиентом события в этом запуске (0 — ни одного)"""
+        if last_event_id is None:
+            return None
+        boot_id, _, number = last_event_id.strip().rpartition("-")
+        if boot_id != self._boot_id or not number.isdigit():
+            return 0
+        return int(number)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def publish(self, type: str, data: Dict[str, Any], topics: Iterable[str]) -> Event:
+        """Опубликовать событие всем подписчикам его тем"""
+        event = Event(next(self._ids), type, data, topics, self._boot_id)
+        self._recent.append(event)
+        events_published_total.inc(bus=self.name, type=type)
+
+        targets: Set[Subscription] = set()
+        for topic in event.topics:
+            targets.update(self._topics.get(topic, ()))
+        lagging: List[Subscription] = []
+        for subscription in targets:
+            if subscription.accepts(event) and not subscription.deliver(event.message):
+                lagging.append(subscription)
+        for subscription in lagging:
+            logger.warning(f"Подписчик шины {self.name} не успевает получать события и отключён")
+            event_subscribers_dropped_total.inc(bus=self.name)
+            subscription.close()
+        return event
+
+    def close(self) -> None:
+        """Закрыть все подписки (при остановке приложения)"""
+        for subscription in list(self._subscriptions):
+            subscription.close()
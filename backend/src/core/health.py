@@ -0,0 +1,57 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseProbe:
+    """
+    Проверка доступности БД для health/readiness.
+
+    Выполняет SELECT 1 на соединении из пула движка (без создания сессии)
+    и кэширует результат на ttl секунд, чтобы частые пробы не нагружали БД.
+    """
+
+    def __init__(self, engine: AsyncEngine, ttl: float = 2.0, timeout: float = 3.0):
+        self.engine = engine
+        self.ttl = ttl
+        self.timeout = timeout
+        self._checked_at = 0.0
+        self._result: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+
+    async def _select_one(self) -> None:
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def _ping(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            # Таймаут покрывает и получение соединения из пула, и подключение к серверу
+            await asyncio.wait_for(self._select_one(), self.timeout)
+            return {"database": "connected", "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+        except asyncio.TimeoutError:
+            logger.error(f"База данных не ответила за {self.timeout} с")
+            return {"database": "disconnected", "error": f"timeout after {self.timeout}s"}
+        except Exception as e:
+            logger.error(f"Ошибка подключения к базе данных: {e}")
+            return {"database": "disconnected", "error": str(e)}
+
+    async def check(self) -> Dict[str, Any]:
+        """Результат проверки (из кэша, если он свежий)"""
+        if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._result
+        async with self._lock:
+            # Пока ждали блокировку, проверку мог выполнить другой запрос
+            if self._result is None or time.monotonic() - self._checked_at >= self.ttl:
+                self._result = await self._ping()
+                self._checked_at = time.monotonic()
+        return self._result
+
+    async def is_ready(self) -> bool:
+        return (await self.check())["database"] == "connected"
@@ -0,0 +1,330 @@
+import time
+import functools
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Базовая метрика с набором меток"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in self.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        # collect вызывается при выдаче метрик (для значений, которые дешевле прочитать, чем отслеживать)
+        self._collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        if self._collect is not None:
+            return list(self._collect().items())
+        return super().items()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Для каждого набора меток: счётчики по корзинам (последняя — +Inf), сумма
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            snapshot = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    """Реестр метрик и выдача в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed"
+)
+db_queries_total = registry.counter(
+    "db_queries_total", "SQL statements executed by DBService model and method", ("model", "method")
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "SQL statement duration by DBService model and method", ("model", "method"),
+    buckets=DB_BUCKETS,
+)
+db_service_call_duration = registry.histogram(
+    "db_service_call_duration_seconds", "DBService call duration including commit", ("model", "method"),
+    buckets=DB_BUCKETS,
+)
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("pool",),
+    buckets=DB_BUCKETS,
+)
+cache_requests_total = registry.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result")
+)
+
+
+def _cache_hit_ratio() -> Dict[Tuple[str, ...], float]:
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in cache_requests_total.items():
+        hits_and_all = totals.setdefault(cache, [0.0, 0.0])
+        hits_and_all[1] += value
+        if result == "hit":
+            hits_and_all[0] += value
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total}
+
+
+registry.gauge("cache_hit_ratio", "Share of cache lookups that were hits", ("cache",), collect=_cache_hit_ratio)
+
+
+# Движки, состояние пулов которых выдаётся в метриках
+_pools: Dict[str, Any] = {}
+
+
+def _pool_status() -> Dict[Tuple[str, ...], float]:
+    values = {}
+    for pool_name, sync_engine in _pools.items():
+        pool = sync_engine.pool
+        for state in ("size", "checkedin", "checkedout", "overflow"):
+            getter = getattr(pool, state, None)
+            if callable(getter):
+                values[(pool_name, state)] = getter()
+    return values
+
+
+registry.gauge("db_pool_connections", "Connection pool state", ("pool", "state"), collect=_pool_status)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Учесть обращение к кэшу"""
+    cache_requests_total.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# Текущая операция DBService (модель, метод), к которой относятся выполняемые SQL-запросы
+_current_operation: ContextVar[Tuple[str, str]] = ContextVar("db_operation", default=("other", "other"))
+
+
+def observe_db_call(method: Callable) -> Callable:
+    """Декоратор метода DBService: время вызова и привязка SQL-запросов к модели/методу"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        model = self.model.__tablename__
+        token = _current_operation.set((model, method.__name__))
+        started = time.perf_counter()
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            db_service_call_duration.observe(time.perf_counter() - started, model=model, method=method.__name__)
+            _current_operation.reset(token)
+
+    return wrapper
+
+
+# В пуле нет события «начало ожидания», а событие checkout не знает, кто ждал соединение.
+# Поэтому ожидание считается по событиям сессии: транзакция создаётся до запроса
+# соединения из пула, after_begin приходит, когда соединение выдано.
+def _checkout_started(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info["checkout_started"] = time.perf_counter()
+
+
+def _checkout_finished(session, transaction, connection) -> None:
+    started = session.info.pop("checkout_started", None)
+    if started is None:
+        return
+    pool_name = next((name for name, engine in _pools.items() if engine is connection.engine), None)
+    if pool_name is not None:
+        db_pool_checkout_wait.observe(time.perf_counter() - started, pool=pool_name)
+
+
+def install_db_metrics(engine: AsyncEngine, pool_name: str = "primary") -> None:
+    """Подключить к движку счётчики SQL-запросов и замер ожидания соединения из пула"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["metrics_started"].pop()
+        model, method = _current_operation.get()
+        db_queries_total.inc(model=model, method=method)
+        db_query_duration.observe(duration, model=model, method=method)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(context):
+        # Упавший запрос не доходит до after_cursor_execute — снять его отметку со стека
+        conn = context.connection
+        if conn is not None and conn.info.get("metrics_started"):
+            conn.info["metrics_started"].pop()
+
+    _pools[pool_name] = sync_engine
+    if not event.contains(Session, "after_transaction_create", _checkout_started):
+        event.listen(Session, "after_transaction_create", _checkout_started)
+        event.listen(Session, "after_begin", _checkout_finished)
+
+
+class MetricsMiddleware:
+    """Латентность по маршрутам, число запросов и запросы в обработке"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            method = scope["method"]
+            http_request_duration.observe(time.perf_counter() - started, method=method, route=route)
+            http_requests_total.inc(method=method, route=route, status=status_code)
@@ -0,0 +1,241 @@
+import re
+import time
+import hashlib
+import logging
+import weakref
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import SLOW_QUERY_MS, N_PLUS_ONE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Нормализовать SQL: литералы и списки параметров заменяются на ?, пробелы схлопываются"""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(statement: str) -> str:
+    """Отпечаток запроса: одинаков для запросов, отличающихся только параметрами"""
+    return hashlib.blake2b(normalize_sql(statement).encode(), digest_size=8).hexdigest()
+
+
+def redact_params(parameters: Any) -> Any:
+    """Заменить значения параметров их типами, чтобы не писать данные в лог"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return f"<{len(parameters)} rows>"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class RequestProfile:
+    """Статистика одного HTTP-запроса: число SQL-запросов, время в БД, повторы"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.fingerprints: Counter = Counter()
+        self.statements: Dict[str, str] = {}
+
+    def record_query(self, statement: str, duration: float) -> str:
+        key = fingerprint(statement)
+        self.query_count += 1
+        self.db_time += duration
+        self.fingerprints[key] += 1
+        self.statements.setdefault(key, statement)
+        return key
+
+    def repeated_statements(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Dict[str, Any]]:
+        """Запросы, повторившиеся не меньше threshold раз (признак N+1)"""
+        return [
+            {"fingerprint": key, "count": count, "sql": normalize_sql(self.statements[key])}
+            for key, count in self.fingerprints.items()
+            if count >= threshold
+        ]
+
+    def server_timing(self, total: float) -> str:
+        """Значение заголовка Server-Timing"""
+        app_time = max(total - self.db_time, 0.0)
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries", '
+            f"app;dur={app_time * 1000:.1f}, "
+            f"total;dur={total * 1000:.1f}"
+        )
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_block(name: str) -> Iterator[RequestProfile]:
+    """Профилировать произвольный блок кода (скрипты, бенчмарки) так же, как HTTP-запрос"""
+    profile = RequestProfile("BLOCK", name)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+class ProfileStore:
+    """Сводная статистика по маршрутам, последние медленные запросы и случаи N+1"""
+
+    def __init__(self, max_events: int = 200):
+        self.routes: Dict[str, Dict[str, float]] = {}
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self.n_plus_one: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+
+    def record_request(self, profile: RequestProfile, total: float, status_code: int) -> None:
+        # Для несопоставленных путей (404) не плодим отдельную запись на каждый URL
+        route = f"{profile.method} {profile.route or '<unmatched>'}"
+        stats = self.routes.setdefault(route, {
+            "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "queries": 0, "db_ms": 0.0,
+        })
+        stats["count"] += 1
+        stats["errors"] += status_code >= 500
+        stats["total_ms"] += total * 1000
+        stats["max_ms"] = max(stats["max_ms"], total * 1000)
+        stats["queries"] += profile.query_count
+        stats["db_ms"] += profile.db_time * 1000
+
+        repeated = profile.repeated_statements()
+        if repeated:
+            logger.warning(f"Возможный N+1 в {route}: {[(r['count'], r['sql']) for r in repeated]}")
+            self.n_plus_one.append({"route": route, "at": time.time(), "statements": repeated})
+
+    def record_slow_query(self, statement: str, parameters: Any, duration: float) -> None:
+        profile = current_profile()
+        entry = {
+            "at": time.time(),
+            "duration_ms": round(duration * 1000, 1),
+            "sql": normalize_sql(statement),
+            "params": redact_params(parameters),
+            "route": f"{profile.method} {profile.route or profile.path}" if profile else None,
+        }
+        logger.warning(f"Медленный запрос {entry['duration_ms']} мс: {entry['sql']} params={entry['params']}")
+        self.slow_queries.append(entry)
+
+    def snapshot(self) -> Dict[str, Any]:
+        routes = {
+            route: {
+                "count": int(stats["count"]),
+                "errors": int(stats["errors"]),
+                "avg_ms": round(stats["total_ms"] / stats["count"], 1),
+                "max_ms": round(stats["max_ms"], 1),
+                "avg_queries": round(stats["queries"] / stats["count"], 1),
+                "avg_db_ms": round(stats["db_ms"] / stats["count"], 1),
+            }
+            for route, stats in self.routes.items()
+        }
+        return {
+            "routes": routes,
+            "slow_queries": list(self.slow_queries),
+            "n_plus_one": list(self.n_plus_one),
+        }
+
+    def reset(self) -> None:
+        self.routes.clear()
+        self.slow_queries.clear()
+        self.n_plus_one.clear()
+
+
+profile_store = ProfileStore()
+
+
+# Движки с уже подключёнными хуками: повторное подключение удвоило бы счёт запросов
+_hooked_engines: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def install_query_hooks(engine: AsyncEngine, slow_query_ms: float = SLOW_QUERY_MS) -> None:
+    """Подключить к движку хуки, считающие запросы и время в БД (повторный вызов ничего не делает)"""
+    sync_engine = engine.sync_engine
+    if sync_engine in _hooked_engines:
+        return
+    _hooked_engines.add(sync_engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        duration = time.perf_counter() - started
+        profile = current_profile()
+        if profile is not None:
+            profile.record_query(statement, duration)
+        if duration * 1000 >= slow_query_ms:
+            profile_store.record_slow_query(statement, parameters, duration)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(context):
+        # Упавший запрос не доходит до after_cursor_execute: без этого его отметка осталась бы в стеке
+        # и следующие запросы соединения сопоставлялись бы с чужим временем начала
+        conn = context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование HTTP-запросов.
+
+    Замеряет время обработки, число SQL-запросов и время в БД для каждого запроса,
+    отдаёт их в заголовке Server-Timing и копит сводку по маршрутам в profile_store.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing(time.perf_counter() - profile.started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            profile.route = getattr(route, "path", None)
+            self.store.record_request(profile, time.perf_counter() - profile.started, status_code)
+            _current_profile.reset(token)
@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import (
+    ACTIVITY_FLUSH_INTERVAL_MS,
+    ACTIVITY_BATCH_SIZE,
+    ACTIVITY_QUEUE_SIZE,
+    ACTIVITY_ENQUEUE_TIMEOUT_MS,
+)
+from src.core.db_backends import day_bucket
+from src.core.metrics import DB_BUCKETS, registry
+from src.db.models import ReportsAndFrorms
+from src.db.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+# Значения reports_and_froms_type
+FORM_VISIT = 1
+REPORT_RUN = 2
+
+TABLE = ReportsAndFrorms.__tablename__
+
+activity_events_total = registry.counter(
+    "activity_events_total", "Form visit / report run events by result", ("result",)
+)
+activity_flush_duration = registry.histogram(
+    "activity_flush_duration_seconds", "Duration of one bulk insert of activity events", buckets=DB_BUCKETS
+)
+
+# Ключ корзины: (день, тип, имя формы/отчёта)
+BucketKey = Tuple[date, int, str]
+
+# Маркер остановки в очереди
+_STOP = object()
+
+# Предельная пауза перед повторной записью пачки, если БД недоступна (секунды)
+RETRY_MAX_DELAY = 30
+
+
+def period_start(period: str, today: Optional[date] = None) -> Optional[date]:
+    """Первый день периода статистики (как на странице FormStats: неделя с воскресенья)"""
+    today = today or date.today()
+    if period == "today":
+        return today
+    if period == "week":
+        return today - timedelta(days=(today.weekday() + 1) % 7)
+    if period == "month":
+        return today.replace(day=1)
+    return None
+
+
+class ActivityStats:
+    """
+    Счётчики посещений по дням в памяти.
+
+    При первом обращении загружаются из reports_and_froms одним GROUP BY по дню,
+    типу и имени, дальше пополняются буфером после каждой записи пачки — запрос
+    статистики за любой период суммирует готовые корзины и не читает журнал.
+    Если таблица изменилась в обход буфера (версия таблицы разошлась),
+    корзины загружаются заново.
+    """
+
+    def __init__(self):
+        self._buckets: Optional[Dict[BucketKey, List[Any]]] = None
+        self._version: Optional[int] = None
+        # Загрузка и применение записанной пачки не должны перемежаться, иначе пачка посчитается дважды
+        self.lock = asyncio.Lock()
+
+    async def _load(self, db: AsyncSession) -> None:
+        day = day_bucket(ReportsAndFrorms.date_time, db.get_bind().dialect)
+        query = select(
+            day.label("day"),
+            ReportsAndFrorms.reports_and_froms_type,
+            ReportsAndFrorms.reports_and_froms_name,
+            func.count().label("visits"),
+            func.max(ReportsAndFrorms.date_time).label("last_visit")
+        ).group_by(
+            day, ReportsAndFrorms.reports_and_froms_type, ReportsAndFrorms.reports_and_froms_name
+        )
+        buckets: Dict[BucketKey, List[Any]] = {}
+        for row in await db.execute(query):
+            row_day = date.fromisoformat(row.day) if isinstance(row.day, str) else row.day
+            key = (row_day, row.reports_and_froms_type or FORM_VISIT, row.reports_and_froms_name or "")
+            buckets[key] = [row.visits, row.last_visit]
+        self._buckets = buckets
+        self._version = table_versions.get(TABLE)
+
+    def apply(self, rows: List[Dict[str, Any]]) -> None:
+        """Учесть записанную пачку (вызывается под lock после коммита)"""
+        if self._buckets is None or self._version != table_versions.get(TABLE) - 1:
+            # Корзины не загружены или уже устарели — пусть загрузятся заново
+            self._buckets = None
+            return
+        for row in rows:
+            key = (row["date_time"].date(), row["reports_and_froms_type"], row["reports_and_froms_name"])
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [1, row["date_time"]]
+            else:
+                bucket[0] += 1
+                if bucket[1] is None or row["date_time"] > bucket[1]:
+                    bucket[1] = row["date_time"]
+        self._version = table_versions.get(TABLE)
+
+    async def get(
+        self,
+        db: AsyncSession,
+        period: str = "all",
+        event_type: int = FORM_VISIT,
+        today: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """Посещения по формам за период, по убыванию числа посещений"""
+        if self._buckets is None or self._version != table_versions.get(TABLE):
+            async with self.lock:
+                if self._buckets is None or self._version != table_versions.get(TABLE):
+                    await self._load(db)
+
+        since = period_start(period, today)
+        totals: Dict[str, List[Any]] = {}
+        for (day, bucket_type, name), (visits, last_visit) in self._buckets.items():
+            if bucket_type != event_type or (since is not None and day < since):
+                continue
+            total = totals.setdefault(name, [0, None])
+            total[0] += visits
+            if last_visit is not None and (total[1] is None or last_visit > total[1]):
+                total[1] = last_visit
+
+        forms = sorted(
+            ({"name": name, "visits": visits, "last_visit": last_visit}
+             for name, (visits, last_visit) in totals.items()),
+            key=lambda form: form["visits"],
+            reverse=True,
+        )
+        return {
+            "period": period,
+            "since": since,
+            "total_visits": sum(form["visits"] for form in forms),
+            "forms": forms,
+        }
+
+
+class ActivityBuffer:
+    """
+    Отложенная запись журнала посещений форм и запусков отчётов.
+
+    События складываются в ограниченную очередь и записываются в reports_and_froms
+    одной пачкой, когда накопилось batch_size событий или прошло flush_interval
+    с первого события пачки. Если очередь заполнена, record() ждёт место не дольше
+    enqueue_timeout и затем отбрасывает событие (об этом говорит результат и метрика),
+    чтобы журнал не тормозил сами запросы. Пачка, которую не удалось записать,
+    возвращается в очередь и пишется повторно с растущей паузой; не поместившиеся
+    в очередь события отбрасываются и считаются в метрике. При остановке очередь
+    дописывается целиком.
+    """
+
+    def __init__(
+        self,
+        stats: Optional[ActivityStats] = None,
+        flush_interval_ms: int = ACTIVITY_FLUSH_INTERVAL_MS,
+        batch_size: int = ACTIVITY_BATCH_SIZE,
+        queue_size: int = ACTIVITY_QUEUE_SIZE,
+        enqueue_timeout_ms: int = ACTIVITY_ENQUEUE_TIMEOUT_MS,
+    ):
+        self.stats = stats
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._session_factory = None
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, session_factory) -> None:
+        """Запустить фоновую запись (в lifespan приложения)"""
+        if self.running:
+            return
+        self._session_factory = session_factory
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run(self._queue))
+
+    async def stop(self) -> None:
+        """Дописать накопленные события и остановить фоновую запись"""
+        queue, task = self._queue, self._task
+        if queue is None or task is None or task.done():
+            return
+        # Новые события больше не принимаются; маркер встаёт в конец очереди после уже принятых
+        self._queue = None
+        await queue.put(_STOP)
+        await task
+        self._task = None
+        # События, которые ждали места в очереди и попали в неё после маркера
+        leftover = []
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not _STOP:
+                leftover.append(item)
+        for i in range(0, len(leftover), self.batch_size):
+            batch = leftover[i:i + self.batch_size]
+            if not await self.flush(batch):
+                activity_events_total.inc(len(batch), result="failed")
+
+    async def record(self, name: str, event_type: int = FORM_VISIT, object_id: Optional[int] = None) -> bool:
+        """Поставить событие в очередь; False, если событие отброшено"""
+        queue = self._queue
+        if queue is None:
+            activity_events_total.inc(result="dropped")
+            return False
+        event = {
+            "date_time": datetime.now(),
+            "reports_and_froms_name": name,
+            "reports_and_froms_type": event_type,
+            "reports_and_froms_id": object_id,
+        }
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(queue.put(event), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                activity_events_total.inc(result="dropped")
+                return False
+        activity_events_total.inc(result="queued")
+        return True
+
+    async def _collect(self, queue: asyncio.Queue) -> Tuple[List[Dict[str, Any]], bool]:
+        """Собрать пачку: ждать первое событие, затем добирать до batch_size или до конца интервала"""
+        first = await queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _requeue(self, queue: asyncio.Queue, rows: List[Dict[str, Any]]) -> None:
+        """Вернуть незаписанную пачку в очередь; что не поместилось — отбросить"""
+        requeued = 0
+        for row in rows:
+            try:
+                queue.put_nowait(row)
+            except asyncio.QueueFull:
+                break
+            requeued += 1
+        activity_events_total.inc(requeued, result="requeued")
+        if requeued < len(rows):
+            activity_events_total.inc(len(rows) - requeued, result="failed")
+            logger.error(f"Очередь журнала форм заполнена, отброшено {len(rows) - requeued} незаписанных событий")
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        stopping = False
+        failures = 0
+        while not stopping:
+            batch, stopping = await self._collect(queue)
+            if not batch:
+                continue
+            if await self.flush(batch):
+                failures = 0
+                continue
+            # Пачка вернётся в очередь; при остановке её допишет stop()
+            self._requeue(queue, batch)
+            if not stopping:
+                await asyncio.sleep(min(self.flush_interval * 2 ** failures, RETRY_MAX_DELAY))
+                failures += 1
+
+    async def flush(self, rows: List[Dict[str, Any]]) -> bool:
+        """Записать пачку событий одной вставкой; False, если запись не удалась"""
+        started = time.perf_counter()
+        try:
+            async with self._session_factory() as db:
+                if self.stats is not None:
+                    async with self.stats.lock:
+                        await self._insert(db, rows)
+                        self.stats.apply(rows)
+                else:
+                    await self._insert(db, rows)
+        except Exception as e:
+            logger.error(f"Не удалось записать {len(rows)} событий журнала форм: {e}")
+            return False
+        finally:
+            activity_flush_duration.observe(time.perf_counter() - started)
+        activity_events_total.inc(len(rows), result="flushed")
+        return True
+
+    async def _insert(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        try:
+            await db.execute(insert(ReportsAndFrorms), rows)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        table_versions.bump(TABLE)
+
+
+activity_stats = ActivityStats()
+activity_buffer = ActivityBuffer(stats=activity_stats)
+
+registry.gauge(
+    "activity_queue_depth", "Activity events waiting to be written",
+    collect=lambda: {(): activity_buffer.depth()},
+)
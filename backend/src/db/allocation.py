@@ -0,0 +1,316 @@
+import asyncio
+import heapq
+import logging
+import random
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import ORDER_PLACEMENT_RETRIES, ORDER_PLACEMENT_BACKOFF_MS
+from src.db.db_service import VersionConflictError
+from src.db.models import OrderListItems, Supplies, SupplyListItems
+from src.db.stock import remaining_stock_subquery
+from src.db.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+# Ключ партий: (продукт, склад)
+LotKey = Tuple[int, int]
+
+# Таблицы, от которых зависят остатки партий
+STOCK_TABLES = ("supply_list_items", "order_list_items", "write_offs_list", "supplies")
+
+
+_lot_locks: Dict[LotKey, asyncio.Lock] = {}
+
+
+def lot_lock(key: LotKey) -> asyncio.Lock:
+    """
+    Блокировка пары продукт/склад, общая для всех путей, расходующих партии
+    в этом процессе (FifoAllocator и OrderPlacement)
+    """
+    lock = _lot_locks.get(key)
+    if lock is None:
+        lock = _lot_locks[key] = asyncio.Lock()
+    return lock
+
+
+T = TypeVar("T")
+
+
+async def retry_on_conflict(
+    attempt: Callable[[], Awaitable[T]],
+    max_retries: int,
+    backoff: float,
+    locks: Sequence[asyncio.Lock] = (),
+    on_conflict: Optional[Callable[[VersionConflictError], None]] = None,
+    failure: str = "Конфликт версий не разрешился",
+) -> T:
+    """
+    Выполнять attempt(), пока он завершается VersionConflictError, не больше max_retries повторов.
+
+    Блокировки locks берутся в переданном порядке на время каждой попытки и не держатся
+    во время паузы. Пауза экспоненциальная со случайным разбросом, чтобы повторы
+    параллельных писателей не столкнулись снова. После последней неудачной попытки
+    ошибка пишется в лог с текстом failure и пробрасывается.
+    """
+    for attempt_number in range(max_retries + 1):
+        for lock in locks:
+            await lock.acquire()
+        try:
+            return await attempt()
+        except VersionConflictError as e:
+            if attempt_number == max_retries:
+                logger.warning(f"{failure} после {attempt_number + 1} попыток: {e}")
+                raise
+            if on_conflict is not None:
+                on_conflict(e)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        await asyncio.sleep(random.uniform(0, backoff * 2 ** attempt_number))
+    # Последняя попытка всегда завершается return или raise
+    raise AssertionError("unreachable")
+
+
+class InsufficientStockError(Exception):
+    """Недостаточно остатка для распределения позиции"""
+
+    def __init__(self, product_id: int, warehouse_id: int, requested: int, available: int):
+        self.product_id = product_id
+        self.warehouse_id = warehouse_id
+        self.requested = requested
+        self.available = available
+        super().__init__(
+            f"Недостаточно остатка продукта {product_id} на складе {warehouse_id}: "
+            f"запрошено {requested}, доступно {available}"
+        )
+
+
+class LotHeap:
+    """
+    Открытые партии одного продукта на одном складе.
+
+    Куча упорядочена по дате поставки (затем по id партии), поэтому самая старая
+    партия с остатком всегда на вершине. Исчерпанные партии удаляются из кучи,
+    списание k партий стоит O(k log n).
+    """
+
+    def __init__(self, lots: Iterable[Tuple[Optional[date], int, int]] = ()):
+        self._heap: List[Tuple[date, int]] = []
+        self.remaining: Dict[int, int] = {}
+        self.available = 0
+        for supp_date, lot_id, remaining in lots:
+            self.add(supp_date, lot_id, remaining)
+
+    def add(self, supp_date: Optional[date], lot_id: int, amount: int) -> None:
+        """Добавить остаток партии (новая поставка или возврат при откате)"""
+        if amount <= 0:
+            return
+        if self.remaining.get(lot_id, 0) == 0:
+            heapq.heappush(self._heap, (supp_date or date.min, lot_id))
+        self.remaining[lot_id] = self.remaining.get(lot_id, 0) + amount
+        self.available += amount
+
+    def take(self, amount: int) -> List[Tuple[int, int, date]]:
+        """
+        Списать amount с самых старых партий.
+
+        Возвращает [(id партии, количество, дата поставки)]. Если остатка не хватает,
+        куча не изменяется и возвращается пустой список.
+        """
+        if amount > self.available:
+            return []
+        taken: List[Tuple[int, int, date]] = []
+        while amount > 0:
+            supp_date, lot_id = self._heap[0]
+            quantity = min(amount, self.remaining[lot_id])
+            self.remaining[lot_id] -= quantity
+            self.available -= quantity
+            amount -= quantity
+            taken.append((lot_id, quantity, supp_date))
+            if self.remaining[lot_id] == 0:
+                heapq.heappop(self._heap)
+                del self.remaining[lot_id]
+        return taken
+
+    def release(self, taken: Iterable[Tuple[int, int, date]]) -> None:
+        """Вернуть ранее списанное (откат при ошибке записи)"""
+        for lot_id, quantity, supp_date in taken:
+            self.add(supp_date, lot_id, quantity)
+
+
+class FifoAllocator:
+    """
+    Распределение позиций заказа по партиям поставок (FIFO по дате поставки).
+
+    Для каждой пары (продукт, склад) в памяти держится LotHeap открытых партий
+    вместе с версиями партий; он загружается из БД при первом обращении одним
+    запросом. Позиции заказа делятся по партиям и записываются в order_list_items
+    одной транзакцией.
+
+    Если остатки меняются в обход распределителя (поставки, списания, правки
+    через DBService), версии таблиц расходятся с загруженными, и кэш партий
+    сбрасывается перед следующим распределением. Запись дополнительно защищена
+    так же, как в OrderPlacement: версии затронутых партий увеличиваются условным
+    UPDATE ... WHERE version = прочитанной, и при конфликте кэш этих пар
+    перечитывается, а распределение повторяется.
+    """
+
+    def __init__(self, max_retries: int = ORDER_PLACEMENT_RETRIES, backoff_ms: int = ORDER_PLACEMENT_BACKOFF_MS):
+        self.max_retries = max_retries
+        self.backoff = backoff_ms / 1000
+        self._lots: Dict[LotKey, LotHeap] = {}
+        self._lot_versions: Dict[int, int] = {}
+        self._versions: Optional[Tuple[int, ...]] = None
+
+    def _current_versions(self) -> Tuple[int, ...]:
+        return tuple(table_versions.get(table) for table in STOCK_TABLES)
+
+    def _check_versions(self) -> Tuple[int, ...]:
+        versions = self._current_versions()
+        if self._versions is not None and versions != self._versions:
+            logger.info("Остатки изменены вне распределителя, кэш партий сброшен")
+            self._lots.clear()
+            self._lot_versions.clear()
+        self._versions = versions
+        return versions
+
+    def invalidate(self, key: Optional[LotKey] = None) -> None:
+        """Сбросить кэш партий (целиком или для одной пары продукт/склад)"""
+        if key is None:
+            self._lots.clear()
+            self._lot_versions.clear()
+            return
+        heap = self._lots.pop(key, None)
+        if heap is not None:
+            for lot_id in heap.remaining:
+                self._lot_versions.pop(lot_id, None)
+
+    async def _load(self, db: AsyncSession, keys: List[LotKey]) -> None:
+        """Загрузить открытые партии для ключей одним запросом"""
+        missing = [key for key in keys if key not in self._lots]
+        if not missing:
+            return
+
+        remaining = remaining_stock_subquery()
+
+        query = select(
+            SupplyListItems.id_products,
+            SupplyListItems.id_warehous,
+            Supplies.supp_date,
+            SupplyListItems.id_supply_list_items,
+            SupplyListItems.version,
+            remaining.label("remaining")
+        ).join(
+            Supplies, SupplyListItems.id_supplies == Supplies.id_supplies
+        ).where(
+            SupplyListItems.id_products.in_({product for product, _ in missing}),
+            SupplyListItems.id_warehous.in_({warehouse for _, warehouse in missing}),
+            remaining > 0
+        )
+
+        lots: Dict[LotKey, LotHeap] = {key: LotHeap() for key in missing}
+        for row in await db.execute(query):
+            heap = lots.get((row.id_products, row.id_warehous))
+            if heap is not None:
+                heap.add(row.supp_date, row.id_supply_list_items, row.remaining)
+                self._lot_versions[row.id_supply_list_items] = row.version
+        self._lots.update(lots)
+
+    async def available(self, db: AsyncSession, product_id: int, warehouse_id: int) -> int:
+        """Доступный остаток продукта на складе"""
+        self._check_versions()
+        key = (product_id, warehouse_id)
+        await self._load(db, [key])
+        return self._lots[key].available
+
+    async def _attempt(
+        self, db: AsyncSession, keys: List[LotKey], order_id: int, lines: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        versions_before = self._check_versions()
+        await self._load(db, keys)
+
+        taken_by_heap: List[Tuple[LotHeap, List[Tuple[int, int, date]]]] = []
+        rows: List[Dict[str, Any]] = []
+        try:
+            for line in lines:
+                key = (line["id_products"], line["id_warehous"])
+                heap = self._lots[key]
+                taken = heap.take(line["amount"])
+                if not taken:
+                    raise InsufficientStockError(key[0], key[1], line["amount"], heap.available)
+                taken_by_heap.append((heap, taken))
+                rows.extend(
+                    {
+                        "id_orders": order_id,
+                        "id_supply_list_items": lot_id,
+                        "amount": quantity,
+                        "price_with_discount": line.get("price_with_discount"),
+                    }
+                    for lot_id, quantity, _ in taken
+                )
+
+            lot_ids = sorted({row["id_supply_list_items"] for row in rows})
+            # Версии партий сравниваются с прочитанными и растут при каждом расходе, как в OrderPlacement
+            for lot_id in lot_ids:
+                result = await db.execute(
+                    update(SupplyListItems)
+                    .where(
+                        SupplyListItems.id_supply_list_items == lot_id,
+                        SupplyListItems.version == self._lot_versions[lot_id]
+                    )
+                    .values(version=SupplyListItems.version + 1)
+                )
+                if result.rowcount == 0:
+                    raise VersionConflictError(SupplyListItems.__tablename__, lot_id, self._lot_versions[lot_id], None)
+            if rows:
+                await db.execute(insert(OrderListItems), rows)
+            await db.commit()
+        except VersionConflictError:
+            await db.rollback()
+            # Кэш этих пар устарел — перечитать при следующей попытке
+            for key in keys:
+                self.invalidate(key)
+            raise
+        except Exception:
+            await db.rollback()
+            for heap, taken in taken_by_heap:
+                heap.release(taken)
+            raise
+
+        for lot_id in lot_ids:
+            self._lot_versions[lot_id] += 1
+        bumped = ("order_list_items", "supply_list_items")
+        table_versions.bump(*bumped)
+        # Учесть только собственную запись: изменения других путей во время await должны сбросить кэш
+        self._versions = tuple(
+            version + (1 if table in bumped else 0)
+            for table, version in zip(STOCK_TABLES, versions_before)
+        )
+        return rows
+
+    async def allocate(self, db: AsyncSession, order_id: int, lines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Распределить позиции заказа по партиям и записать их.
+
+        lines: [{"id_products", "id_warehous", "amount", "price_with_discount"}].
+        Подходит и для крупных заказов: все партии загружаются одним запросом,
+        все строки вставляются одной пачкой в одной транзакции. Если хотя бы
+        одной позиции не хватает остатка, не записывается ничего. Если конфликт
+        версий партий не разрешился за max_retries повторов — VersionConflictError.
+        """
+        keys = sorted({(line["id_products"], line["id_warehous"]) for line in lines})
+        # Блокировки берутся в фиксированном порядке, чтобы параллельные заказы не заблокировали друг друга
+        return await retry_on_conflict(
+            lambda: self._attempt(db, keys, order_id, lines),
+            self.max_retries,
+            self.backoff,
+            locks=[lot_lock(key) for key in keys],
+            failure=f"Позиции заказа {order_id} не распределены",
+        )
+
+
+fifo_allocator = FifoAllocator()
@@ -0,0 +1,705 @@
+"""
+Архив истории заказов и поставок.
+
+Закрытые годы переносятся из оперативных таблиц в архивные <таблица>_archive_<год>
+той же структуры (без внешних ключей). Оперативные таблицы остаются небольшими,
+и повседневные запросы — остатки, оформление заказов, списки за текущий период —
+не читают историю; запросы за период, заходящий в архивные годы, читают
+оперативную таблицу вместе с архивами этих лет (см. ArchiveCatalog).
+
+Запуск из каталога backend:
+    python -m src.db.archive [--year 2023] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from sqlalchemy import Column, MetaData, Table, delete, func, insert, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from src.core.config import ARCHIVE_KEEP_YEARS, ARCHIVE_BATCH_SIZE, ARCHIVE_MAX_GROUP_SIZE
+from src.core.db_config import async_session, engine
+from src.db.models import (
+    ArchivePeriod, Base, OrderListItems, Orders, Supplies, SuppliesPayment, SupplyListItems, WriteOffsList
+)
+from src.db.stock import remaining_stock_subquery
+from src.db.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+PERIODS_TABLE = ArchivePeriod.__tablename__
+
+# Архивируемые таблицы; заказы и поставки делятся по годам своей даты, строки
+# остальных таблиц уходят в архив года своего документа
+ARCHIVE_DATE_COLUMNS = {Orders: "order_date", Supplies: "supp_date"}
+ARCHIVED_MODELS = (Orders, OrderListItems, Supplies, SupplyListItems, WriteOffsList, SuppliesPayment)
+
+# Список архивных лет перечитывается при изменении archive_periods в этом процессе,
+# а на случай переноса из другого процесса (CLI) — не реже чем раз в столько секунд
+CATALOG_TTL_SECONDS = 60
+
+# Списки id в условиях IN режутся на части такого размера (у MSSQL ограничение — 2100 параметров)
+IN_CHUNK_SIZE = 1000
+
+# Архивные таблицы не входят в Base.metadata: create_all их не создаёт, они появляются при переносе
+archive_metadata = MetaData()
+
+
+def archive_table(model: Type[Base], year: int) -> Table:
+    """Архивная таблица модели за год: те же колонки и индексы, без внешних ключей и автоинкремента"""
+    hot = model.__table__
+    name = f"{hot.name}_archive_{year}"
+    if name in archive_metadata.tables:
+        return archive_metadata.tables[name]
+    date_column = ARCHIVE_DATE_COLUMNS.get(model)
+    columns = [
+        Column(
+            column.name,
+            column.type,
+            primary_key=column.primary_key,
+            autoincrement=False,
+            nullable=column.nullable,
+            index=bool(column.index) or column.name == date_column,
+        )
+        for column in hot.columns
+    ]
+    return Table(name, archive_metadata, *columns)
+
+
+def archive_tables(model: Type[Base], years: Tuple[int, ...]) -> List[Table]:
+    """Оперативная таблица модели и её архивы за годы years"""
+    return [model.__table__, *(archive_table(model, year) for year in years)]
+
+
+@lru_cache(maxsize=None)
+def archived_entity(model: Type[Base], years: Tuple[int, ...]):
+    """
+    Сущность для запроса по оперативной таблице и архивам лет years:
+    сама модель, если лет нет, иначе модель поверх UNION ALL таблиц
+    (атрибуты те же, строки — экземпляры модели).
+    """
+    if not years:
+        return model
+    hot = model.__table__
+    parts = [select(*hot.columns)]
+    for year in years:
+        table = archive_table(model, year)
+        parts.append(select(*(table.c[column.name] for column in hot.columns)))
+    return aliased(model, union_all(*parts).subquery(f"{hot.name}_all"))
+
+
+class ArchiveCatalog:
+    """Какие годы уже (полностью или частично) перенесены в архив"""
+
+    def __init__(self):
+        self._years: Tuple[int, ...] = ()
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return (
+            self._version != table_versions.get(PERIODS_TABLE)
+            or time.monotonic() - self._loaded_at > CATALOG_TTL_SECONDS
+        )
+
+    async def years(self, db: AsyncSession) -> Tuple[int, ...]:
+        """Архивные годы по возрастанию"""
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    version = table_versions.get(PERIODS_TABLE)
+                    years = (await db.execute(select(ArchivePeriod.year).order_by(ArchivePeriod.year))).scalars()
+                    self._years = tuple(years)
+                    self._version = version
+                    self._loaded_at = time.monotonic()
+        return self._years
+
+    async def entity(
+        self,
+        db: AsyncSession,
+        model: Type[Base],
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        all_years: bool = False,
+    ):
+        """
+        Сущность для запроса за период: архивы подключаются, только если период
+        заходит в архивные годы (all_years — все архивы, например для итогов за всё время).
+        Без периода — только оперативная таблица.
+        """
+        if not all_years and date_from is None and date_to is None:
+            return model
+        years = tuple(
+            year for year in await self.years(db)
+            if all_years or (
+                (date_from is None or year >= date_from.year) and (date_to is None or year <= date_to.year)
+            )
+        )
+        return archived_entity(model, years)
+
+
+def _chunks(ids: List[int], size: int = IN_CHUNK_SIZE) -> List[List[int]]:
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def _period(summary: Dict[int, Dict[str, int]], year: int) -> Dict[str, int]:
+    return summary.setdefault(year, {"year": year, "orders": 0, "lots": 0, "supplies": 0})
+
+
+def _by_year(ids: List[int], years: Dict[int, int]) -> Dict[int, List[int]]:
+    grouped: Dict[int, List[int]] = {}
+    for document_id in ids:
+        grouped.setdefault(years[document_id], []).append(document_id)
+    return grouped
+
+
+# Порядок проходов по году и их номера в ключе владельца группы
+PHASES = ("orders", "lots", "supplies")
+
+# Узел графа связей: ("order", id) или ("lot", id)
+Node = Tuple[str, int]
+
+
+class ArchivePlan:
+    """
+    Окрестность пачки заказов/партий: найденные заказы и партии ({id: год документа}),
+    группы, в которые их связывают позиции заказов, и группы, которые переносить нельзя.
+
+    Заказы и партии, связанные позициями, образуют группы, которые переносятся только целиком
+    (одной транзакцией): иначе в оперативной таблице остался бы заказ без партии или партия
+    с остатком, выросшим на ушедшие в архив продажи. Группа с хотя бы одним запрещённым
+    узлом остаётся на месте.
+    """
+
+    def __init__(self):
+        self.orders: Dict[int, int] = {}
+        self.lots: Dict[int, int] = {}
+        # Система непересекающихся множеств по связям и корни групп с запрещёнными узлами
+        self._parent: Dict[Node, Node] = {}
+        self._blocked_roots: Set[Node] = set()
+
+    def find(self, node: Node) -> Node:
+        parent = self._parent
+        root = node
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while node != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def link(self, order_id: int, lot_id: int) -> None:
+        order_root, lot_root = self.find(("order", order_id)), self.find(("lot", lot_id))
+        if order_root == lot_root:
+            return
+        self._parent[order_root] = lot_root
+        if order_root in self._blocked_roots:
+            self._blocked_roots.discard(order_root)
+            self._blocked_roots.add(lot_root)
+
+    def block(self, node: Node) -> None:
+        self._blocked_roots.add(self.find(node))
+
+    def blocked(self, node: Node) -> bool:
+        """Узел в группе, которую переносить нельзя"""
+        return self.find(node) in self._blocked_roots
+
+    def blocked_nodes(self) -> List[Node]:
+        """Загруженные узлы групп, которые переносить нельзя"""
+        nodes = [("order", order_id) for order_id in self.orders] + [("lot", lot_id) for lot_id in self.lots]
+        return [node for node in nodes if self.blocked(node)]
+
+    def groups(self) -> List[Tuple[List[int], List[int]]]:
+        """Связные группы (заказы, партии) без запрещённых узлов"""
+        groups: Dict[Node, Tuple[List[int], List[int]]] = {}
+        for order_id in sorted(self.orders):
+            root = self.find(("order", order_id))
+            if root not in self._blocked_roots:
+                groups.setdefault(root, ([], []))[0].append(order_id)
+        for lot_id in sorted(self.lots):
+            root = self.find(("lot", lot_id))
+            if root not in self._blocked_roots:
+                groups.setdefault(root, ([], []))[1].append(lot_id)
+        return list(groups.values())
+
+    def owner(self, order_ids: List[int], lot_ids: List[int]) -> Tuple[int, int, int]:
+        """
+        Ключ (год, проход, id) документа группы, который встречается первым при проходе
+        по годам: группа переносится (и считается в dry_run) в пачке этого документа
+        """
+        keys = [(self.orders[order_id], 0, order_id) for order_id in order_ids]
+        keys.extend((self.lots[lot_id], 1, lot_id) for lot_id in lot_ids)
+        return min(keys)
+
+
+class ArchiveMover:
+    """
+    Перенос закрытых лет в архив пачками.
+
+    Переносится всё, что датировано раньше границы (1 января года, который ещё
+    держится в оперативных таблицах), если перенос не ломает остатки и связи:
+    - партия уходит в архив, только если её остаток нулевой и все заказы с ней тоже уходят;
+    - заказ уходит в архив, только если все его партии уходят в архив;
+    - поставка уходит, когда в оперативной таблице не остаётся её партий.
+    Так остатки по оперативным таблицам не меняются, а архивные позиции заказов ссылаются
+    только на архивные партии. Вместе с партиями переносятся их списания, с поставками — оплаты.
+    Строка с наибольшим id каждой таблицы остаётся в оперативной таблице, чтобы база
+    не выдала тот же id новой строке.
+
+    Годы обходятся по возрастанию, в каждом — заказы, партии и поставки года пачками
+    по batch_size в порядке id (keyset). Для пачки по связям order_list_items
+    подгружаются только связанные с ней заказы и партии (не больше max_group_size
+    документов), поэтому память не зависит от объёма истории. Пачка переносится
+    одной транзакцией вместе с курсором прохода (archive_periods.cursor_phase/cursor_id):
+    прерванный перенос продолжается с места остановки. Год попадает в archive_periods
+    до переноса первой пачки, так что запросы за этот год сразу читают и архив.
+    """
+
+    def __init__(
+        self,
+        keep_years: int = ARCHIVE_KEEP_YEARS,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        max_group_size: int = ARCHIVE_MAX_GROUP_SIZE,
+    ):
+        self.keep_years = keep_years
+        self.batch_size = batch_size
+        self.max_group_size = max_group_size
+        # Годы, подготовленные (таблицы и строка archive_periods) в текущем запуске
+        self._prepared: Set[int] = set()
+        # Узлы, про которые в текущем запуске уже известно, что они остаются на месте:
+        # следующие пачки не обходят их группы заново (не больше max_group_size узлов)
+        self._kept: Set[Node] = set()
+        self._lock = asyncio.Lock()
+
+    def last_closed_year(self, today: Optional[date] = None) -> int:
+        """Последний год, который можно переносить в архив"""
+        today = today or date.today()
+        return today.year - self.keep_years - 1
+
+    async def _pinned(self, db: AsyncSession) -> Tuple[Set[int], Set[int], Set[int]]:
+        """Заказы, партии и поставки, которым принадлежат строки с наибольшим id в своих таблицах"""
+        def last(model: Type[Base], column):
+            pk = model.__table__.primary_key.columns[0]
+            return select(column).where(pk == select(func.max(pk)).scalar_subquery()).scalar_subquery()
+
+        row = (await db.execute(select(
+            last(Orders, Orders.id_orders),
+            last(OrderListItems, OrderListItems.id_orders),
+            last(SupplyListItems, SupplyListItems.id_supply_list_items),
+            last(WriteOffsList, WriteOffsList.id_supply_list_items),
+            last(Supplies, Supplies.id_supplies),
+            last(SuppliesPayment, SuppliesPayment.id_supplies),
+        ))).one()
+        return set(row[0:2]) - {None}, set(row[2:4]) - {None}, set(row[4:6]) - {None}
+
+    async def plan(
+        self,
+        db: AsyncSession,
+        cutoff: date,
+        pinned: Tuple[Set[int], Set[int], Set[int]],
+        order_ids: Iterable[int] = (),
+        lot_ids: Iterable[int] = (),
+    ) -> ArchivePlan:
+        """
+        Заказы и партии, связанные с order_ids/lot_ids, и что из них нельзя переносить.
+
+        Граф обходится по order_list_items от запрошенных документов; от запрещённых
+        узлов (и узлов, уже оставленных на месте в этом запуске) обход не продолжается —
+        их группа всё равно остаётся на месте. Если
+        документов больше max_group_size, необойдённые узлы считаются запрещёнными.
+        """
+        pinned_orders, pinned_lots, _ = pinned
+        remaining = remaining_stock_subquery()
+        plan = ArchivePlan()
+        new_orders, new_lots = set(order_ids), set(lot_ids)
+        for node in [("order", order_id) for order_id in new_orders] + [("lot", lot_id) for lot_id in new_lots]:
+            if node in self._kept:
+                plan.block(node)
+        new_orders = {order_id for order_id in new_orders if ("order", order_id) not in self._kept}
+        new_lots = {lot_id for lot_id in new_lots if ("lot", lot_id) not in self._kept}
+        while new_orders or new_lots:
+            if len(plan.orders) + len(plan.lots) + len(new_orders) + len(new_lots) > self.max_group_size:
+                logger.warning(
+                    f"Группа связанных документов больше {self.max_group_size}, "
+                    f"заказы {sorted(new_orders)[:10]} и партии {sorted(new_lots)[:10]} остаются на месте"
+                )
+                for order_id in new_orders:
+                    plan.block(("order", order_id))
+                for lot_id in new_lots:
+                    plan.block(("lot", lot_id))
+                break
+
+            for chunk in _chunks(sorted(new_orders)):
+                for row in await db.execute(
+                    select(Orders.id_orders, Orders.order_date).where(Orders.id_orders.in_(chunk))
+                ):
+                    plan.orders[row.id_orders] = row.order_date.year
+                    if row.order_date >= cutoff or row.id_orders in pinned_orders:
+                        plan.block(("order", row.id_orders))
+            for chunk in _chunks(sorted(new_lots)):
+                for row in await db.execute(
+                    select(SupplyListItems.id_supply_list_items, Supplies.supp_date, remaining.label("remaining"))
+                    .outerjoin(Supplies, SupplyListItems.id_supplies == Supplies.id_supplies)
+                    .where(SupplyListItems.id_supply_list_items.in_(chunk))
+                ):
+                    lot_id = row.id_supply_list_items
+                    plan.lots[lot_id] = row.supp_date.year if row.supp_date is not None else cutoff.year
+                    if row.supp_date is None or row.supp_date >= cutoff or row.remaining > 0 or lot_id in pinned_lots:
+                        plan.block(("lot", lot_id))
+
+            # Группы с запрещённым узлом дальше не обходятся — они всё равно остаются на месте
+            open_orders = sorted(order_id for order_id in new_orders if not plan.blocked(("order", order_id)))
+            open_lots = sorted(lot_id for lot_id in new_lots if not plan.blocked(("lot", lot_id)))
+            links = []
+            for chunk in _chunks(open_orders):
+                links.extend(await db.execute(
+                    select(OrderListItems.id_orders, OrderListItems.id_supply_list_items)
+                    .where(OrderListItems.id_orders.in_(chunk)).distinct()
+                ))
+            for chunk in _chunks(open_lots):
+                links.extend(await db.execute(
+                    select(OrderListItems.id_orders, OrderListItems.id_supply_list_items)
+                    .where(OrderListItems.id_supply_list_items.in_(chunk)).distinct()
+                ))
+            for order_id, lot_id in links:
+                if lot_id is not None:
+                    plan.link(order_id, lot_id)
+                    for node in (("order", order_id), ("lot", lot_id)):
+                        if node in self._kept:
+                            plan.block(node)
+            new_orders = {
+                order_id for order_id, lot_id in links
+                if lot_id is not None and order_id not in plan.orders and not plan.blocked(("order", order_id))
+            }
+            new_lots = {
+                lot_id for _, lot_id in links
+                if lot_id is not None and lot_id not in plan.lots and not plan.blocked(("lot", lot_id))
+            }
+        kept = plan.blocked_nodes()
+        if len(self._kept) + len(kept) > self.max_group_size:
+            self._kept.clear()
+        self._kept.update(kept)
+        return plan
+
+    async def _seeds(self, db: AsyncSession, phase: str, year: int, after: int) -> List[int]:
+        """Следующая пачка документов года после id after (keyset)"""
+        start, end = date(year, 1, 1), date(year + 1, 1, 1)
+        if phase == "orders":
+            query = select(Orders.id_orders).where(
+                Orders.order_date >= start, Orders.order_date < end, Orders.id_orders > after
+            ).order_by(Orders.id_orders)
+        elif phase == "lots":
+            # Партии с остатком не переносятся — их и не берём
+            query = select(SupplyListItems.id_supply_list_items).join(
+                Supplies, SupplyListItems.id_supplies == Supplies.id_supplies
+            ).where(
+                Supplies.supp_date >= start, Supplies.supp_date < end,
+                SupplyListItems.id_supply_list_items > after,
+                remaining_stock_subquery() <= 0
+            ).order_by(SupplyListItems.id_supply_list_items)
+        else:
+            query = select(Supplies.id_supplies).where(
+                Supplies.supp_date >= start, Supplies.supp_date < end, Supplies.id_supplies > after
+            ).order_by(Supplies.id_supplies)
+        return list((await db.execute(query.limit(self.batch_size))).scalars())
+
+    async def _prepare(self, db: AsyncSession, years: List[int]) -> None:
+        """Создать архивные таблицы и отметить годы в archive_periods (один раз за запуск)"""
+        years = [year for year in years if year not in self._prepared]
+        if not years:
+            return
+        tables = [archive_table(model, year) for year in years for model in ARCHIVED_MODELS]
+        connection = await db.connection()
+        await connection.run_sync(lambda sync_conn: archive_metadata.create_all(sync_conn, tables=tables))
+        known = set((await db.execute(
+            select(ArchivePeriod.year).where(ArchivePeriod.year.in_(years))
+        )).scalars())
+        for year in years:
+            if year in known:
+                await db.execute(update(ArchivePeriod).where(ArchivePeriod.year == year).values(
+                    status="running", finished_at=None
+                ))
+            else:
+                db.add(ArchivePeriod(
+                    year=year, status="running", moved_orders=0, moved_lots=0, moved_supplies=0,
+                    started_at=datetime.now()
+                ))
+        await db.commit()
+        self._prepared.update(years)
+        table_versions.bump(PERIODS_TABLE)
+
+    async def _copy(self, db: AsyncSession, model: Type[Base], year: int, column, ids: List[int]) -> None:
+        """Скопировать строки модели с column из ids в архив года"""
+        hot = model.__table__
+        table = archive_table(model, year)
+        for chunk in _chunks(ids):
+            await db.execute(insert(table).from_select(
+                [column.name for column in hot.columns], select(*hot.columns).where(column.in_(chunk))
+            ))
+
+    async def _delete(self, db: AsyncSession, column, ids: List[int]) -> None:
+        for chunk in _chunks(ids):
+            await db.execute(delete(column.class_).where(column.in_(chunk)))
+
+    async def _closed(self, db: AsyncSession, order_ids: List[int], lot_ids: List[int]) -> bool:
+        """
+        Группа по-прежнему замкнута: её партии продавались только в её заказах, а у её
+        заказов нет других партий в оперативной таблице (проверяется в транзакции переноса)
+        """
+        orders, lots = set(order_ids), set(lot_ids)
+        for chunk in _chunks(lot_ids):
+            for order_id in (await db.execute(
+                select(OrderListItems.id_orders).where(OrderListItems.id_supply_list_items.in_(chunk))
+            )).scalars():
+                if order_id not in orders:
+                    return False
+        for chunk in _chunks(order_ids):
+            for lot_id in (await db.execute(
+                select(SupplyListItems.id_supply_list_items).join(
+                    OrderListItems, OrderListItems.id_supply_list_items == SupplyListItems.id_supply_list_items
+                ).where(OrderListItems.id_orders.in_(chunk))
+            )).scalars():
+                if lot_id not in lots:
+                    return False
+        return True
+
+    async def _save_cursor(self, db: AsyncSession, year: int, phase: Optional[str], cursor_id: Optional[int]) -> None:
+        await db.execute(update(ArchivePeriod).where(ArchivePeriod.year == year).values(
+            cursor_phase=phase, cursor_id=cursor_id
+        ))
+
+    async def _move_batch(self, db: AsyncSession, plan: ArchivePlan, groups: List[Tuple[List[int], List[int]]],
+                          year: int, phase: str, cursor_id: int, summary: Dict[int, Dict[str, int]]) -> None:
+        """Перенести группы пачки (заказы с позициями, партии со списаниями) и курсор одной транзакцией"""
+        # Годы документов пачки попадают в archive_periods до переноса
+        await self._prepare(db, sorted(
+            {plan.orders[order_id] for order_ids, _ in groups for order_id in order_ids}
+            | {plan.lots[lot_id] for _, lot_ids in groups for lot_id in lot_ids}
+        ))
+        moved: Dict[int, Dict[str, int]] = {}
+        try:
+            for order_ids, lot_ids in groups:
+                if not await self._closed(db, order_ids, lot_ids):
+                    logger.warning(
+                        f"Заказы {order_ids[:10]} и партии {lot_ids[:10]} остаются в оперативных таблицах: "
+                        f"после планирования появились связи с документами, которые в архив не идут"
+                    )
+                    continue
+                orders_by_year = _by_year(order_ids, plan.orders)
+                lots_by_year = _by_year(lot_ids, plan.lots)
+                for document_year, ids in orders_by_year.items():
+                    await self._copy(db, Orders, document_year, Orders.id_orders, ids)
+                    await self._copy(db, OrderListItems, document_year, OrderListItems.id_orders, ids)
+                    moved.setdefault(document_year, {"orders": 0, "lots": 0})["orders"] += len(ids)
+                for document_year, ids in lots_by_year.items():
+                    await self._copy(db, SupplyListItems, document_year, SupplyListItems.id_supply_list_items, ids)
+                    await self._copy(db, WriteOffsList, document_year, WriteOffsList.id_supply_list_items, ids)
+                    moved.setdefault(document_year, {"orders": 0, "lots": 0})["lots"] += len(ids)
+                await self._delete(db, OrderListItems.id_orders, order_ids)
+                await self._delete(db, WriteOffsList.id_supply_list_items, lot_ids)
+                await self._delete(db, SupplyListItems.id_supply_list_items, lot_ids)
+                await self._delete(db, Orders.id_orders, order_ids)
+            for document_year, counts in moved.items():
+                await db.execute(update(ArchivePeriod).where(ArchivePeriod.year == document_year).values(
+                    moved_orders=ArchivePeriod.moved_orders + counts["orders"],
+                    moved_lots=ArchivePeriod.moved_lots + counts["lots"],
+                ))
+            await self._save_cursor(db, year, phase, cursor_id)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        for document_year, counts in moved.items():
+            _period(summary, document_year)["orders"] += counts["orders"]
+            _period(summary, document_year)["lots"] += counts["lots"]
+        table_versions.bump("orders", "order_list_items", "supply_list_items", "write_offs_list", PERIODS_TABLE)
+
+    async def _movable_supplies(self, db: AsyncSession, cutoff: date, pinned: Tuple[Set[int], Set[int], Set[int]],
+                                ids: List[int]) -> List[int]:
+        """Поставки, у которых после переноса не останется партий в оперативной таблице (для dry_run)"""
+        lots_by_supply: Dict[int, List[int]] = {supply_id: [] for supply_id in ids if supply_id not in pinned[2]}
+        for chunk in _chunks(list(lots_by_supply)):
+            for lot_id, supply_id in await db.execute(
+                select(SupplyListItems.id_supply_list_items, SupplyListItems.id_supplies)
+                .where(SupplyListItems.id_supplies.in_(chunk))
+            ):
+                lots_by_supply[supply_id].append(lot_id)
+        plan = await self.plan(db, cutoff, pinned, lot_ids=[lot for lots in lots_by_supply.values() for lot in lots])
+        movable = {lot_id for _, lot_ids in plan.groups() for lot_id in lot_ids}
+        return [supply_id for supply_id, lot_ids in lots_by_supply.items() if movable.issuperset(lot_ids)]
+
+    async def _move_supplies(self, db: AsyncSession, year: int, ids: List[int], pinned_supplies: Set[int]) -> int:
+        """Перенести пачку поставок (без оставшихся партий) с оплатами и курсор; возвращает число поставок"""
+        cursor_id = ids[-1]
+        try:
+            kept = set((await db.execute(
+                select(SupplyListItems.id_supplies).where(SupplyListItems.id_supplies.in_(ids)).distinct()
+            )).scalars())
+            ids = [supply_id for supply_id in ids if supply_id not in kept and supply_id not in pinned_supplies]
+            if ids:
+                await self._prepare(db, [year])
+                await self._copy(db, Supplies, year, Supplies.id_supplies, ids)
+                await self._copy(db, SuppliesPayment, year, SuppliesPayment.id_supplies, ids)
+                await self._delete(db, SuppliesPayment.id_supplies, ids)
+                await self._delete(db, Supplies.id_supplies, ids)
+                await db.execute(update(ArchivePeriod).where(ArchivePeriod.year == year).values(
+                    moved_supplies=ArchivePeriod.moved_supplies + len(ids)
+                ))
+            await self._save_cursor(db, year, "supplies", cursor_id)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        table_versions.bump("supplies", "supplies_payment", PERIODS_TABLE)
+        return len(ids)
+
+    async def _first_year(self, db: AsyncSession) -> Optional[int]:
+        """Самый ранний год документов в оперативных таблицах"""
+        first_order, first_supply = (await db.execute(select(
+            select(func.min(Orders.order_date)).scalar_subquery(),
+            select(func.min(Supplies.supp_date)).scalar_subquery(),
+        ))).one()
+        dates = [value for value in (first_order, first_supply) if value is not None]
+        return min(dates).year if dates else None
+
+    async def _archive_year(self, db: AsyncSession, year: int, cutoff: date,
+                            pinned: Tuple[Set[int], Set[int], Set[int]], dry_run: bool,
+                            summary: Dict[int, Dict[str, int]]) -> None:
+        """Пройти документы года пачками: заказы, партии, затем поставки"""
+        phase, cursor_id = PHASES[0], 0
+        if not dry_run:
+            period = (await db.execute(
+                select(ArchivePeriod.status, ArchivePeriod.cursor_phase, ArchivePeriod.cursor_id)
+                .where(ArchivePeriod.year == year)
+            )).first()
+            if period is not None and period.status == "running" and period.cursor_phase in PHASES:
+                # Прерванный перенос продолжается с сохранённого курсора
+                phase, cursor_id = period.cursor_phase, period.cursor_id or 0
+
+        for phase in PHASES[PHASES.index(phase):]:
+            while True:
+                ids = await self._seeds(db, phase, year, cursor_id)
+                if not ids:
+                    break
+                cursor_id = ids[-1]
+                if phase == "supplies":
+                    if dry_run:
+                        _period(summary, year)["supplies"] += len(await self._movable_supplies(db, cutoff, pinned, ids))
+                    else:
+                        _period(summary, year)["supplies"] += await self._move_supplies(db, year, ids, pinned[2])
+                    continue
+                plan = await self.plan(
+                    db, cutoff, pinned,
+                    order_ids=ids if phase == "orders" else (),
+                    lot_ids=ids if phase == "lots" else (),
+                )
+                seeds = {(year, PHASES.index(phase), document_id) for document_id in ids}
+                groups = [group for group in plan.groups() if plan.owner(*group) in seeds]
+                if dry_run:
+                    for order_ids, lot_ids in groups:
+                        for order_id in order_ids:
+                            _period(summary, plan.orders[order_id])["orders"] += 1
+                        for lot_id in lot_ids:
+                            _period(summary, plan.lots[lot_id])["lots"] += 1
+                else:
+                    await self._move_batch(db, plan, groups, year, phase, cursor_id, summary)
+            cursor_id = 0
+
+        if not dry_run:
+            await db.execute(update(ArchivePeriod).where(ArchivePeriod.year == year).values(
+                status="done", finished_at=datetime.now(), cursor_phase=None, cursor_id=None
+            ))
+            await db.commit()
+            table_versions.bump(PERIODS_TABLE)
+
+    async def run(
+        self,
+        db: AsyncSession,
+        year: Optional[int] = None,
+        today: Optional[date] = None,
+        dry_run: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Перенести в архив всё, что можно, по год year включительно (по умолчанию —
+        по последний закрытый год). При dry_run только посчитать, что будет перенесено.
+        """
+        last_year = self.last_closed_year(today)
+        if year is None:
+            year = last_year
+        elif year > last_year:
+            raise ValueError(f"{year} год ещё не закрыт: в архив переносятся годы по {last_year} включительно")
+        cutoff = date(year + 1, 1, 1)
+
+        summary: Dict[int, Dict[str, int]] = {}
+        async with self._lock:
+            self._prepared.clear()
+            self._kept.clear()
+            first_year = await self._first_year(db)
+            pinned = await self._pinned(db)
+            if first_year is not None:
+                for period_year in range(first_year, year + 1):
+                    await self._archive_year(db, period_year, cutoff, pinned, dry_run, summary)
+            if not dry_run:
+                for period in summary.values():
+                    logger.info(
+                        f"Архив {period['year']}: перенесено заказов {period['orders']}, "
+                        f"партий {period['lots']}, поставок {period['supplies']}"
+                    )
+
+        periods = [summary[period_year] for period_year in sorted(summary)]
+        return {
+            "until": cutoff,
+            "dry_run": dry_run,
+            "orders": sum(period["orders"] for period in periods),
+            "lots": sum(period["lots"] for period in periods),
+            "supplies": sum(period["supplies"] for period in periods),
+            "years": periods,
+        }
+
+    async def periods(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        """Состояние переноса по годам"""
+        result = await db.execute(select(ArchivePeriod).order_by(ArchivePeriod.year))
+        return [
+            {
+                "year": period.year,
+                "status": period.status,
+                "moved_orders": period.moved_orders,
+                "moved_lots": period.moved_lots,
+                "moved_supplies": period.moved_supplies,
+                "started_at": period.started_at,
+                "finished_at": period.finished_at,
+            }
+            for period in result.scalars()
+        ]
+
+
+archive_catalog = ArchiveCatalog()
+archive_mover = ArchiveMover()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--year", type=int, help="переносить по этот год включительно (по умолчанию — последний закрытый)")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, что будет перенесено")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        async with async_session() as db:
+            result = await archive_mover.run(db, year=args.year, dry_run=args.dry_run)
+        action = "будет перенесено" if args.dry_run else "перенесено"
+        print(f"до {result['until']}: {action} заказов {result['orders']}, партий {result['lots']}, "
+              f"поставок {result['supplies']}")
+        for period in result["years"]:
+            print(f"  {period['year']}: заказов {period['orders']}, партий {period['lots']}, поставок {period['supplies']}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,588 @@
+"""
+Загрузка прайс-листов и поставок из CSV/XLSX.
+
+Файл читается потоком, пачками по IMPORT_CHUNK_ROWS строк. Пачка разбирается и проверяется:
+продукты, склады, поставщики и типы поставок ищутся в справочниках в памяти (ReferenceMaps),
+без запроса на строку. Корректные строки пачки вставляются одним INSERT, и пачка коммитится.
+В памяти одновременно только одна пачка; строки с ошибками пропускаются и попадают в отчёт
+с номером строки файла.
+
+Первая строка файла — заголовок с именами колонок, как у полей API (PRICE_LIST_COLUMNS,
+SUPPLY_COLUMNS); на справочник можно сослаться ключом (id_products) или именем (products_name).
+CSV — в UTF-8 через «,» или «;» (как сохраняет Excel с русской локалью), XLSX — первый лист,
+для него нужен пакет openpyxl.
+
+Запуск из каталога backend:
+    python -m src.db.bulk_import price-list prices.csv [--dry-run]
+    python -m src.db.bulk_import supplies deliveries.xlsx [--dry-run]
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import io
+import itertools
+import logging
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import IMPORT_CHUNK_ROWS, IMPORT_MAX_ERRORS
+from src.core.db_config import async_session, engine
+from src.core.metrics import registry
+from src.db.archive import IN_CHUNK_SIZE
+from src.db.db_service import insert_rows
+from src.db.models import PriseList, Products, Supplier, Supplies, SupplyListItems, SupplyType, Warehouse
+from src.db.table_versions import table_versions
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl не обязателен, без него загружаются только CSV
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+import_rows_total = registry.counter(
+    "import_rows_total", "Rows read from uploaded price list and supply files", ("kind", "result")
+)
+
+# Колонки файлов; из пар «ключ или имя» нужна одна
+PRICE_LIST_COLUMNS = ("id_products", "products_name", "prise_", "date_of_change", "descriptions")
+PRICE_LIST_REQUIRED = (("id_products", "products_name"), ("prise_",))
+SUPPLY_COLUMNS = (
+    "doc_num", "supp_date", "commenst", "id_supplier", "supplier_org_name", "id_supply_type", "supply_type",
+    "id_products", "products_name", "id_warehous", "warehous", "amount", "price", "comment",
+)
+SUPPLY_REQUIRED = (
+    ("id_supplier", "supplier_org_name"), ("id_products", "products_name"), ("id_warehous", "warehous"),
+    ("amount",), ("price",),
+)
+
+# Справочники, на которые ссылаются строки: таблица → (ключ, имя)
+REFERENCES = {
+    "products": (Products.id_products, Products.products_name),
+    "warehouse": (Warehouse.id_warehous, Warehouse.warehous),
+    "supplier": (Supplier.id_supplier, Supplier.supplier_org_name),
+    "supply_type": (SupplyType.id_supply_type, SupplyType.supply_type),
+}
+
+# Имя встречается в справочнике несколько раз — строку по нему сопоставить нельзя
+_AMBIGUOUS = -1
+
+XLSX_SIGNATURE = b"PK\x03\x04"
+CSV_DELIMITERS = (",", ";", "\t")
+
+# Верхняя граница сумм: DECIMAL(19, 4)
+MAX_MONEY = Decimal(10) ** 15
+
+# Ключ поставки в файле: строки с одинаковыми номером документа, поставщиком и датой — одна поставка
+SupplyKey = Tuple[Optional[str], int, date]
+
+
+def _int(value: Any) -> int:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise ValueError(f"«{value}» — не целое число")
+
+
+def _amount(value: Any) -> int:
+    amount = _int(value)
+    if amount <= 0:
+        raise ValueError(f"количество должно быть больше нуля, а не {amount}")
+    return amount
+
+
+def _money(value: Any) -> Decimal:
+    try:
+        if isinstance(value, Decimal):
+            result = value
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            result = Decimal(str(value))
+        else:
+            # «1 234,50» — так суммы выгружает Excel с русской локалью
+            result = Decimal(str(value).replace("\xa0", "").replace(" ", "").replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"«{value}» — не сумма")
+    if not result.is_finite() or result < 0 or result >= MAX_MONEY:
+        raise ValueError(f"недопустимая сумма {value}")
+    return result
+
+
+def _date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value)
+    try:
+        if "." in text:
+            day, month, year = text.split(".")
+            return date(int(year), int(month), int(day))
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        raise ValueError(f"«{value}» — не дата (ГГГГ-ММ-ДД или ДД.ММ.ГГГГ)")
+
+
+def _text(max_length: int) -> Callable[[Any], str]:
+    def parse(value: Any) -> str:
+        text = str(value)
+        if len(text) > max_length:
+            raise ValueError(f"длиннее {max_length} символов")
+        return text
+    return parse
+
+
+_doc_num = _text(20)
+_comment = _text(500)
+
+
+class ReferenceMaps:
+    """
+    Справочники для проверки ссылок в загружаемых строках: ключи и имя → ключ.
+    Держатся в памяти и перечитываются, когда меняется версия таблицы.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, Set[int]] = {}
+        self._names: Dict[str, Dict[str, int]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, db: AsyncSession, tables: Sequence[str]) -> None:
+        """Перечитать справочники, если их таблицы изменились"""
+        async with self._lock:
+            for table in tables:
+                version = table_versions.get(table)
+                if table in self._ids and self._versions.get(table) == version:
+                    continue
+                key, name = REFERENCES[table]
+                ids: Set[int] = set()
+                names: Dict[str, int] = {}
+                for row_id, row_name in await db.execute(select(key, name)):
+                    ids.add(row_id)
+                    if row_name:
+                        folded = row_name.strip().casefold()
+                        names[folded] = _AMBIGUOUS if folded in names else row_id
+                self._ids[table] = ids
+                self._names[table] = names
+                self._versions[table] = version
+
+    def resolve(self, table: str, key: Any, name: Any) -> int:
+        """Ключ записи справочника по ключу или имени; ValueError, если записи нет"""
+        if key is not None:
+            key = _int(key)
+            if key not in self._ids[table]:
+                raise ValueError(f"нет записи {table} с ключом {key}")
+            return key
+        found = self._names[table].get(str(name).strip().casefold())
+        if found is None:
+            raise ValueError(f"нет записи {table} с именем «{name}»")
+        if found == _AMBIGUOUS:
+            raise ValueError(f"в {table} несколько записей с именем «{name}», укажите ключ")
+        return found
+
+
+class _RowCheck:
+    """Разбор значений одной строки файла с накоплением ошибок по колонкам"""
+
+    __slots__ = ("values", "columns", "refs", "problems")
+
+    def __init__(self, values: Sequence[Any], columns: Dict[str, int], refs: ReferenceMaps):
+        self.values = values
+        self.columns = columns
+        self.refs = refs
+        self.problems: List[Tuple[str, str]] = []
+
+    def cell(self, name: str) -> Any:
+        index = self.columns.get(name)
+        if index is None or index >= len(self.values):
+            return None
+        value = self.values[index]
+        if isinstance(value, str):
+            value = value.strip()
+            return value or None
+        return value
+
+    def value(self, name: str, parse: Callable[[Any], Any], required: bool = False, default: Any = None) -> Any:
+        raw = self.cell(name)
+        if raw is None:
+            if required:
+                self.problems.append((name, "не заполнено"))
+            return default
+        try:
+            return parse(raw)
+        except ValueError as e:
+            self.problems.append((name, str(e)))
+            return default
+
+    def reference(self, table: str, key_column: str, name_column: str, required: bool = True) -> Optional[int]:
+        key, name = self.cell(key_column), self.cell(name_column)
+        if key is None and name is None:
+            if required:
+                self.problems.append((key_column, "не заполнено"))
+            return None
+        try:
+            return self.refs.resolve(table, key, name)
+        except ValueError as e:
+            self.problems.append((key_column if key is not None else name_column, str(e)))
+            return None
+
+
+def _csv_rows(file: IO[bytes], encoding: str) -> Iterator[Tuple[int, Sequence[Any]]]:
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise ValueError(f"Неизвестная кодировка {encoding}")
+    text = io.TextIOWrapper(file, encoding=encoding, newline="")
+    try:
+        header = text.readline()
+        delimiter = max(CSV_DELIMITERS, key=header.count)
+        reader = csv.reader(itertools.chain([header], text), delimiter=delimiter)
+        for values in reader:
+            if any(values):
+                yield reader.line_num, values
+    finally:
+        # Файл закрывает тот, кто его открыл
+        text.detach()
+
+
+def _xlsx_rows(file: IO[bytes]) -> Iterator[Tuple[int, Sequence[Any]]]:
+    if openpyxl is None:
+        raise ValueError("Для загрузки XLSX нужен пакет openpyxl")
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f"Не удалось открыть XLSX: {e}")
+    try:
+        sheet = workbook.worksheets[0]
+        for row_no, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+            if any(value is not None and value != "" for value in values):
+                yield row_no, values
+    finally:
+        workbook.close()
+
+
+def file_rows(file: IO[bytes], encoding: str = "utf-8-sig") -> Iterator[Tuple[int, Sequence[Any]]]:
+    """Строки файла (номер строки, значения), начиная с заголовка; XLSX узнаётся по сигнатуре zip"""
+    signature = file.read(len(XLSX_SIGNATURE))
+    file.seek(0)
+    if signature == XLSX_SIGNATURE:
+        return _xlsx_rows(file)
+    return _csv_rows(file, encoding)
+
+
+def _columns(header: Sequence[Any], known: Sequence[str], required: Sequence[Tuple[str, ...]]) -> Dict[str, int]:
+    """Позиции известных колонок по заголовку; ValueError, если обязательной колонки нет"""
+    columns: Dict[str, int] = {}
+    for index, name in enumerate(header):
+        name = str(name).strip().lower() if name is not None else ""
+        if name in known and name not in columns:
+            columns[name] = index
+    for alternatives in required:
+        if not any(name in columns for name in alternatives):
+            raise ValueError(f"В заголовке файла нет колонки {' или '.join(alternatives)}")
+    return columns
+
+
+class ImportReport:
+    """Итог загрузки: сколько строк прочитано, записано и отклонено, ошибки по строкам"""
+
+    def __init__(self, kind: str, dry_run: bool, max_errors: int):
+        self.kind = kind
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.rows = 0
+        self.imported = 0
+        self.rejected = 0
+        self.supplies = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.errors_truncated = False
+        self.aborted: Optional[str] = None
+
+    def reject(self, row_no: int, problems: Sequence[Tuple[str, str]]) -> None:
+        self.rejected += 1
+        for column, message in problems:
+            if len(self.errors) >= self.max_errors:
+                self.errors_truncated = True
+                return
+            self.errors.append({"row": row_no, "column": column, "message": message})
+
+    def as_dict(self, elapsed: float) -> Dict[str, Any]:
+        result = {
+            "kind": self.kind,
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            # Ошибки разбора и ошибки записи пачки собираются в разное время — в отчёте они по порядку строк
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.errors_truncated,
+            "aborted": self.aborted,
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }
+        if self.kind == "supplies":
+            result["supplies"] = self.supplies
+        return result
+
+
+class BulkImporter:
+    """
+    Потоковая загрузка прайс-листов и поставок пачками.
+
+    Каждая пачка записывается своей транзакцией: при ошибке БД загрузка останавливается,
+    записанными остаются предыдущие пачки, и отчёт возвращается как обычно — с числом
+    записанных строк и диапазоном строк непрошедшей пачки в aborted. Повторная загрузка
+    поставок отклонит строки уже загруженных документов, прайс-лист же лучше сначала
+    проверить с dry_run. Позиции одной поставки, разнесённые по разным пачкам, добавляются
+    к поставке, созданной этой же загрузкой.
+    """
+
+    def __init__(self, chunk_rows: int = IMPORT_CHUNK_ROWS, max_errors: int = IMPORT_MAX_ERRORS):
+        self.chunk_rows = chunk_rows
+        self.max_errors = max_errors
+
+    def _parse_chunk(
+        self,
+        rows: Iterator[Tuple[int, Sequence[Any]]],
+        parse_line: Callable[[_RowCheck], Any],
+        columns: Dict[str, int],
+        report: ImportReport,
+    ) -> Tuple[int, List[Tuple[int, Any]]]:
+        """Прочитать и разобрать следующую пачку строк: (прочитано, [(номер строки, разобранная строка)])"""
+        read = 0
+        lines = []
+        try:
+            for row_no, values in itertools.islice(rows, self.chunk_rows):
+                read += 1
+                row = _RowCheck(values, columns, reference_maps)
+                line = parse_line(row)
+                if row.problems:
+                    report.reject(row_no, row.problems)
+                else:
+                    lines.append((row_no, line))
+        except (UnicodeDecodeError, csv.Error) as e:
+            report.aborted = f"Файл прочитан не до конца: {e}"
+        report.rows += read
+        return read, lines
+
+    async def _load(
+        self,
+        db: AsyncSession,
+        file: IO[bytes],
+        report: ImportReport,
+        encoding: str,
+        known: Sequence[str],
+        required: Sequence[Tuple[str, ...]],
+        tables: Sequence[str],
+        parse_line: Callable[[_RowCheck], Any],
+        write: Callable[[AsyncSession, List[Tuple[int, Any]], ImportReport], Any],
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        rows = file_rows(file, encoding)
+        try:
+            try:
+                header = next(rows, None)
+            except UnicodeDecodeError as e:
+                raise ValueError(f"Файл не в кодировке {encoding}: {e}")
+            if header is None:
+                raise ValueError("Файл пуст")
+            columns = _columns(header[1], known, required)
+            await reference_maps.refresh(db, tables)
+            while report.aborted is None:
+                # Разбор — в потоке, чтобы большой файл не держал цикл событий между запросами к БД
+                read, lines = await asyncio.to_thread(self._parse_chunk, rows, parse_line, columns, report)
+                if not read:
+                    break
+                if lines:
+                    try:
+                        await write(db, lines, report)
+                    except SQLAlchemyError as e:
+                        # Предыдущие пачки уже записаны — вернуть отчёт о них вместо ошибки
+                        logger.error(f"Загрузка {report.kind}: пачка строк {lines[0][0]}–{lines[-1][0]} не записана: {e}")
+                        report.aborted = (
+                            f"Ошибка записи строк {lines[0][0]}–{lines[-1][0]}: {getattr(e, 'orig', None) or e}. "
+                            f"Записанные до неё строки ({report.imported}) остались в БД, остальные не загружены"
+                        )
+        finally:
+            rows.close()
+        import_rows_total.inc(report.imported, kind=report.kind, result="imported")
+        import_rows_total.inc(report.rejected, kind=report.kind, result="rejected")
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Загрузка {report.kind}: строк {report.rows}, записано {report.imported}, "
+            f"отклонено {report.rejected} за {elapsed:.1f} с"
+        )
+        return report.as_dict(elapsed)
+
+    async def import_price_list(
+        self, db: AsyncSession, file: IO[bytes], encoding: str = "utf-8-sig", dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Загрузить цены: строка файла — новая запись prise_list (продукт, цена, дата
+        изменения — по умолчанию сегодня, описание). dry_run — только проверить файл.
+        """
+        today = date.today()
+
+        def parse_line(row: _RowCheck) -> Dict[str, Any]:
+            return {
+                "id_products": row.reference("products", "id_products", "products_name"),
+                "prise_": row.value("prise_", _money, required=True),
+                "date_of_change": row.value("date_of_change", _date, default=today),
+                "descriptions": row.value("descriptions", _comment),
+                "version": 1,
+            }
+
+        async def write(db: AsyncSession, lines: List[Tuple[int, Any]], report: ImportReport) -> None:
+            if not dry_run:
+                try:
+                    await db.execute(insert(PriseList), [line for _, line in lines])
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+                table_versions.bump("prise_list")
+            report.imported += len(lines)
+
+        report = ImportReport("price_list", dry_run, self.max_errors)
+        return await self._load(
+            db, file, report, encoding, PRICE_LIST_COLUMNS, PRICE_LIST_REQUIRED, ("products",), parse_line, write
+        )
+
+    async def _existing_supplies(self, db: AsyncSession, keys: Sequence[SupplyKey]) -> Dict[SupplyKey, int]:
+        """Поставки из keys, которые уже есть в БД (сравниваются только поставки с номером документа)"""
+        doc_nums = sorted({doc_num for doc_num, _, _ in keys if doc_num is not None})
+        wanted = set(keys)
+        existing = {}
+        for start in range(0, len(doc_nums), IN_CHUNK_SIZE):
+            result = await db.execute(select(
+                Supplies.id_supplies, Supplies.doc_num, Supplies.id_supplier, Supplies.supp_date
+            ).where(Supplies.doc_num.in_(doc_nums[start:start + IN_CHUNK_SIZE])))
+            for row in result:
+                key = (row.doc_num, row.id_supplier, row.supp_date)
+                if key in wanted:
+                    existing[key] = row.id_supplies
+        return existing
+
+    async def import_supplies(
+        self, db: AsyncSession, file: IO[bytes], encoding: str = "utf-8-sig", dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Загрузить поставки: строка файла — позиция поставки (продукт, склад, количество,
+        цена, комментарий) с реквизитами документа (номер, дата — по умолчанию сегодня,
+        поставщик, тип, комментарий). Строки с одинаковыми номером, поставщиком и датой
+        составляют одну поставку, её реквизиты берутся из первой строки. Строки поставок,
+        которые уже есть в БД, отклоняются. dry_run — только проверить файл.
+        """
+        today = date.today()
+        # Поставки, созданные этой загрузкой (в dry_run — без ключа), и найденные в БД до неё
+        created: Dict[SupplyKey, Optional[int]] = {}
+        loaded: Dict[SupplyKey, int] = {}
+
+        def parse_line(row: _RowCheck) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+            supply = {
+                "doc_num": row.value("doc_num", _doc_num),
+                "supp_date": row.value("supp_date", _date, default=today),
+                "commenst": row.value("commenst", _comment),
+                "id_supplier": row.reference("supplier", "id_supplier", "supplier_org_name"),
+                "id_supply_type": row.reference("supply_type", "id_supply_type", "supply_type", required=False),
+            }
+            item = {
+                "id_products": row.reference("products", "id_products", "products_name"),
+                "id_warehous": row.reference("warehouse", "id_warehous", "warehous"),
+                "amount": row.value("amount", _amount, required=True),
+                "price": row.value("price", _money, required=True),
+                "comment": row.value("comment", _comment),
+                "version": 1,
+            }
+            return supply, item
+
+        async def write(db: AsyncSession, lines: List[Tuple[int, Any]], report: ImportReport) -> None:
+            new: Dict[SupplyKey, Dict[str, Any]] = {}
+            for _, (supply, _) in lines:
+                key = (supply["doc_num"], supply["id_supplier"], supply["supp_date"])
+                if key not in created and key not in loaded and key not in new:
+                    new[key] = supply
+            loaded.update(await self._existing_supplies(db, list(new)))
+            headers = {key: supply for key, supply in new.items() if key not in loaded}
+
+            items = []
+            for row_no, (supply, item) in lines:
+                key = (supply["doc_num"], supply["id_supplier"], supply["supp_date"])
+                if key in loaded:
+                    report.reject(row_no, [("doc_num", f"поставка уже загружена (id_supplies {loaded[key]})")])
+                else:
+                    items.append((key, item))
+
+            if not dry_run:
+                try:
+                    if headers:
+                        rows = await insert_rows(db, Supplies, list(headers.values()))
+                        for key, row in zip(headers, rows):
+                            created[key] = row["id_supplies"]
+                    if items:
+                        await db.execute(
+                            insert(SupplyListItems), [{**item, "id_supplies": created[key]} for key, item in items]
+                        )
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+                table_versions.bump("supplies", "supply_list_items")
+            else:
+                created.update(dict.fromkeys(headers))
+            report.supplies += len(headers)
+            report.imported += len(items)
+
+        report = ImportReport("supplies", dry_run, self.max_errors)
+        return await self._load(
+            db, file, report, encoding, SUPPLY_COLUMNS, SUPPLY_REQUIRED, tuple(REFERENCES), parse_line, write
+        )
+
+
+reference_maps = ReferenceMaps()
+bulk_importer = BulkImporter()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=("price-list", "supplies"), help="что загружается")
+    parser.add_argument("path", help="файл CSV или XLSX")
+    parser.add_argument("--encoding", default="utf-8-sig", help="кодировка CSV (например, cp1251)")
+    parser.add_argument("--dry-run", action="store_true", help="только проверить файл")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    load = bulk_importer.import_price_list if args.kind == "price-list" else bulk_importer.import_supplies
+    try:
+        with open(args.path, "rb") as file:
+            async with async_session() as db:
+                report = await load(db, file, encoding=args.encoding, dry_run=args.dry_run)
+        action = "прошло проверку" if args.dry_run else "записано"
+        print(f"строк {report['rows']}: {action} {report['imported']}, отклонено {report['rejected']}"
+              f" за {report['elapsed_ms'] / 1000:.1f} с")
+        if "supplies" in report:
+            print(f"поставок {report['supplies']}")
+        for error in report["errors"]:
+            print(f"  строка {error['row']}, {error['column']}: {error['message']}")
+        if report["errors_truncated"]:
+            print("  ...")
+        if report["aborted"]:
+            print(report["aborted"])
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
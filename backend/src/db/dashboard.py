@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import case, cast, distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import DASHBOARD_CONCURRENCY, DASHBOARD_QUERY_TIMEOUT_SECONDS
+from src.core.db_config import read_router
+from src.core.metrics import registry
+from src.db.archive import archive_catalog
+from src.db.models import (
+    Customer, CustomerType, EmplSalary, Money, OrderListItems, Orders, Products,
+    Supplies, SuppliesPayment, SupplyListItems, WriteOffsList
+)
+from src.db.query_cache import query_cache
+
+logger = logging.getLogger(__name__)
+
+dashboard_section_duration = registry.histogram(
+    "dashboard_section_duration_seconds", "Duration of one dashboard section query", ("section",)
+)
+dashboard_section_failures_total = registry.counter(
+    "dashboard_section_failures_total", "Dashboard sections returned empty", ("section", "reason")
+)
+
+# Раздел сводки: (сессия, начало периода, конец периода) → данные раздела
+Section = Callable[[AsyncSession, date, date], Awaitable[Dict[str, Any]]]
+
+# Сессия на чтение для раздела (реплика или основная БД, как у остальных отчётов)
+_read_session = asynccontextmanager(read_router.session)
+
+TOP_PRODUCTS = 5
+
+
+async def sales_section(db: AsyncSession, date_from: date, date_to: date) -> Dict[str, Any]:
+    """Продажи за период: заказы, покупатели, штуки, выручка"""
+    Order = await archive_catalog.entity(db, Orders, date_from, date_to)
+    Item = await archive_catalog.entity(db, OrderListItems, date_from, date_to)
+    line_total = func.coalesce(Item.price_with_discount, 0) * func.coalesce(Item.amount, 0)
+    row = (await query_cache.execute(db, select(
+        func.count(distinct(Order.id_orders)).label("orders"),
+        func.count(distinct(Order.id_customer)).label("customers"),
+        func.coalesce(func.sum(Item.amount), 0).label("items"),
+        cast(func.coalesce(func.sum(line_total), 0), Money).label("revenue")
+    ).select_from(Order).outerjoin(
+        Item, Item.id_orders == Order.id_orders
+    ).where(Order.order_date.between(date_from, date_to)))).one()
+    return {
+        "orders": row.orders,
+        "customers": row.customers,
+        "items": row.items,
+        "revenue": row.revenue,
+        "average_order": row.revenue / row.orders if row.orders else None,
+    }
+
+
+async def top_products_section(db: AsyncSession, date_from: date, date_to: date) -> Dict[str, Any]:
+    """Самые продаваемые за период продукты по выручке"""
+    Order = await archive_catalog.entity(db, Orders, date_from, date_to)
+    Item = await archive_catalog.entity(db, OrderListItems, date_from, date_to)
+    # Архивная позиция может ссылаться на партию из архива более раннего года
+    Lot = await archive_catalog.entity(db, SupplyListItems, all_years=Order is not Orders)
+    revenue = func.sum(func.coalesce(Item.price_with_discount, 0) * func.coalesce(Item.amount, 0))
+    result = await query_cache.execute(db, select(
+        Products.id_products,
+        Products.products_name,
+        func.coalesce(func.sum(Item.amount), 0).label("amount"),
+        cast(func.coalesce(revenue, 0), Money).label("revenue")
+    ).select_from(Item).join(
+        Order, Item.id_orders == Order.id_orders
+    ).join(
+        Lot, Item.id_supply_list_items == Lot.id_supply_list_items
+    ).join(
+        Products, Lot.id_products == Products.id_products
+    ).where(
+        Order.order_date.between(date_from, date_to)
+    ).group_by(
+        Products.id_products, Products.products_name
+    ).order_by(revenue.desc()).limit(TOP_PRODUCTS))
+    return {
+        "products": [
+            {"id_products": row.id_products, "name": row.products_name, "amount": row.amount, "revenue": row.revenue}
+            for row in result
+        ]
+    }
+
+
+async def customers_section(db: AsyncSession, date_from: date, date_to: date) -> Dict[str, Any]:
+    """Клиенты по типам: всего и зарегистрированных за период"""
+    result = await query_cache.execute(db, select(
+        Customer.id_customer_type,
+        CustomerType.customer_type,
+        func.count().label("total"),
+        func.coalesce(func.sum(case((Customer.reg_date.between(date_from, date_to), 1), else_=0)), 0).label("new")
+    ).outerjoin(
+        CustomerType, Customer.id_customer_type == CustomerType.id_customer_type
+    ).group_by(Customer.id_customer_type, CustomerType.customer_type))
+    by_type = [
+        {"id": row.id_customer_type, "name": row.customer_type, "total": row.total, "new": row.new}
+        for row in result
+    ]
+    return {
+        "total": sum(row["total"] for row in by_type),
+        "new": sum(row["new"] for row in by_type),
+        "by_type": by_type,
+    }
+
+
+async def supplies_section(db: AsyncSession, date_from: date, date_to: date) -> Dict[str, Any]:
+    """Поставки за период: число, партии, штуки и закупочная стоимость"""
+    Supply = await archive_catalog.entity(db, Supplies, date_from, date_to)
+    Lot = await archive_catalog.entity(db, SupplyListItems, date_from, date_to)
+    cost = func.coalesce(Lot.price, 0) * func.coalesce(Lot.amount, 0)
+    row = (await query_cache.execute(db, select(
+        func.count(distinct(Supply.id_supplies)).label("supplies"),
+        func.count(Lot.id_supply_list_items).label("lots"),
+        func.coalesce(func.sum(Lot.amount), 0).label("amount"),
+        cast(func.coalesce(func.sum(cost), 0), Money).label("cost")
+    ).select_from(Supply).outerjoin(
+        Lot, Lot.id_supplies == Supply.id_supplies
+    ).where(Supply.supp_date.between(date_from, date_to)))).one()
+    return {"supplies": row.supplies, "lots": row.lots, "amount": row.amount, "cost": row.cost}
+
+
+async def accountant_section(db: AsyncSession, date_from: date, date_to: date) -> Dict[str, Any]:
+    """Расходы за период: оплаты поставщикам, зарплаты, списания"""
+    # Оплаты и списания архивируются в год своей поставки, а не по своей дате,
+    # поэтому строки за период могут лежать в архиве любого года
+    Payment = await archive_catalog.entity(db, SuppliesPayment, all_years=True)
+    WriteOff = await archive_catalog.entity(db, WriteOffsList, all_years=True)
+    Lot = await archive_catalog.entity(db, SupplyListItems, all_years=WriteOff is not WriteOffsList)
+    payments = select(func.coalesce(func.sum(Payment.payment_amount), 0)).where(
+        Payment.payment_date.between(date_from, date_to)
+    ).scalar_subquery()
+    salaries = select(func.coalesce(func.sum(EmplSalary.salary), 0)).where(
+        EmplSalary.sal_date.between(date_from, date_to)
+    ).scalar_subquery()
+    in_period = WriteOff.write_off_date.between(date_from, date_to)
+    written_off = select(func.coalesce(func.sum(WriteOff.amount), 0)).where(in_period).scalar_subquery()
+    written_off_cost = select(
+        func.coalesce(func.sum(func.coalesce(WriteOff.amount, 0) * func.coalesce(Lot.price, 0)), 0)
+    ).select_from(WriteOff).join(
+        Lot, WriteOff.id_supply_list_items == Lot.id_supply_list_items
+    ).where(in_period).scalar_subquery()
+    row = (await query_cache.execute(db, select(
+        cast(payments, Money).label("supplier_payments"),
+        cast(salaries, Money).label("salaries"),
+        written_off.label("written_off"),
+        cast(written_off_cost, Money).label("written_off_cost")
+    ))).one()
+    return {
+        "supplier_payments": row.supplier_payments,
+        "salaries": row.salaries,
+        "write_offs": {"amount": row.written_off, "cost": row.written_off_cost},
+    }
+
+
+# Разделы сводки и таблицы, которые они читают (для выбора реплики)
+SECTIONS: Dict[str, Tuple[Section, Sequence[str]]] = {
+    "sales": (sales_section, ("orders", "order_list_items")),
+    "top_products": (top_products_section, ("orders", "order_list_items", "supply_list_items", "products")),
+    "customers": (customers_section, ("customer", "customer_type")),
+    "supplies": (supplies_section, ("supplies", "supply_list_items")),
+    "accountant": (accountant_section, ("supplies_payment", "empl_salary", "write_offs_list", "supply_list_items")),
+}
+
+
+class Dashboard:
+    """
+    Сводка для главной страницы и страниц отчётов.
+
+    Разделы независимы, поэтому выполняются одновременно, каждый на своей сессии
+    (своём соединении из пула), не больше concurrency за раз на запрос — время ответа
+    определяется самым медленным разделом, а не суммой. Раздел, не уложившийся в timeout
+    или упавший, возвращается пустым (с причиной в failed), остальные отдаются как есть.
+    Результаты разделов кэшируются в query_cache до изменения их таблиц.
+    """
+
+    def __init__(
+        self,
+        sections: Dict[str, Tuple[Section, Sequence[str]]] = SECTIONS,
+        concurrency: int = DASHBOARD_CONCURRENCY,
+        timeout: float = DASHBOARD_QUERY_TIMEOUT_SECONDS,
+    ):
+        self.sections = sections
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    async def _query(self, name: str, client: str, date_from: date, date_to: date) -> Dict[str, Any]:
+        section, tables = self.sections[name]
+        async with _read_session(client, tables) as db:
+            return await section(db, date_from, date_to)
+
+    async def _section(
+        self, name: str, client: str, date_from: date, date_to: date, semaphore: asyncio.Semaphore
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                return await asyncio.wait_for(self._query(name, client, date_from, date_to), self.timeout), None
+            except asyncio.TimeoutError:
+                logger.warning(f"Раздел сводки {name} не уложился в {self.timeout} с")
+                reason = "timeout"
+            except Exception as e:
+                logger.error(f"Ошибка в разделе сводки {name}: {e}")
+                reason = "error"
+            finally:
+                dashboard_section_duration.observe(time.perf_counter() - started, section=name)
+        dashboard_section_failures_total.inc(section=name, reason=reason)
+        return None, reason
+
+    async def build(
+        self,
+        client: str = "",
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        sections: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Сводка за период (по умолчанию — с начала текущего месяца по сегодня).
+        sections — только эти разделы; неизвестный раздел — ValueError.
+        """
+        date_to = date_to or date.today()
+        date_from = date_from or date_to.replace(day=1)
+        names = list(dict.fromkeys(sections)) if sections else list(self.sections)
+        unknown = [name for name in names if name not in self.sections]
+        if unknown:
+            raise ValueError(f"Неизвестные разделы сводки: {', '.join(unknown)}")
+
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(
+            self._section(name, client, date_from, date_to, semaphore) for name in names
+        ))
+        return {
+            "date_from": date_from,
+            "date_to": date_to,
+            "sections": {name: data for name, (data, _) in zip(names, results)},
+            "failed": {name: reason for name, (_, reason) in zip(names, results) if reason is not None},
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+
+dashboard = Dashboard()
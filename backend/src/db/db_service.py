@@ -1,15 +1,86 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
-from sqlalchemy import select, update, delete, insert
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Generic, Iterable, List, Optional, Set, Tuple, Type, TypeVar, Union
+from sqlalchemy import select, update, delete, insert, func, bindparam, cast, literal, null, union_all, Date, Integer, Unicode
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from src.db.models import *
+from src.db.table_versions import table_versions
+from src.db.query_cache import query_cache
+from src.db.stock import remaining_stock_subquery
+from src.db.archive import ARCHIVE_DATE_COLUMNS, archive_catalog, archive_tables, archived_entity
+from src.core.metrics import observe_db_call
+from src.core.db_backends import dialect_features
+from src.db.order_events import publish_order_event, ORDER_CREATED, ORDER_STATUS_CHANGED
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def model_to_dict(obj: Base) -> Dict[str, Any]:
+    """Преобразовать ORM-объект в словарь по колонкам таблицы"""
+    return {column.name: getattr(obj, column.name) for column in obj.__table__.columns}
+
+
+async def insert_returning(db: AsyncSession, model: Type[ModelType], row: Dict[str, Any]) -> ModelType:
+    """
+    Вставить запись в текущей транзакции (без коммита) и получить её вместе
+    с ключом и серверными значениями по умолчанию одним запросом
+    """
+    if dialect_features(db.get_bind().dialect).returning:
+        return (await db.scalars(insert(model).returning(model), [row])).one()
+    db_obj = model(**row)
+    db.add(db_obj)
+    await db.flush()
+    await db.refresh(db_obj)
+    return db_obj
+
+
+async def insert_rows(db: AsyncSession, model: Type[ModelType], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Вставить строки одной пачкой в текущей транзакции (без коммита)
+    и проставить им первичные ключи
+    """
+    key = model.__table__.primary_key.columns.values()[0]
+    if dialect_features(db.get_bind().dialect).bulk_returning:
+        # Один INSERT ... OUTPUT/RETURNING на пачку, ключи в порядке строк
+        result = await db.execute(insert(model).returning(key, sort_by_parameter_order=True), rows)
+        ids = result.scalars().all()
+    else:
+        db_objs = [model(**row) for row in rows]
+        db.add_all(db_objs)
+        await db.flush()
+        ids = [getattr(db_obj, key.key) for db_obj in db_objs]
+    for row, id in zip(rows, ids):
+        row[key.name] = id
+    return rows
+
+
+class UnknownReferenceError(Exception):
+    """Строки ссылаются на несуществующие записи справочников"""
+
+    def __init__(self, missing: Dict[str, List[int]]):
+        self.missing = missing
+        details = "; ".join(f"{table}: {', '.join(map(str, ids))}" for table, ids in missing.items())
+        super().__init__(f"Не найдены записи {details}")
+
+
+class VersionConflictError(Exception):
+    """Запись изменена другим пользователем после того, как её прочитали"""
+
+    def __init__(self, table: str, id: int, expected: int, actual: Optional[int]):
+        self.table = table
+        self.id = id
+        self.expected = expected
+        self.actual = actual
+        message = f"Запись {table} #{id} изменена: ожидалась версия {expected}"
+        if actual is not None:
+            message += f", текущая {actual}"
+        super().__init__(message)
+
+
 class DBService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
     Базовый класс сервиса для работы с базой данных
@@ -17,7 +88,10 @@ class DBService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
     def __init__(self, model: Type[ModelType]):
         self.model = model
+        # Таблицы с колонкой version обновляются со сравнением версии (оптимистичная блокировка)
+        self.versioned = "version" in model.__table__.columns
 
+    @observe_db_call
     async def get(self, db: AsyncSession, id: int) -> Optional[ModelType]:
         """
         Получить запись по идентификатору
@@ -26,52 +100,122 @@ class DBService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await db.execute(query)
         return result.scalars().first()
 
-    async def get_all(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[ModelType]:
+    @observe_db_call
+    async def get_all(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[ModelType]:
         """
-        Получить список записей с пагинацией
+        Получить список записей с пагинацией.
+
+        Для архивируемых документов (заказы, поставки) можно задать период по дате документа;
+        архивные таблицы читаются, только если период заходит в архивные годы.
         """
-        query = select(self.model).offset(skip).limit(limit)
-        result = await db.execute(query)
+        date_attribute = ARCHIVE_DATE_COLUMNS.get(self.model)
+        if date_attribute is None or (date_from is None and date_to is None):
+            query = select(self.model)
+        else:
+            entity = await archive_catalog.entity(db, self.model, date_from, date_to)
+            query = select(entity)
+            if date_from is not None:
+                query = query.where(getattr(entity, date_attribute) >= date_from)
+            if date_to is not None:
+                query = query.where(getattr(entity, date_attribute) <= date_to)
+        result = await db.execute(query.offset(skip).limit(limit))
         return result.scalars().all()
 
+    @observe_db_call
     async def create(self, db: AsyncSession, obj_in: Union[CreateSchemaType, Dict[str, Any]]) -> ModelType:
         """
         Создать новую запись
         """
-        obj_in_data = obj_in.dict() if isinstance(obj_in, BaseModel) else obj_in
+        obj_in_data = obj_in.model_dump() if isinstance(obj_in, BaseModel) else obj_in
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
         await db.commit()
+        table_versions.bump(self.model.__tablename__)
         await db.refresh(db_obj)
         return db_obj
 
+    @observe_db_call
+    async def create_many(
+        self, db: AsyncSession, objs_in: List[Union[CreateSchemaType, Dict[str, Any]]]
+    ) -> List[ModelType]:
+        """
+        Создать несколько записей одной транзакцией
+        """
+        rows = [obj_in.model_dump() if isinstance(obj_in, BaseModel) else obj_in for obj_in in objs_in]
+        if not rows:
+            return []
+
+        if dialect_features(db.get_bind().dialect).bulk_returning:
+            # Один INSERT ... OUTPUT/RETURNING на пачку вместо flush по объекту
+            result = await db.scalars(insert(self.model).returning(self.model), rows)
+            db_objs = list(result.all())
+        else:
+            db_objs = [self.model(**row) for row in rows]
+            db.add_all(db_objs)
+        await db.commit()
+        table_versions.bump(self.model.__tablename__)
+        return db_objs
+
+    @observe_db_call
     async def update(
-        self, db: AsyncSession, id: int, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        self,
+        db: AsyncSession,
+        id: int,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        expected_version: Optional[int] = None,
     ) -> Optional[ModelType]:
         """
         Обновить запись
+
+        Для таблиц с колонкой version обновление увеличивает версию. Если передана
+        expected_version (или поле version в obj_in), запись обновляется только при
+        совпадении версии (compare-and-swap), иначе — VersionConflictError.
         """
         db_obj = await self.get(db, id)
         if not db_obj:
             return None
 
-        obj_data = obj_in.dict(exclude_unset=True) if isinstance(obj_in, BaseModel) else obj_in
+        obj_data = obj_in.model_dump(exclude_unset=True) if isinstance(obj_in, BaseModel) else dict(obj_in)
         
         # Получаем имя первичного ключа
         primary_key = f"id_{self.model.__tablename__}"
         
         # Формируем запрос на обновление
-        query = (
-            update(self.model)
-            .where(getattr(self.model, primary_key) == id)
-            .values(**obj_data)
-        )
-        
-        await db.execute(query)
+        if self.versioned:
+            version = obj_data.pop("version", None)
+            if expected_version is None:
+                expected_version = version
+            query = update(self.model).where(getattr(self.model, primary_key) == id).values(
+                **obj_data, version=self.model.version + 1
+            )
+            if expected_version is not None:
+                query = query.where(self.model.version == expected_version)
+        else:
+            query = update(self.model).where(getattr(self.model, primary_key) == id).values(**obj_data)
+
+        result = await db.execute(query)
+        if self.versioned and expected_version is not None and result.rowcount == 0:
+            await db.rollback()
+            actual = (await db.execute(
+                select(self.model.version).where(getattr(self.model, primary_key) == id)
+            )).scalar()
+            if actual is None:
+                # Запись удалили между чтением и обновлением
+                return None
+            raise VersionConflictError(self.model.__tablename__, id, expected_version, actual)
         await db.commit()
+        table_versions.bump(self.model.__tablename__)
         await db.refresh(db_obj)
         return db_obj
 
+    @observe_db_call
     async def delete(self, db: AsyncSession, id: int) -> bool:
         """
         Удалить запись
@@ -88,13 +232,18 @@ class DBService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         
         await db.execute(query)
         await db.commit()
+        table_versions.bump(self.model.__tablename__)
         return True
 
-    async def query(self, db: AsyncSession, query_func) -> List[Any]:
+    @observe_db_call
+    async def query(self, db: AsyncSession, query_func, cache: bool = False) -> List[Any]:
         """
         Выполнить произвольный запрос
+
+        С cache=True результат берётся из кэша запросов, пока не изменились
+        таблицы, которые запрос читает.
         """
-        result = await db.execute(query_func)
+        result = await (query_cache.execute(db, query_func) if cache else db.execute(query_func))
         return result.scalars().all()
 
 
@@ -127,9 +276,7 @@ cust_conts_service = DBService(CustConts)
 supplies_service = DBService(Supplies)
 supplies_payment_service = DBService(SuppliesPayment)
 supply_list_items_service = DBService(SupplyListItems)
-write_offs_list_service = DBService(WriteOffsList)
 orders_service = DBService(Orders)
-order_list_items_service = DBService(OrderListItems)
 
 
 # Расширенные сервисы для конкретных моделей с дополнительной логикой
@@ -137,12 +284,14 @@ order_list_items_service = DBService(OrderListItems)
 class ProductsService(DBService[Products, CreateSchemaType, UpdateSchemaType]):
     """Сервис для работы с продуктами"""
     
+    @observe_db_call
     async def get_by_category(self, db: AsyncSession, category_id: int) -> List[Products]:
         """Получить все продукты по категории"""
         query = select(Products).where(Products.id_product_category == category_id)
-        result = await db.execute(query)
+        result = await query_cache.execute(db, query)
         return result.scalars().all()
     
+    @observe_db_call
     async def get_with_price(self, db: AsyncSession, product_id: int) -> Dict[str, Any]:
         """Получить продукт с текущей ценой"""
         query = select(Products, PriseList) \
@@ -168,38 +317,183 @@ class ProductsService(DBService[Products, CreateSchemaType, UpdateSchemaType]):
             "price_date": price.date_of_change
         }
 
+    @observe_db_call
+    async def get_price_list(self, db: AsyncSession, category_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Получить прайс-лист: продукты с последней ценой"""
+        if dialect_features(db.get_bind().dialect).window_functions:
+            # Один проход по prise_list: последняя цена через ROW_NUMBER()
+            ranked = select(
+                PriseList.id_products,
+                PriseList.prise_,
+                PriseList.date_of_change,
+                func.row_number().over(
+                    partition_by=PriseList.id_products,
+                    order_by=(PriseList.date_of_change.desc(), PriseList.id_prise_list.desc())
+                ).label("rn")
+            ).subquery()
+            current_price = ranked
+            join_condition = (ranked.c.id_products == Products.id_products) & (ranked.c.rn == 1)
+        else:
+            last_change = select(
+                PriseList.id_products,
+                func.max(PriseList.date_of_change).label("date_of_change")
+            ).group_by(PriseList.id_products).subquery()
+            # Из нескольких изменений за последнюю дату берётся последнее по id, как в ROW_NUMBER()
+            last_id = select(
+                func.max(PriseList.id_prise_list).label("id_prise_list")
+            ).join(
+                last_change,
+                (PriseList.id_products == last_change.c.id_products)
+                & (PriseList.date_of_change == last_change.c.date_of_change)
+            ).group_by(PriseList.id_products).subquery()
+            current_price = select(PriseList).join(
+                last_id, PriseList.id_prise_list == last_id.c.id_prise_list
+            ).subquery()
+            join_condition = current_price.c.id_products == Products.id_products
+
+        query = select(
+            Products.id_products,
+            Products.products_name,
+            Products.id_product_category,
+            current_price.c.prise_,
+            current_price.c.date_of_change
+        ).join(current_price, join_condition).order_by(Products.products_name)
+
+        if category_id is not None:
+            query = query.where(Products.id_product_category == category_id)
+
+        result = await query_cache.execute(db, query)
+        return [
+            {
+                "id_products": row.id_products,
+                "products_name": row.products_name,
+                "category_id": row.id_product_category,
+                "current_price": row.prise_,
+                "price_date": row.date_of_change
+            }
+            for row in result
+        ]
+
+    @observe_db_call
+    async def get_stock(self, db: AsyncSession, warehouse_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Получить остатки по продуктам и складам: поставлено - продано - списано"""
+        lots = select(
+            SupplyListItems.id_products,
+            SupplyListItems.id_warehous,
+            remaining_stock_subquery().label("remaining")
+        )
+        if warehouse_id is not None:
+            lots = lots.where(SupplyListItems.id_warehous == warehouse_id)
+        # Остатки партий суммируются во внешнем запросе: MSSQL не агрегирует выражения с подзапросами
+        lots = lots.subquery()
+
+        query = select(
+            lots.c.id_products,
+            Products.products_name,
+            lots.c.id_warehous,
+            func.sum(lots.c.remaining).label("remaining")
+        ).join(
+            Products, lots.c.id_products == Products.id_products
+        ).group_by(
+            lots.c.id_products, Products.products_name, lots.c.id_warehous
+        ).order_by(Products.products_name)
+
+        result = await query_cache.execute(db, query)
+        return [
+            {
+                "id_products": row.id_products,
+                "products_name": row.products_name,
+                "warehouse_id": row.id_warehous,
+                "remaining": row.remaining
+            }
+            for row in result
+        ]
+
 
 class OrdersService(DBService[Orders, CreateSchemaType, UpdateSchemaType]):
-    """Сервис для работы с заказами"""
+    """Сервис для работы с заказами (изменения публикуются в order_events)"""
+
+    async def create(self, db: AsyncSession, obj_in: Union[CreateSchemaType, Dict[str, Any]]) -> Orders:
+        order = await super().create(db, obj_in)
+        publish_order_event(ORDER_CREATED, model_to_dict(order))
+        return order
+
+    async def create_many(
+        self, db: AsyncSession, objs_in: List[Union[CreateSchemaType, Dict[str, Any]]]
+    ) -> List[Orders]:
+        orders = await super().create_many(db, objs_in)
+        for order in orders:
+            publish_order_event(ORDER_CREATED, model_to_dict(order))
+        return orders
+
+    async def update(
+        self,
+        db: AsyncSession,
+        id: int,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        expected_version: Optional[int] = None,
+    ) -> Optional[Orders]:
+        obj_data = obj_in.model_dump(exclude_unset=True) if isinstance(obj_in, BaseModel) else obj_in
+        previous_status = None
+        if "id_order_status" in obj_data:
+            previous_status = (await db.execute(
+                select(Orders.id_order_status).where(Orders.id_orders == id)
+            )).scalar()
+        order = await super().update(db, id, obj_in, expected_version)
+        if order is not None and "id_order_status" in obj_data and order.id_order_status != previous_status:
+            publish_order_event(ORDER_STATUS_CHANGED, model_to_dict(order), previous_status=previous_status)
+        return order
     
-    async def get_customer_orders(self, db: AsyncSession, customer_id: int) -> List[Orders]:
-        """Получить все заказы клиента"""
-        query = select(Orders).where(Orders.id_customer == customer_id)
-        result = await db.execute(query)
+    @observe_db_call
+    async def get_customer_orders(
+        self,
+        db: AsyncSession,
+        customer_id: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> List[Orders]:
+        """Заказы клиента с пагинацией (за период — с архивом, если период заходит в архивные годы)"""
+        Order = await archive_catalog.entity(db, Orders, date_from, date_to)
+        query = select(Order).where(Order.id_customer == customer_id)
+        if date_from is not None:
+            query = query.where(Order.order_date >= date_from)
+        if date_to is not None:
+            query = query.where(Order.order_date <= date_to)
+        result = await db.execute(query.order_by(Order.id_orders).offset(skip).limit(limit))
         return result.scalars().all()
     
-    async def get_order_with_items(self, db: AsyncSession, order_id: int) -> Dict[str, Any]:
-        """Получить заказ с позициями"""
+    @observe_db_call
+    async def get_order_with_items(self, db: AsyncSession, order_id: int) -> Optional[Dict[str, Any]]:
+        """Получить заказ с позициями (если заказа нет в оперативных таблицах — ищется в архиве)"""
+        Order, Item, Lot = Orders, OrderListItems, SupplyListItems
         # Запрос на получение информации о заказе
-        order_query = select(Orders).where(Orders.id_orders == order_id)
+        order_query = select(Order).where(Order.id_orders == order_id)
         order_result = await db.execute(order_query)
         order = order_result.scalars().first()
-        
+
         if not order:
-            return None
+            years = await archive_catalog.years(db)
+            if not years:
+                return None
+            Order, Item, Lot = (archived_entity(model, years) for model in (Orders, OrderListItems, SupplyListItems))
+            order = (await db.execute(select(Order).where(Order.id_orders == order_id))).scalars().first()
+            if not order:
+                return None
             
         # Запрос на получение позиций заказа
         items_query = select(
-            OrderListItems, 
+            Item, 
             Products.products_name,
-            SupplyListItems.price
+            Lot.price
         ).join(
-            SupplyListItems, 
-            OrderListItems.id_supply_list_items == SupplyListItems.id_supply_list_items
+            Lot, 
+            Item.id_supply_list_items == Lot.id_supply_list_items
         ).join(
             Products,
-            SupplyListItems.id_products == Products.id_products
-        ).where(OrderListItems.id_orders == order_id)
+            Lot.id_products == Products.id_products
+        ).where(Item.id_orders == order_id)
         
         items_result = await db.execute(items_query)
         items = []
@@ -247,6 +541,374 @@ class OrdersService(DBService[Orders, CreateSchemaType, UpdateSchemaType]):
         }
 
 
+class LotItemsService(DBService[ModelType, CreateSchemaType, UpdateSchemaType]):
+    """
+    Сервис строк, расходующих партии (позиции заказов, списания).
+
+    Любое изменение увеличивает версию затронутых партий в той же транзакции,
+    чтобы OrderPlacement и FifoAllocator, прочитавшие остатки раньше, получили
+    конфликт версий, а не продали уже израсходованный остаток.
+    """
+
+    async def _bump_lots(self, db: AsyncSession, lot_ids: Iterable[Optional[int]]) -> None:
+        ids = sorted({lot_id for lot_id in lot_ids if lot_id is not None})
+        if ids:
+            await db.execute(
+                update(SupplyListItems)
+                .where(SupplyListItems.id_supply_list_items.in_(ids))
+                .values(version=SupplyListItems.version + 1)
+            )
+
+    async def _lot_of(self, db: AsyncSession, id: int) -> Optional[int]:
+        primary_key = getattr(self.model, f"id_{self.model.__tablename__}")
+        return (await db.execute(select(self.model.id_supply_list_items).where(primary_key == id))).scalar()
+
+    async def create(self, db: AsyncSession, obj_in: Union[CreateSchemaType, Dict[str, Any]]) -> ModelType:
+        obj_in_data = obj_in.model_dump() if isinstance(obj_in, BaseModel) else obj_in
+        await self._bump_lots(db, [obj_in_data.get("id_supply_list_items")])
+        db_obj = await super().create(db, obj_in_data)
+        table_versions.bump(SupplyListItems.__tablename__)
+        return db_obj
+
+    async def create_many(
+        self, db: AsyncSession, objs_in: List[Union[CreateSchemaType, Dict[str, Any]]]
+    ) -> List[ModelType]:
+        rows = [obj_in.model_dump() if isinstance(obj_in, BaseModel) else obj_in for obj_in in objs_in]
+        await self._bump_lots(db, [row.get("id_supply_list_items") for row in rows])
+        db_objs = await super().create_many(db, rows)
+        if db_objs:
+            table_versions.bump(SupplyListItems.__tablename__)
+        return db_objs
+
+    async def update(
+        self,
+        db: AsyncSession,
+        id: int,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        expected_version: Optional[int] = None,
+    ) -> Optional[ModelType]:
+        obj_data = obj_in.model_dump(exclude_unset=True) if isinstance(obj_in, BaseModel) else obj_in
+        consumes = "amount" in obj_data or "id_supply_list_items" in obj_data
+        if consumes:
+            # Меняется расход: старая партия освобождается, новая расходуется
+            await self._bump_lots(db, [await self._lot_of(db, id), obj_data.get("id_supply_list_items")])
+        db_obj = await super().update(db, id, obj_in, expected_version)
+        if db_obj is not None and consumes:
+            table_versions.bump(SupplyListItems.__tablename__)
+        return db_obj
+
+    async def delete(self, db: AsyncSession, id: int) -> bool:
+        await self._bump_lots(db, [await self._lot_of(db, id)])
+        deleted = await super().delete(db, id)
+        if deleted:
+            table_versions.bump(SupplyListItems.__tablename__)
+        return deleted
+
+
+class SuppliesService(DBService[Supplies, CreateSchemaType, UpdateSchemaType]):
+    """Сервис для работы с поставками"""
+
+    async def _missing_references(
+        self, db: AsyncSession, product_ids: Set[int], warehouse_ids: Set[int]
+    ) -> Dict[str, List[int]]:
+        """Продукты и склады из набора, которых нет в БД (одним запросом на оба справочника)"""
+        query = union_all(
+            select(literal("products").label("ref"), Products.id_products.label("id"))
+            .where(Products.id_products.in_(product_ids)),
+            select(literal("warehouse").label("ref"), Warehouse.id_warehous.label("id"))
+            .where(Warehouse.id_warehous.in_(warehouse_ids)),
+        )
+        found = {(row.ref, row.id) for row in await db.execute(query)}
+        missing = {
+            "products": sorted(id for id in product_ids if ("products", id) not in found),
+            "warehouse": sorted(id for id in warehouse_ids if ("warehouse", id) not in found),
+        }
+        return {table: ids for table, ids in missing.items() if ids}
+
+    @observe_db_call
+    async def create_with_items(
+        self, db: AsyncSession, supply_data: Dict[str, Any], items: List[Dict[str, Any]]
+    ) -> Tuple[Supplies, List[Dict[str, Any]]]:
+        """
+        Создать поставку вместе с позициями одной транзакцией.
+
+        items: [{"id_products", "id_warehous", "amount", "price", "comment"}].
+        Продукты и склады всех позиций проверяются одним запросом, поставка и позиции
+        вставляются с возвратом ключей; если не найден продукт или склад —
+        UnknownReferenceError, и ничего не записывается.
+        """
+        missing = await self._missing_references(
+            db, {item["id_products"] for item in items}, {item["id_warehous"] for item in items}
+        )
+        if missing:
+            raise UnknownReferenceError(missing)
+
+        try:
+            supply = await insert_returning(db, Supplies, {"supp_date": date.today(), **supply_data})
+            rows = [{**item, "id_supplies": supply.id_supplies, "version": 1} for item in items]
+            await insert_rows(db, SupplyListItems, rows)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        table_versions.bump("supplies", "supply_list_items")
+        return supply, rows
+
+
+# Колонки сводки по клиентам. Профиль, последние заказы и контакты собираются одним
+# UNION ALL (один запрос к БД); часть заполняет только свои колонки, остальные — NULL
+SUMMARY_COLUMNS = {
+    "kind": Integer(),
+    "id_customer": Integer(),
+    "first_name": Unicode(50),
+    "middle_name": Unicode(50),
+    "last_name": Unicode(50),
+    "org_office_name": Unicode(500),
+    "position": Unicode(150),
+    "reg_date": Date(),
+    "id_district": Integer(),
+    "district": Unicode(50),
+    "id_customer_type": Integer(),
+    "customer_type": Unicode(50),
+    "order_count": Integer(),
+    "revenue": Money,
+    "last_order_date": Date(),
+    "id_orders": Integer(),
+    "order_date": Date(),
+    "doc_num": Unicode(50),
+    "id_order_status": Integer(),
+    "order_status": Unicode(50),
+    "items_amount": Integer(),
+    "order_total": Money,
+    "id_cust_conts": Integer(),
+    "id_cont_type": Integer(),
+    "cont_type": Unicode(50),
+    "cust_conts": Unicode(450),
+}
+SUMMARY_PROFILE, SUMMARY_ORDER, SUMMARY_CONTACT = 0, 1, 2
+
+
+def _summary_part(kind: int, **values):
+    """Часть UNION ALL сводки: переданные колонки, остальные — типизированный NULL"""
+    columns = [literal(kind, Integer()).label("kind")]
+    for name, column_type in list(SUMMARY_COLUMNS.items())[1:]:
+        value = values[name] if name in values else cast(null(), column_type)
+        columns.append(value.label(name))
+    return select(*columns)
+
+
+@lru_cache(maxsize=None)
+def _summary_statement(by_ids: bool, window_functions: bool, with_orders: bool, archive_years: Tuple[int, ...]):
+    """
+    Запрос сводки по клиентам. Строится один раз на вариант, клиенты и число последних
+    заказов передаются параметрами (ids — или skip/limit, recent).
+    Заказы читаются вместе с архивами archive_years (итоги — за всё время): суммы заказов
+    считаются отдельно по оперативным и по каждой архивной паре таблиц, чтобы каждая
+    часть шла по своим индексам, и объединяются через UNION ALL.
+    """
+    if by_ids:
+        page = select(Customer.id_customer).where(
+            Customer.id_customer.in_(bindparam("ids", expanding=True))
+        ).cte("page")
+    else:
+        page = select(Customer.id_customer).order_by(Customer.id_customer).offset(
+            bindparam("skip")
+        ).limit(bindparam("limit")).cte("page")
+    in_page = lambda column: column.in_(select(page.c.id_customer))
+
+    def totals(order, item):
+        line_total = func.coalesce(item.c.price_with_discount, 0) * func.coalesce(item.c.amount, 0)
+        return select(
+            order.c.id_orders,
+            order.c.id_customer,
+            order.c.order_date,
+            order.c.doc_num,
+            order.c.id_order_status,
+            func.coalesce(func.sum(item.c.amount), 0).label("items_amount"),
+            func.coalesce(func.sum(line_total), 0).label("order_total")
+        ).outerjoin(
+            item, item.c.id_orders == order.c.id_orders
+        ).where(
+            in_page(order.c.id_customer)
+        ).group_by(
+            order.c.id_orders, order.c.id_customer, order.c.order_date, order.c.doc_num, order.c.id_order_status
+        )
+
+    order_parts = [
+        totals(order, item)
+        for order, item in zip(archive_tables(Orders, archive_years), archive_tables(OrderListItems, archive_years))
+    ]
+    order_totals = (union_all(*order_parts) if len(order_parts) > 1 else order_parts[0]).cte("order_totals")
+
+    lifetime = select(
+        order_totals.c.id_customer,
+        func.count().label("order_count"),
+        func.sum(order_totals.c.order_total).label("revenue"),
+        func.max(order_totals.c.order_date).label("last_order_date")
+    ).group_by(order_totals.c.id_customer).subquery()
+
+    profiles = _summary_part(
+        SUMMARY_PROFILE,
+        id_customer=Customer.id_customer,
+        first_name=Customer.first_name,
+        middle_name=Customer.middle_name,
+        last_name=Customer.last_name,
+        org_office_name=Customer.org_office_name,
+        position=Customer.position,
+        reg_date=Customer.reg_date,
+        id_district=Customer.id_district,
+        district=District.district,
+        id_customer_type=Customer.id_customer_type,
+        customer_type=CustomerType.customer_type,
+        order_count=func.coalesce(lifetime.c.order_count, 0),
+        revenue=cast(func.coalesce(lifetime.c.revenue, 0), Money),
+        last_order_date=lifetime.c.last_order_date,
+    ).select_from(Customer).outerjoin(
+        District, Customer.id_district == District.id_district
+    ).outerjoin(
+        CustomerType, Customer.id_customer_type == CustomerType.id_customer_type
+    ).outerjoin(
+        lifetime, lifetime.c.id_customer == Customer.id_customer
+    ).where(in_page(Customer.id_customer))
+
+    if window_functions:
+        # Номер заказа клиента от последнего к первому
+        ranked = select(
+            order_totals,
+            func.row_number().over(
+                partition_by=order_totals.c.id_customer,
+                order_by=(order_totals.c.order_date.desc(), order_totals.c.id_orders.desc())
+            ).label("rn")
+        ).subquery()
+        recent_orders = ranked
+        recent_filter = ranked.c.rn <= bindparam("recent")
+    else:
+        newer = order_totals.alias("newer")
+        newer_count = select(func.count()).where(
+            newer.c.id_customer == order_totals.c.id_customer,
+            (newer.c.order_date > order_totals.c.order_date)
+            | ((newer.c.order_date == order_totals.c.order_date) & (newer.c.id_orders > order_totals.c.id_orders))
+        ).scalar_subquery()
+        recent_orders = order_totals
+        recent_filter = newer_count < bindparam("recent")
+
+    orders = _summary_part(
+        SUMMARY_ORDER,
+        id_customer=recent_orders.c.id_customer,
+        id_orders=recent_orders.c.id_orders,
+        order_date=recent_orders.c.order_date,
+        doc_num=recent_orders.c.doc_num,
+        id_order_status=recent_orders.c.id_order_status,
+        order_status=OrderStatus.order_status,
+        items_amount=recent_orders.c.items_amount,
+        order_total=recent_orders.c.order_total,
+    ).select_from(recent_orders).outerjoin(
+        OrderStatus, recent_orders.c.id_order_status == OrderStatus.id_order_status
+    ).where(recent_filter)
+
+    contacts = _summary_part(
+        SUMMARY_CONTACT,
+        id_customer=CustConts.id_customer,
+        id_cust_conts=CustConts.id_cust_conts,
+        id_cont_type=CustConts.id_cont_type,
+        cont_type=ContType.cont_type,
+        cust_conts=CustConts.cust_conts,
+    ).select_from(CustConts).outerjoin(
+        ContType, CustConts.id_cont_type == ContType.id_cont_type
+    ).where(in_page(CustConts.id_customer))
+
+    parts = [profiles, orders, contacts] if with_orders else [profiles, contacts]
+    return union_all(*parts)
+
+
+class CustomersService(DBService[Customer, CreateSchemaType, UpdateSchemaType]):
+    """Сервис для работы с клиентами"""
+
+    @observe_db_call
+    async def get_summaries(
+        self,
+        db: AsyncSession,
+        customer_ids: Optional[List[int]] = None,
+        skip: int = 0,
+        limit: int = 100,
+        recent: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """
+        Сводка по клиентам за один запрос: профиль с названиями района и типа, контакты,
+        число заказов и выручка за всё время, recent последних заказов с суммами.
+
+        Клиенты — по списку customer_ids или страница skip/limit по id.
+        """
+        if customer_ids is not None:
+            if not customer_ids:
+                return []
+            params = {"ids": list(customer_ids), "recent": recent}
+        else:
+            params = {"skip": skip, "limit": limit, "recent": recent}
+        window_functions = dialect_features(db.get_bind().dialect).window_functions
+        statement = _summary_statement(
+            customer_ids is not None, window_functions, recent > 0, await archive_catalog.years(db)
+        )
+        result = await db.execute(statement, params)
+
+        summaries: Dict[int, Dict[str, Any]] = {}
+        recent_by_customer: Dict[int, List[Dict[str, Any]]] = {}
+        contacts_by_customer: Dict[int, List[Dict[str, Any]]] = {}
+        for row in result:
+            if row.kind == SUMMARY_PROFILE:
+                summaries[row.id_customer] = {
+                    "id_customer": row.id_customer,
+                    "name": " ".join(part for part in (row.last_name, row.first_name, row.middle_name) if part),
+                    "first_name": row.first_name,
+                    "middle_name": row.middle_name,
+                    "last_name": row.last_name,
+                    "org_office_name": row.org_office_name,
+                    "position": row.position,
+                    "reg_date": row.reg_date,
+                    "district": {"id": row.id_district, "name": row.district},
+                    "customer_type": {"id": row.id_customer_type, "name": row.customer_type},
+                    "order_count": row.order_count,
+                    "revenue": row.revenue,
+                    "last_order_date": row.last_order_date,
+                }
+            elif row.kind == SUMMARY_ORDER:
+                recent_by_customer.setdefault(row.id_customer, []).append({
+                    "id_orders": row.id_orders,
+                    "order_date": row.order_date,
+                    "doc_num": row.doc_num,
+                    "status_id": row.id_order_status,
+                    "status": row.order_status,
+                    "items_amount": row.items_amount,
+                    "total": row.order_total,
+                })
+            else:
+                contacts_by_customer.setdefault(row.id_customer, []).append({
+                    "id": row.id_cust_conts,
+                    "type_id": row.id_cont_type,
+                    "type": row.cont_type,
+                    "value": row.cust_conts,
+                })
+
+        for customer_id, summary in summaries.items():
+            summary["contacts"] = sorted(contacts_by_customer.get(customer_id, []), key=lambda contact: contact["id"])
+            summary["recent_orders"] = sorted(
+                recent_by_customer.get(customer_id, []),
+                key=lambda order: (order["order_date"] is not None, order["order_date"], order["id_orders"]),
+                reverse=True,
+            )
+        order = customer_ids if customer_ids is not None else sorted(summaries)
+        return [summaries[customer_id] for customer_id in order if customer_id in summaries]
+
+    async def get_summary(self, db: AsyncSession, customer_id: int, recent: int = 5) -> Optional[Dict[str, Any]]:
+        """Сводка по одному клиенту"""
+        summaries = await self.get_summaries(db, [customer_id], recent=recent)
+        return summaries[0] if summaries else None
+
+
 # Используем расширенные сервисы вместо базовых
 products_service = ProductsService(Products)
 orders_service = OrdersService(Orders)
+customer_service = CustomersService(Customer)
+supplies_service = SuppliesService(Supplies)
+order_list_items_service = LotItemsService(OrderListItems)
+write_offs_list_service = LotItemsService(WriteOffsList)
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import (
+    SHELF_LIFE_DAYS,
+    SHELF_LIFE_BY_CATEGORY,
+    EXPIRY_WRITE_OFF_TYPE_ID,
+    EXPIRY_LOOKBACK_DAYS,
+    EXPIRY_BATCH_SIZE,
+    ORDER_PLACEMENT_RETRIES,
+    ORDER_PLACEMENT_BACKOFF_MS,
+)
+from src.db.allocation import retry_on_conflict
+from src.db.db_service import VersionConflictError
+from src.db.models import ProductCategory, Products, Supplies, SupplyListItems, WriteOffsList
+from src.db.stock import remaining_stock_subquery
+from src.db.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScanner:
+    """
+    Поиск просроченных партий и их списание.
+
+    Партия просрочена, если с даты поставки прошло больше срока годности её
+    категории. Кандидаты — партии с ненулевым остатком, срок которых истёк не более
+    lookback_days назад: выборка идёт по диапазону индекса supplies.supp_date, и её
+    размер не растёт с историей поставок. Партии, пропущенные прошлыми запусками
+    (рестарт процесса, поставки, введённые задним числом), находятся, пока не вышли
+    из окна; более старые списываются вручную. Остатки считаются коррелированными
+    подзапросами по индексам order_list_items/write_offs_list.
+
+    Списания пишутся транзакциями по batch_size партий. Версии списываемых
+    партий увеличиваются условным UPDATE ... WHERE version = прочитанной, как
+    в OrderPlacement: заказ, прочитавший партию до списания, получит конфликт
+    версий, а если партию успели продать во время сканирования, оставшиеся
+    партии ищутся заново (уже списанные не находятся — их остаток нулевой).
+
+    Без write_off_type_id сканер только ищет партии (dry_run).
+    """
+
+    def __init__(
+        self,
+        shelf_life_days: int = SHELF_LIFE_DAYS,
+        shelf_life_by_category: Optional[Dict[int, int]] = None,
+        write_off_type_id: Optional[int] = EXPIRY_WRITE_OFF_TYPE_ID,
+        lookback_days: int = EXPIRY_LOOKBACK_DAYS,
+        batch_size: int = EXPIRY_BATCH_SIZE,
+        max_retries: int = ORDER_PLACEMENT_RETRIES,
+        backoff_ms: int = ORDER_PLACEMENT_BACKOFF_MS,
+    ):
+        self.shelf_life_days = shelf_life_days
+        self.shelf_life_by_category = shelf_life_by_category if shelf_life_by_category is not None else SHELF_LIFE_BY_CATEGORY
+        self.write_off_type_id = write_off_type_id
+        self.lookback_days = lookback_days
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff_ms / 1000
+        self._lock = asyncio.Lock()
+
+    def shelf_life(self, category_id: Optional[int]) -> int:
+        if category_id is None:
+            return self.shelf_life_days
+        return self.shelf_life_by_category.get(category_id, self.shelf_life_days)
+
+    async def _categories_by_shelf_life(self, db: AsyncSession) -> Dict[int, List[Optional[int]]]:
+        """Категории, сгруппированные по сроку годности (0 — не портится, пропускается)"""
+        category_ids = (await db.execute(select(ProductCategory.id_product_category))).scalars().all()
+        groups: Dict[int, List[Optional[int]]] = defaultdict(list)
+        for category_id in [*category_ids, None]:
+            days = self.shelf_life(category_id)
+            if days > 0:
+                groups[days].append(category_id)
+        return groups
+
+    async def find_expired(self, db: AsyncSession, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Найти открытые партии, срок которых истёк не более lookback_days назад"""
+        today = today or date.today()
+
+        remaining = remaining_stock_subquery()
+
+        expired: List[Dict[str, Any]] = []
+        for days, categories in (await self._categories_by_shelf_life(db)).items():
+            cutoff = today - timedelta(days=days)
+            # Одна выборка на группу категорий с одинаковым сроком годности
+            known = [category_id for category_id in categories if category_id is not None]
+            category_filters = [Products.id_product_category.in_(known)] if known else []
+            if None in categories:
+                category_filters.append(Products.id_product_category.is_(None))
+            query = select(
+                SupplyListItems.id_supply_list_items,
+                SupplyListItems.id_products,
+                SupplyListItems.id_warehous,
+                Products.id_product_category,
+                Supplies.supp_date,
+                SupplyListItems.version,
+                remaining.label("remaining")
+            ).select_from(Supplies).join(
+                SupplyListItems, SupplyListItems.id_supplies == Supplies.id_supplies
+            ).join(
+                Products, SupplyListItems.id_products == Products.id_products
+            ).where(
+                Supplies.supp_date.between(cutoff - timedelta(days=self.lookback_days), cutoff),
+                or_(*category_filters),
+                remaining > 0
+            )
+            for row in await db.execute(query):
+                expired.append({
+                    "id_supply_list_items": row.id_supply_list_items,
+                    "id_products": row.id_products,
+                    "id_warehous": row.id_warehous,
+                    "id_product_category": row.id_product_category,
+                    "supp_date": row.supp_date,
+                    "version": row.version,
+                    "remaining": row.remaining,
+                })
+        return expired
+
+    async def _write_off(self, db: AsyncSession, expired: List[Dict[str, Any]], today: date) -> None:
+        """Списать остатки пачки партий одной транзакцией, проверив их версии"""
+        rows = [
+            {
+                "write_off_date": today,
+                "amount": lot["remaining"],
+                "comments": f"Истёк срок годности (поставка {lot['supp_date']})",
+                "id_supply_list_items": lot["id_supply_list_items"],
+                "id_write_offs_type": self.write_off_type_id,
+            }
+            for lot in expired
+        ]
+        try:
+            # Партии захватываются в порядке id, как в OrderPlacement
+            for lot in sorted(expired, key=lambda lot: lot["id_supply_list_items"]):
+                result = await db.execute(
+                    update(SupplyListItems)
+                    .where(
+                        SupplyListItems.id_supply_list_items == lot["id_supply_list_items"],
+                        SupplyListItems.version == lot["version"]
+                    )
+                    .values(version=SupplyListItems.version + 1)
+                )
+                if result.rowcount == 0:
+                    raise VersionConflictError(
+                        SupplyListItems.__tablename__, lot["id_supply_list_items"], lot["version"], None
+                    )
+            await db.execute(insert(WriteOffsList), rows)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        table_versions.bump("write_offs_list", "supply_list_items")
+        logger.info(f"Списано {len(rows)} просроченных партий, всего {sum(r['amount'] for r in rows)} шт.")
+
+    async def scan(self, db: AsyncSession, today: Optional[date] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Найти просроченные партии и списать их остатки.
+
+        При dry_run (или без write_off_type_id) только возвращает найденное, ничего не записывая.
+        Если версии партий не совпали за max_retries повторов — VersionConflictError.
+        """
+        today = today or date.today()
+        dry_run = dry_run or self.write_off_type_id is None
+        written: List[Dict[str, Any]] = []
+
+        async def attempt() -> None:
+            expired = await self.find_expired(db, today)
+            if dry_run:
+                written.extend(expired)
+                return
+            # Уже списанные пачки при повторе не находятся — их остаток нулевой
+            for i in range(0, len(expired), self.batch_size):
+                batch = expired[i:i + self.batch_size]
+                await self._write_off(db, batch, today)
+                written.extend(batch)
+
+        async with self._lock:
+            await retry_on_conflict(
+                attempt, self.max_retries, self.backoff, failure="Просроченные партии не списаны"
+            )
+
+        return {
+            "date": today,
+            "dry_run": dry_run,
+            "lots": len(written),
+            "amount": sum(lot["remaining"] for lot in written),
+            "items": written,
+        }
+
+
+expiry_scanner = ExpiryScanner()
+
+
+async def run_expiry_scanner(session_factory, interval_seconds: int) -> None:
+    """Фоновая задача: периодически списывать просроченные партии"""
+    while True:
+        try:
+            async with session_factory() as db:
+                await expiry_scanner.scan(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при сканировании просроченных партий: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -1,14 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, Text
+from sqlalchemy import Column, Integer, Unicode, Float, DateTime, Date, ForeignKey, Text, Index
+from sqlalchemy.dialects.mssql import MONEY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.sqltypes import DECIMAL
 from src.core.db_config import Base
 
+# Денежный тип: money в MSSQL (как в исходном DDL), DECIMAL(19,4) в остальных бэкендах.
+# Строки — Unicode, т.е. nvarchar в MSSQL (кириллица) и обычный varchar в SQLite.
+Money = DECIMAL(19, 4).with_variant(MONEY(), "mssql")
+
 # Справочные таблицы
 class District(Base):
     __tablename__ = "district"
     
     id_district = Column(Integer, primary_key=True, autoincrement=True)
-    district = Column(String(50))
+    district = Column(Unicode(50))
     
     customers = relationship("Customer", back_populates="district")
 
@@ -17,7 +22,7 @@ class CustomerType(Base):
     __tablename__ = "customer_type"
     
     id_customer_type = Column(Integer, primary_key=True, autoincrement=True)
-    customer_type = Column(String(50))
+    customer_type = Column(Unicode(50))
     
     customers = relationship("Customer", back_populates="customer_type")
 
@@ -26,7 +31,7 @@ class ContType(Base):
     __tablename__ = "cont_type"
     
     id_cont_type = Column(Integer, primary_key=True, autoincrement=True)
-    cont_type = Column(String(50))
+    cont_type = Column(Unicode(50))
     
     customer_contacts = relationship("CustConts", back_populates="cont_type")
 
@@ -35,14 +40,14 @@ class DiscountType(Base):
     __tablename__ = "discount_type"
     
     id_discount_type = Column(Integer, primary_key=True, autoincrement=True)
-    discount_type = Column(String(50))
+    discount_type = Column(Unicode(50))
 
 
 class EventType(Base):
     __tablename__ = "event_type"
     
     id_event_type = Column(Integer, primary_key=True, autoincrement=True)
-    event_type = Column(String(50))
+    event_type = Column(Unicode(50))
     
     promo_events = relationship("PromoEvents", back_populates="event_type")
     discounts = relationship("Discounts", back_populates="event_type")
@@ -52,7 +57,7 @@ class OrderStatus(Base):
     __tablename__ = "order_status"
     
     id_order_status = Column(Integer, primary_key=True, autoincrement=True)
-    order_status = Column(String(50))
+    order_status = Column(Unicode(50))
     
     orders = relationship("Orders", back_populates="order_status")
 
@@ -61,7 +66,7 @@ class OrderType(Base):
     __tablename__ = "order_type"
     
     id_order_type = Column(Integer, primary_key=True, autoincrement=True)
-    order_type = Column(String(50))
+    order_type = Column(Unicode(50))
     
     orders = relationship("Orders", back_populates="order_type")
 
@@ -70,7 +75,7 @@ class PaymentType(Base):
     __tablename__ = "payment_type"
     
     id_payment_type = Column(Integer, primary_key=True, autoincrement=True)
-    payment_type = Column(String(50))
+    payment_type = Column(Unicode(50))
     
     supplies_payments = relationship("SuppliesPayment", back_populates="payment_type")
 
@@ -79,7 +84,7 @@ class EmployeePositions(Base):
     __tablename__ = "employee_positions"
     
     id_employee_positions = Column(Integer, primary_key=True, autoincrement=True)
-    employee_positions = Column(String(50))
+    employee_positions = Column(Unicode(50))
     
     employees = relationship("Employee", back_populates="position")
 
@@ -88,7 +93,7 @@ class RewardType(Base):
     __tablename__ = "reward_type"
     
     id_reward_type = Column(Integer, primary_key=True, autoincrement=True)
-    reward_type = Column(String(50))
+    reward_type = Column(Unicode(50))
     
     employee_salaries = relationship("EmplSalary", back_populates="reward_type")
 
@@ -97,9 +102,9 @@ class TaxType(Base):
     __tablename__ = "tax_type"
     
     id_tax_type = Column(Integer, primary_key=True, autoincrement=True)
-    tax_type = Column(String(250))
+    tax_type = Column(Unicode(250))
     tax_rate = Column(Float)
-    comments = Column(String(500))
+    comments = Column(Unicode(500))
 
 
 class ReportsAndFrorms(Base):
@@ -107,7 +112,7 @@ class ReportsAndFrorms(Base):
     
     id_reports_and_froms = Column(Integer, primary_key=True, autoincrement=True)
     date_time = Column(DateTime)
-    reports_and_froms_name = Column(String(500))
+    reports_and_froms_name = Column(Unicode(500))
     reports_and_froms_type = Column(Integer)
     reports_and_froms_id = Column(Integer)
 
@@ -116,7 +121,7 @@ class Warehouse(Base):
     __tablename__ = "warehouse"
     
     id_warehous = Column(Integer, primary_key=True, autoincrement=True)
-    warehous = Column(String(50))
+    warehous = Column(Unicode(50))
     
     supply_list_items = relationship("SupplyListItems", back_populates="warehouse")
 
@@ -125,7 +130,7 @@ class SupplyType(Base):
     __tablename__ = "supply_type"
     
     id_supply_type = Column(Integer, primary_key=True, autoincrement=True)
-    supply_type = Column(String(50))
+    supply_type = Column(Unicode(50))
     
     supplies = relationship("Supplies", back_populates="supply_type")
 
@@ -134,9 +139,9 @@ class Supplier(Base):
     __tablename__ = "supplier"
     
     id_supplier = Column(Integer, primary_key=True, autoincrement=True)
-    supplier_org_name = Column(String(250))
+    supplier_org_name = Column(Unicode(250))
     reg_date = Column(Date)
-    comments = Column(String(450))
+    comments = Column(Unicode(450))
     
     supplies = relationship("Supplies", back_populates="supplier")
 
@@ -145,7 +150,7 @@ class ProductCategory(Base):
     __tablename__ = "product_category"
     
     id_product_category = Column(Integer, primary_key=True, autoincrement=True)
-    product_category = Column(String(50))
+    product_category = Column(Unicode(50))
     
     products = relationship("Products", back_populates="category")
 
@@ -154,7 +159,7 @@ class WriteOffsType(Base):
     __tablename__ = "write_offs_type"
     
     id_write_offs_type = Column(Integer, primary_key=True, autoincrement=True)
-    write_offs_type = Column(String(50))
+    write_offs_type = Column(Unicode(50))
     
     write_offs = relationship("WriteOffsList", back_populates="write_offs_type")
 
@@ -164,9 +169,9 @@ class Products(Base):
     __tablename__ = "products"
     
     id_products = Column(Integer, primary_key=True, autoincrement=True)
-    products_name = Column(String(450))
+    products_name = Column(Unicode(450))
     reg_date = Column(Date)
-    prod_description = Column(String(500))
+    prod_description = Column(Unicode(500))
     id_product_category = Column(Integer, ForeignKey("product_category.id_product_category"))
     
     category = relationship("ProductCategory", back_populates="products")
@@ -178,10 +183,12 @@ class PriseList(Base):
     __tablename__ = "prise_list"
     
     id_prise_list = Column(Integer, primary_key=True, autoincrement=True)
-    prise_ = Column(DECIMAL(19, 4))  # Money type equivalent
+    prise_ = Column(Money)  # Money type equivalent
     date_of_change = Column(Date)
-    descriptions = Column(String(500))
+    descriptions = Column(Unicode(500))
     id_products = Column(Integer, ForeignKey("products.id_products"))
+    # Версия строки для оптимистичной блокировки, увеличивается при каждом изменении
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     product = relationship("Products", back_populates="price_list")
 
@@ -190,12 +197,12 @@ class Employee(Base):
     __tablename__ = "employee"
     
     id_employee = Column(Integer, primary_key=True, autoincrement=True)
-    first_name = Column(String(50))
-    middle_name = Column(String(50))
-    last_name = Column(String(50))
-    salary_size = Column(DECIMAL(19, 4))  # Money type equivalent
+    first_name = Column(Unicode(50))
+    middle_name = Column(Unicode(50))
+    last_name = Column(Unicode(50))
+    salary_size = Column(Money)  # Money type equivalent
     reg_date = Column(Date)
-    phone = Column(String(15))
+    phone = Column(Unicode(15))
     id_employee_positions = Column(Integer, ForeignKey("employee_positions.id_employee_positions"))
     
     position = relationship("EmployeePositions", back_populates="employees")
@@ -208,8 +215,8 @@ class EmplSalary(Base):
     
     id_empl_salary = Column(Integer, primary_key=True, autoincrement=True)
     sal_date = Column(Date)
-    salary = Column(DECIMAL(19, 4))  # Money type equivalent
-    comments = Column(String(500))
+    salary = Column(Money)  # Money type equivalent
+    comments = Column(Unicode(500))
     id_employee = Column(Integer, ForeignKey("employee.id_employee"))
     id_reward_type = Column(Integer, ForeignKey("reward_type.id_reward_type"))
     
@@ -221,8 +228,8 @@ class PromoEvents(Base):
     __tablename__ = "promo_events"
     
     id_promo_events = Column(Integer, primary_key=True, autoincrement=True)
-    event_name = Column(String(150))
-    evnt_comments = Column(String(500))
+    event_name = Column(Unicode(150))
+    evnt_comments = Column(Unicode(500))
     id_event_type = Column(Integer, ForeignKey("event_type.id_event_type"))
     
     event_type = relationship("EventType", back_populates="promo_events")
@@ -233,9 +240,15 @@ class Discounts(Base):
     __tablename__ = "discounts"
     
     id_discounts = Column(Integer, primary_key=True, autoincrement=True)
-    discount = Column(DECIMAL(19, 4))  # Money type equivalent
+    discount = Column(Money)  # Money type equivalent
     id_promo_events = Column(Integer, ForeignKey("promo_events.id_promo_events"))
     id_event_type = Column(Integer, ForeignKey("event_type.id_event_type"))
+    # Условия применения скидки; NULL — без ограничения
+    id_discount_type = Column(Integer, ForeignKey("discount_type.id_discount_type"))
+    id_customer_type = Column(Integer, ForeignKey("customer_type.id_customer_type"))
+    id_product_category = Column(Integer, ForeignKey("product_category.id_product_category"))
+    date_from = Column(Date)
+    date_to = Column(Date)
     
     promo_event = relationship("PromoEvents", back_populates="discounts")
     event_type = relationship("EventType", back_populates="discounts")
@@ -246,15 +259,15 @@ class Customer(Base):
     __tablename__ = "customer"
     
     id_customer = Column(Integer, primary_key=True, autoincrement=True)
-    first_name = Column(String(50))
-    middle_name = Column(String(50))
-    last_name = Column(String(50))
+    first_name = Column(Unicode(50))
+    middle_name = Column(Unicode(50))
+    last_name = Column(Unicode(50))
     reg_date = Column(Date)
-    org_office_name = Column(String(500))
-    position = Column(String(150))
-    pasp_num = Column(String(50))
-    login_ = Column(String(50))
-    passwrd = Column(String(50))
+    org_office_name = Column(Unicode(500))
+    position = Column(Unicode(150))
+    pasp_num = Column(Unicode(50))
+    login_ = Column(Unicode(50))
+    passwrd = Column(Unicode(50))
     id_district = Column(Integer, ForeignKey("district.id_district"))
     id_customer_type = Column(Integer, ForeignKey("customer_type.id_customer_type"))
     
@@ -268,8 +281,8 @@ class CustConts(Base):
     __tablename__ = "cust_conts"
     
     id_cust_conts = Column(Integer, primary_key=True, autoincrement=True)
-    cust_conts = Column(String(450))
-    id_customer = Column(Integer, ForeignKey("customer.id_customer"))
+    cust_conts = Column(Unicode(450))
+    id_customer = Column(Integer, ForeignKey("customer.id_customer"), index=True)
     id_cont_type = Column(Integer, ForeignKey("cont_type.id_cont_type"))
     
     customer = relationship("Customer", back_populates="contacts")
@@ -280,9 +293,9 @@ class Supplies(Base):
     __tablename__ = "supplies"
     
     id_supplies = Column(Integer, primary_key=True, autoincrement=True)
-    supp_date = Column(Date)
-    doc_num = Column(String(20))
-    commenst = Column(String(500))
+    supp_date = Column(Date, index=True)
+    doc_num = Column(Unicode(20))
+    commenst = Column(Unicode(500))
     id_supply_type = Column(Integer, ForeignKey("supply_type.id_supply_type"))
     id_supplier = Column(Integer, ForeignKey("supplier.id_supplier"))
     
@@ -296,9 +309,9 @@ class SuppliesPayment(Base):
     __tablename__ = "supplies_payment"
     
     id_supplies_payment = Column(Integer, primary_key=True, autoincrement=True)
-    payment_amount = Column(DECIMAL(19, 4))  # Money type equivalent
+    payment_amount = Column(Money)  # Money type equivalent
     payment_date = Column(Date)
-    payment_commnets = Column(String(500))
+    payment_commnets = Column(Unicode(500))
     id_supplies = Column(Integer, ForeignKey("supplies.id_supplies"))
     id_payment_type = Column(Integer, ForeignKey("payment_type.id_payment_type"))
     
@@ -308,14 +321,18 @@ class SuppliesPayment(Base):
 
 class SupplyListItems(Base):
     __tablename__ = "supply_list_items"
+    # Партии продукта на складе — по этой паре ищут остатки при оформлении заказа
+    __table_args__ = (Index("ix_supply_list_items_product_warehouse", "id_products", "id_warehous"),)
     
     id_supply_list_items = Column(Integer, primary_key=True, autoincrement=True)
-    price = Column(DECIMAL(19, 4))  # Money type equivalent
+    price = Column(Money)  # Money type equivalent
     amount = Column(Integer)
-    comment = Column(String(500))
-    id_supplies = Column(Integer, ForeignKey("supplies.id_supplies"))
+    comment = Column(Unicode(500))
+    id_supplies = Column(Integer, ForeignKey("supplies.id_supplies"), index=True)
     id_warehous = Column(Integer, ForeignKey("warehouse.id_warehous"))
     id_products = Column(Integer, ForeignKey("products.id_products"))
+    # Версия строки для оптимистичной блокировки, увеличивается при каждом изменении
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     supply = relationship("Supplies", back_populates="supply_items")
     warehouse = relationship("Warehouse", back_populates="supply_list_items")
@@ -328,10 +345,10 @@ class WriteOffsList(Base):
     __tablename__ = "write_offs_list"
     
     id_write_offs_list = Column(Integer, primary_key=True, autoincrement=True)
-    write_off_date = Column(Date)
+    write_off_date = Column(Date, index=True)
     amount = Column(Integer)
-    comments = Column(String(500))
-    id_supply_list_items = Column(Integer, ForeignKey("supply_list_items.id_supply_list_items"))
+    comments = Column(Unicode(500))
+    id_supply_list_items = Column(Integer, ForeignKey("supply_list_items.id_supply_list_items"), index=True)
     id_write_offs_type = Column(Integer, ForeignKey("write_offs_type.id_write_offs_type"))
     
     supply_item = relationship("SupplyListItems", back_populates="write_offs")
@@ -342,14 +359,16 @@ class Orders(Base):
     __tablename__ = "orders"
     
     id_orders = Column(Integer, primary_key=True, autoincrement=True)
-    order_date = Column(Date)
-    doc_num = Column(String(50))
-    comments = Column(String(500))
-    id_customer = Column(Integer, ForeignKey("customer.id_customer"))
+    order_date = Column(Date, index=True)
+    doc_num = Column(Unicode(50))
+    comments = Column(Unicode(500))
+    id_customer = Column(Integer, ForeignKey("customer.id_customer"), index=True)
     id_discounts = Column(Integer, ForeignKey("discounts.id_discounts"))
     id_employee = Column(Integer, ForeignKey("employee.id_employee"))
     id_order_type = Column(Integer, ForeignKey("order_type.id_order_type"))
     id_order_status = Column(Integer, ForeignKey("order_status.id_order_status"))
+    # Версия строки для оптимистичной блокировки, увеличивается при каждом изменении
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     customer = relationship("Customer", back_populates="orders")
     discount = relationship("Discounts", back_populates="orders")
@@ -364,9 +383,26 @@ class OrderListItems(Base):
     
     id_order_list_items = Column(Integer, primary_key=True, autoincrement=True)
     amount = Column(Integer)
-    price_with_discount = Column(DECIMAL(19, 4))  # Money type equivalent
-    id_orders = Column(Integer, ForeignKey("orders.id_orders"))
-    id_supply_list_items = Column(Integer, ForeignKey("supply_list_items.id_supply_list_items"))
+    price_with_discount = Column(Money)  # Money type equivalent
+    id_orders = Column(Integer, ForeignKey("orders.id_orders"), index=True)
+    id_supply_list_items = Column(Integer, ForeignKey("supply_list_items.id_supply_list_items"), index=True)
     
     order = relationship("Orders", back_populates="order_items")
     supply_item = relationship("SupplyListItems", back_populates="order_items")
+
+
+class ArchivePeriod(Base):
+    """Год, строки которого переносятся в архивные таблицы <таблица>_archive_<год> (см. src.db.archive)"""
+    __tablename__ = "archive_periods"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    # running — перенос идёт или прерван (будет продолжен следующим запуском), done — завершён
+    status = Column(Unicode(20), nullable=False)
+    moved_orders = Column(Integer, nullable=False, default=0, server_default="0")
+    moved_lots = Column(Integer, nullable=False, default=0, server_default="0")
+    moved_supplies = Column(Integer, nullable=False, default=0, server_default="0")
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # Курсор прерванного переноса: проход (orders/lots/supplies) и последний обработанный id года
+    cursor_phase = Column(Unicode(10))
+    cursor_id = Column(Integer)
@@ -0,0 +1,43 @@
+from typing import Any, Dict, List, Optional
+
+from src.core.events import EventBus, Subscription
+
+ORDER_CREATED = "order.created"
+ORDER_STATUS_CHANGED = "order.status_changed"
+
+ALL_ORDERS = "orders"
+
+order_events = EventBus("order_events")
+
+
+def order_topics(order: Dict[str, Any]) -> List[str]:
+    """Темы события заказа: все заказы, заказы клиента, заказы сотрудника"""
+    topics = [ALL_ORDERS]
+    if order.get("id_customer") is not None:
+        topics.append(f"customer:{order['id_customer']}")
+    if order.get("id_employee") is not None:
+        topics.append(f"employee:{order['id_employee']}")
+    return topics
+
+
+def publish_order_event(event_type: str, order: Dict[str, Any], **extra: Any) -> None:
+    """Опубликовать событие заказа (вызывается после коммита)"""
+    order_events.publish(event_type, {"order": order, **extra}, order_topics(order))
+
+
+def subscribe_orders(
+    customer_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    last_event_id: Optional[str] = None,
+) -> Subscription:
+    """Подписка на события заказов клиента и/или сотрудника (без фильтров — на все заказы)"""
+    predicate = None
+    if customer_id is not None:
+        topics = [f"customer:{customer_id}"]
+        if employee_id is not None:
+            predicate = lambda event: event.data["order"].get("id_employee") == employee_id
+    elif employee_id is not None:
+        topics = [f"employee:{employee_id}"]
+    else:
+        topics = [ALL_ORDERS]
+    return order_events.subscribe(topics, predicate, last_event_id)
@@ -0,0 +1,150 @@
+import logging
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import ORDER_PLACEMENT_RETRIES, ORDER_PLACEMENT_BACKOFF_MS
+from src.core.metrics import registry
+from src.db.allocation import InsufficientStockError, LotHeap, LotKey, lot_lock, retry_on_conflict
+from src.db.db_service import VersionConflictError, insert_returning, insert_rows, model_to_dict
+from src.db.models import OrderListItems, Orders, Supplies, SupplyListItems
+from src.db.stock import remaining_stock_subquery
+from src.db.order_events import publish_order_event, ORDER_CREATED
+from src.db.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+order_placement_conflicts_total = registry.counter(
+    "order_placement_conflicts_total", "Order placement attempts retried because a lot version changed"
+)
+
+
+class OrderPlacement:
+    """
+    Оформление заказа с резервированием остатка без долгих блокировок.
+
+    Остатки партий читаются вне пишущей транзакции, позиции делятся по партиям (FIFO)
+    в памяти. Затем в короткой транзакции версии затронутых партий увеличиваются
+    условным UPDATE ... WHERE version = прочитанной: если партию успел изменить
+    другой заказ, UPDATE не находит строку, транзакция откатывается и попытка
+    повторяется с новыми остатками после случайной паузы. В БД блокируются только
+    строки затронутых партий и только на время записи.
+
+    При FIFO все заказы продукта расходуют одну и ту же самую старую партию, поэтому
+    внутри процесса заказы с общими парами продукт/склад выстраиваются в очередь
+    на asyncio-блокировках этих пар (общих с FifoAllocator) — иначе они почти всегда
+    конфликтовали бы друг с другом. Сравнение версий остаётся защитой от других процессов.
+
+    Защита работает, если все пути, расходующие партии, увеличивают их версию
+    (так делают OrderPlacement, FifoAllocator, ExpiryScanner и сервисы позиций
+    заказов и списаний; загрузка демо-данных в seed.py версии не трогает).
+    """
+
+    def __init__(self, max_retries: int = ORDER_PLACEMENT_RETRIES, backoff_ms: int = ORDER_PLACEMENT_BACKOFF_MS):
+        self.max_retries = max_retries
+        self.backoff = backoff_ms / 1000
+
+    async def _read_lots(self, db: AsyncSession, keys: List[LotKey]) -> Tuple[Dict[LotKey, LotHeap], Dict[int, int]]:
+        """Открытые партии по ключам и их версии"""
+        remaining = remaining_stock_subquery()
+
+        query = select(
+            SupplyListItems.id_products,
+            SupplyListItems.id_warehous,
+            Supplies.supp_date,
+            SupplyListItems.id_supply_list_items,
+            SupplyListItems.version,
+            remaining.label("remaining")
+        ).select_from(SupplyListItems).join(
+            Supplies, SupplyListItems.id_supplies == Supplies.id_supplies
+        ).where(
+            SupplyListItems.id_products.in_({product for product, _ in keys}),
+            SupplyListItems.id_warehous.in_({warehouse for _, warehouse in keys}),
+            remaining > 0
+        )
+
+        heaps: Dict[LotKey, LotHeap] = {key: LotHeap() for key in keys}
+        versions: Dict[int, int] = {}
+        for row in await db.execute(query):
+            heap = heaps.get((row.id_products, row.id_warehous))
+            if heap is not None:
+                heap.add(row.supp_date, row.id_supply_list_items, row.remaining)
+                versions[row.id_supply_list_items] = row.version
+        return heaps, versions
+
+    async def _attempt(
+        self, db: AsyncSession, order_data: Dict[str, Any], lines: List[Dict[str, Any]]
+    ) -> Tuple[Orders, List[Dict[str, Any]]]:
+        keys = sorted({(line["id_products"], line["id_warehous"]) for line in lines})
+        heaps, versions = await self._read_lots(db, keys)
+        # Закрыть читающую транзакцию: пишущая должна быть как можно короче
+        await db.rollback()
+
+        items: List[Dict[str, Any]] = []
+        for line in lines:
+            key = (line["id_products"], line["id_warehous"])
+            taken = heaps[key].take(line["amount"])
+            if not taken:
+                raise InsufficientStockError(key[0], key[1], line["amount"], heaps[key].available)
+            items.extend(
+                {
+                    "id_supply_list_items": lot_id,
+                    "amount": quantity,
+                    "price_with_discount": line.get("price_with_discount"),
+                }
+                for lot_id, quantity, _ in taken
+            )
+
+        try:
+            # Партии захватываются в порядке id, чтобы параллельные заказы не взаимоблокировались
+            for lot_id in sorted({item["id_supply_list_items"] for item in items}):
+                result = await db.execute(
+                    update(SupplyListItems)
+                    .where(
+                        SupplyListItems.id_supply_list_items == lot_id,
+                        SupplyListItems.version == versions[lot_id]
+                    )
+                    .values(version=SupplyListItems.version + 1)
+                )
+                if result.rowcount == 0:
+                    raise VersionConflictError(SupplyListItems.__tablename__, lot_id, versions[lot_id], None)
+
+            # Заказ и позиции вставляются с возвратом ключей — готовый заказ не перечитывается
+            order = await insert_returning(db, Orders, {"order_date": date.today(), **order_data})
+            for item in items:
+                item["id_orders"] = order.id_orders
+            await insert_rows(db, OrderListItems, items)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        table_versions.bump("orders", "order_list_items", "supply_list_items")
+        publish_order_event(ORDER_CREATED, model_to_dict(order))
+        return order, items
+
+    async def place(
+        self, db: AsyncSession, order_data: Dict[str, Any], lines: List[Dict[str, Any]]
+    ) -> Tuple[Orders, List[Dict[str, Any]]]:
+        """
+        Создать заказ и распределить его позиции по партиям.
+
+        lines: [{"id_products", "id_warehous", "amount", "price_with_discount"}].
+        Если остатка не хватает — InsufficientStockError, если конфликт версий
+        не разрешился за max_retries повторов — VersionConflictError.
+        """
+        keys = sorted({(line["id_products"], line["id_warehous"]) for line in lines})
+        # Блокировки берутся в фиксированном порядке и не держатся во время паузы перед повтором
+        return await retry_on_conflict(
+            lambda: self._attempt(db, order_data, lines),
+            self.max_retries,
+            self.backoff,
+            locks=[lot_lock(key) for key in keys],
+            on_conflict=lambda e: order_placement_conflicts_total.inc(),
+            failure="Заказ не оформлен",
+        )
+
+
+order_placement = OrderPlacement()
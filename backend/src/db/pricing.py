@@ -0,0 +1,340 @@
+import asyncio
+import logging
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import FIXED_DISCOUNT_TYPE_IDS
+from src.db.db_service import products_service
+from src.db.models import Customer, Discounts, PromoEvents
+from src.db.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+HUNDRED = Decimal(100)
+
+# Таблицы, от которых зависят правила и цены
+RULE_TABLES = ("discounts", "promo_events")
+PRICE_TABLES = ("products", "prise_list")
+
+# Подборки скидок хранятся для стольких сочетаний дата/клиент/событие
+SELECTION_CACHE_SIZE = 1024
+
+# Скидки, из которых выбирается лучшая для категории: лучшие процентная и суммовая
+# среди скидок на эту категорию и на любую категорию
+Candidates = List["DiscountRule"]
+
+
+class PriceNotFoundError(Exception):
+    """У продукта нет цены в прайс-листе"""
+
+    def __init__(self, product_id: int):
+        self.product_id = product_id
+        super().__init__(f"Нет цены для продукта {product_id}")
+
+
+class DiscountRule:
+    """Скомпилированная скидка: значение и условия применения (None — без ограничения)"""
+
+    __slots__ = ("id", "value", "fixed", "event_type", "customer_type", "category",
+                 "date_from", "date_to", "promo_name")
+
+    def __init__(self, row):
+        self.id = row.id_discounts
+        self.value = Decimal(row.discount or 0)
+        self.fixed = row.id_discount_type in FIXED_DISCOUNT_TYPE_IDS
+        self.event_type = row.id_event_type if row.id_event_type is not None else row.promo_event_type
+        self.customer_type = row.id_customer_type
+        self.category = row.id_product_category
+        self.date_from = row.date_from
+        self.date_to = row.date_to
+        self.promo_name = row.event_name
+
+    def key(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def active(self, on_date: date) -> bool:
+        return (self.date_from is None or self.date_from <= on_date) and (self.date_to is None or on_date <= self.date_to)
+
+    def amount(self, price: Decimal) -> Decimal:
+        """Размер скидки с единицы товара по цене price"""
+        if self.fixed:
+            return min(self.value, price)
+        return price * self.value / HUNDRED
+
+
+class PricingEngine:
+    """
+    Расчёт цен со скидками по прайс-листу и действующим акциям.
+
+    Скидки компилируются в индекс событие → тип клиента → категория → правила.
+    Для квоты сначала один раз выбираются правила, подходящие клиенту, событию и дате,
+    и для каждой категории остаются только лучшая процентная и лучшая суммовая скидка;
+    после этого позиция заказа стоит два словарных поиска и пару операций с Decimal.
+    Подборки кэшируются до изменения правил.
+
+    Цены и категории продуктов держатся в памяти и перечитываются, когда меняются
+    версии products/prise_list. При изменении discounts/promo_events перечитываются
+    строки скидок, а в индексе обновляются только изменившиеся правила.
+    """
+
+    def __init__(self):
+        self._rules: Dict[int, DiscountRule] = {}
+        self._index: Dict[Optional[int], Dict[Optional[int], Dict[Optional[int], List[DiscountRule]]]] = {}
+        self._products: Dict[int, Tuple[Optional[int], Optional[Decimal]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._selections: Dict[Tuple[Any, ...], Dict[Optional[int], Candidates]] = {}
+        self._lock = asyncio.Lock()
+
+    def _stale(self, tables: Iterable[str]) -> bool:
+        return any(self._versions.get(table) != table_versions.get(table) for table in tables)
+
+    def _remember(self, tables: Iterable[str]) -> None:
+        for table in tables:
+            self._versions[table] = table_versions.get(table)
+
+    def _add_to_index(self, rule: DiscountRule) -> None:
+        by_customer = self._index.setdefault(rule.event_type, {})
+        by_category = by_customer.setdefault(rule.customer_type, {})
+        by_category.setdefault(rule.category, []).append(rule)
+
+    def _remove_from_index(self, rule: DiscountRule) -> None:
+        by_customer = self._index.get(rule.event_type, {})
+        by_category = by_customer.get(rule.customer_type, {})
+        rules = by_category.get(rule.category, [])
+        rules[:] = [item for item in rules if item.id != rule.id]
+        if not rules:
+            by_category.pop(rule.category, None)
+            if not by_category:
+                by_customer.pop(rule.customer_type, None)
+                if not by_customer:
+                    self._index.pop(rule.event_type, None)
+
+    async def _sync_rules(self, db: AsyncSession) -> None:
+        """Перечитать скидки и обновить в индексе только изменившиеся правила"""
+        self._remember(RULE_TABLES)
+        query = select(
+            Discounts.id_discounts,
+            Discounts.discount,
+            Discounts.id_event_type,
+            Discounts.id_discount_type,
+            Discounts.id_customer_type,
+            Discounts.id_product_category,
+            Discounts.date_from,
+            Discounts.date_to,
+            PromoEvents.id_event_type.label("promo_event_type"),
+            PromoEvents.event_name
+        ).outerjoin(PromoEvents, Discounts.id_promo_events == PromoEvents.id_promo_events)
+        fresh = {rule.id: rule for rule in map(DiscountRule, await db.execute(query))}
+
+        changed = 0
+        for rule_id in [rule_id for rule_id in self._rules if rule_id not in fresh]:
+            self._remove_from_index(self._rules.pop(rule_id))
+            changed += 1
+        for rule_id, rule in fresh.items():
+            current = self._rules.get(rule_id)
+            if current is not None and current.key() == rule.key():
+                continue
+            if current is not None:
+                self._remove_from_index(current)
+            self._add_to_index(rule)
+            self._rules[rule_id] = rule
+            changed += 1
+        if changed:
+            self._selections.clear()
+            logger.info(f"Индекс скидок обновлён: изменено правил {changed}, всего {len(self._rules)}")
+
+    async def _load_prices(self, db: AsyncSession) -> None:
+        self._remember(PRICE_TABLES)
+        self._products = {
+            row["id_products"]: (row["category_id"], row["current_price"])
+            for row in await products_service.get_price_list(db)
+        }
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Перечитать правила и цены, если их таблицы изменились"""
+        if not (self._stale(RULE_TABLES) or self._stale(PRICE_TABLES)):
+            return
+        async with self._lock:
+            if self._stale(RULE_TABLES):
+                await self._sync_rules(db)
+            if self._stale(PRICE_TABLES):
+                await self._load_prices(db)
+
+    def _select(
+        self,
+        on_date: date,
+        customer_type: Optional[int],
+        event_type: Optional[int],
+        discount_id: Optional[int],
+    ) -> Dict[Optional[int], Candidates]:
+        """
+        Лучшие скидки по категориям для клиента, события и даты.
+        Ключ None — скидки без ограничения по категории (подходят к любой).
+        """
+        cache_key = (on_date, customer_type, event_type, discount_id)
+        selection = self._selections.get(cache_key)
+        if selection is not None:
+            return selection
+
+        if discount_id is not None:
+            rule = self._rules.get(discount_id)
+            rules = [rule] if rule is not None else []
+        else:
+            # Без события подходят только скидки, не привязанные к событию
+            events = (None,) if event_type is None else (event_type, None)
+            rules = [
+                rule
+                for event in events
+                for customer in {customer_type, None}
+                for category_rules in self._index.get(event, {}).get(customer, {}).values()
+                for rule in category_rules
+            ]
+
+        best: Dict[Tuple[Optional[int], bool], DiscountRule] = {}
+        for rule in rules:
+            if not rule.active(on_date) or (rule.customer_type not in (None, customer_type)):
+                continue
+            current = best.get((rule.category, rule.fixed))
+            if current is None or rule.value > current.value:
+                best[(rule.category, rule.fixed)] = rule
+
+        categories: Set[Optional[int]] = {category for category, _ in best} | {None}
+        selection = {}
+        for category in categories:
+            candidates = []
+            for fixed in (False, True):
+                for key in ((category, fixed), (None, fixed)):
+                    rule = best.get(key)
+                    if rule is not None:
+                        candidates.append(rule)
+            selection[category] = candidates
+        if len(self._selections) >= SELECTION_CACHE_SIZE:
+            self._selections.clear()
+        self._selections[cache_key] = selection
+        return selection
+
+    async def quote(
+        self,
+        db: AsyncSession,
+        lines: List[Dict[str, Any]],
+        customer_id: Optional[int] = None,
+        customer_type: Optional[int] = None,
+        event_type: Optional[int] = None,
+        discount_id: Optional[int] = None,
+        on_date: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """
+        Цены со скидкой для позиций заказа за один проход.
+
+        lines: [{"id_products", "amount"}]. Для каждой позиции берётся текущая цена
+        и наибольшая из подходящих скидок (или только discount_id, если указана).
+        """
+        on_date = on_date or date.today()
+        await self.refresh(db)
+        if customer_type is None and customer_id is not None:
+            customer_type = (await db.execute(
+                select(Customer.id_customer_type).where(Customer.id_customer == customer_id)
+            )).scalar()
+
+        selection = self._select(on_date, customer_type, event_type, discount_id)
+        any_category = selection[None]
+        products = self._products
+
+        items = []
+        total = Decimal(0)
+        total_discount = Decimal(0)
+        for line in lines:
+            product_id = line["id_products"]
+            category, price = products.get(product_id, (None, None))
+            if price is None:
+                raise PriceNotFoundError(product_id)
+
+            rule = None
+            discount = Decimal(0)
+            for candidate in selection.get(category, any_category):
+                amount = candidate.amount(price)
+                if amount > discount:
+                    rule, discount = candidate, amount
+
+            unit_price = (price - discount).quantize(CENT, ROUND_HALF_UP)
+            line_total = unit_price * line["amount"]
+            total += line_total
+            total_discount += (price - unit_price) * line["amount"]
+            items.append({
+                "id_products": product_id,
+                "amount": line["amount"],
+                "price": price,
+                "id_discounts": rule.id if rule is not None else None,
+                "discount_amount": price - unit_price,
+                "price_with_discount": unit_price,
+                "line_total": line_total,
+            })
+
+        return {
+            "date": on_date,
+            "customer_type": customer_type,
+            "items": items,
+            "total": total,
+            "total_discount": total_discount,
+        }
+
+    async def quote_order(
+        self,
+        db: AsyncSession,
+        lines: List[Dict[str, Any]],
+        customer_id: Optional[int] = None,
+        discount_id: Optional[int] = None,
+        on_date: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """
+        Цены позиций заказа с одной скидкой на весь заказ.
+
+        Заказ хранит одну скидку (orders.id_discounts), поэтому если разным позициям
+        подошли разные скидки, выбирается дающая наибольшую общую выгоду, и позиции
+        переоцениваются только по ней. Применённая скидка возвращается в id_discounts.
+        """
+        quote = await self.quote(db, lines, customer_id=customer_id, discount_id=discount_id, on_date=on_date)
+        savings: Dict[int, Decimal] = {}
+        for item in quote["items"]:
+            if item["id_discounts"] is not None:
+                savings[item["id_discounts"]] = (
+                    savings.get(item["id_discounts"], Decimal(0)) + item["discount_amount"] * item["amount"]
+                )
+        if len(savings) > 1:
+            best = max(savings, key=lambda rule_id: (savings[rule_id], -rule_id))
+            quote = await self.quote(db, lines, customer_id=customer_id, discount_id=best, on_date=on_date)
+            savings = {best: Decimal(0)}
+        quote["id_discounts"] = next(iter(savings), None)
+        return quote
+
+    async def active_promotions(
+        self,
+        db: AsyncSession,
+        customer_type: Optional[int] = None,
+        on_date: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Акции, действующие на дату для типа клиента"""
+        on_date = on_date or date.today()
+        await self.refresh(db)
+        return [
+            {
+                "id_discounts": rule.id,
+                "promo_name": rule.promo_name,
+                "discount": rule.value,
+                "fixed": rule.fixed,
+                "id_event_type": rule.event_type,
+                "id_product_category": rule.category,
+                "date_from": rule.date_from,
+                "date_to": rule.date_to,
+            }
+            for rule in sorted(self._rules.values(), key=lambda rule: rule.id)
+            if rule.active(on_date) and rule.customer_type in (None, customer_type)
+        ]
+
+
+pricing_engine = PricingEngine()
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import Table
+from sqlalchemy.engine import Result
+from sqlalchemy.engine.result import FrozenResult
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import loading
+from sqlalchemy.sql import visitors
+
+from src.core.config import QUERY_CACHE_ENABLED, QUERY_CACHE_MAX_MB, QUERY_CACHE_TTL_SECONDS
+from src.core.metrics import record_cache, registry
+from src.db.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = "query_result"
+
+# Запись больше этой доли бюджета не кэшируется, чтобы один большой отчёт не вытеснил всё остальное
+MAX_ENTRY_SHARE = 4
+
+# Сведения о форме запроса (таблицы, есть ли ORM-сущности) запоминаются для стольких SQL
+STATEMENT_INFO_SIZE = 1024
+
+query_cache_coalesced_total = registry.counter(
+    "query_cache_coalesced_total", "Query cache misses that waited for an identical in-flight query"
+)
+query_cache_evictions_total = registry.counter(
+    "query_cache_evictions_total", "Query cache entries dropped", ("reason",)
+)
+
+
+def _freeze(value: Any) -> Hashable:
+    """Значение параметра в виде, пригодном для ключа словаря"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def _estimate_size(rows) -> int:
+    """Примерный объём строк результата в памяти, байт"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        # Результат с одной ORM-сущностью хранит объекты, а не кортежи
+        for value in row if isinstance(row, tuple) else (row,):
+            size += sys.getsizeof(value)
+            state = getattr(value, "__dict__", None)
+            if state is not None:
+                # ORM-объект: считаются его атрибуты
+                size += sum(sys.getsizeof(item) for item in state.values())
+    return size
+
+
+def statement_tables(statement) -> Tuple[str, ...]:
+    """Таблицы, которые читает запрос, включая подзапросы и CTE"""
+    return tuple(sorted({element.name for element in visitors.iterate(statement) if isinstance(element, Table)}))
+
+
+def _has_entities(statement) -> bool:
+    """Выбирает ли запрос ORM-сущности целиком (а не отдельные колонки)"""
+    return any(
+        description.get("entity") is not None and description.get("expr") is description.get("entity")
+        for description in getattr(statement, "column_descriptions", ())
+    )
+
+
+class _Entry:
+    __slots__ = ("result", "size", "tables", "versions", "expires")
+
+    def __init__(self, result: FrozenResult, size: int, tables: Tuple[str, ...],
+                 versions: Tuple[int, ...], expires: float):
+        self.result = result
+        self.size = size
+        self.tables = tables
+        self.versions = versions
+        self.expires = expires
+
+
+class QueryCache:
+    """
+    Кэш результатов SELECT-запросов.
+
+    Ключ — движок (основная БД или реплика), скомпилированный для его диалекта SQL
+    и значения параметров. Вместе с результатом
+    хранятся версии таблиц, которые читает запрос (по его FROM, подзапросам и CTE):
+    запись через DBService увеличивает версию таблицы, и при следующем обращении
+    устаревшая запись выбрасывается. Объём записей оценивается, при превышении бюджета
+    вытесняются давно не использованные (LRU).
+
+    Одинаковые промахи, пришедшие одновременно, ждут один запрос к БД, а не выполняют
+    его каждый. Результат хранится «замороженным» и для каждого вызова
+    размораживается в новый Result; ORM-объекты копируются в сессию вызывающего.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = int(QUERY_CACHE_MAX_MB * 1024 * 1024),
+        ttl_seconds: float = QUERY_CACHE_TTL_SECONDS,
+        enabled: bool = QUERY_CACHE_ENABLED,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.enabled = enabled
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._statements: Dict[str, Tuple[Tuple[str, ...], bool]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _describe(self, db: AsyncSession, statement, params: Optional[Dict[str, Any]]):
+        """Ключ записи, таблицы запроса и есть ли в нём ORM-сущности"""
+        bind = db.get_bind()
+        compiled = statement.compile(dialect=bind.dialect)
+        sql = str(compiled)
+        bound = dict(compiled.params)
+        if params:
+            bound.update(params)
+        info = self._statements.get(sql)
+        if info is None:
+            if len(self._statements) >= STATEMENT_INFO_SIZE:
+                self._statements.clear()
+            info = self._statements[sql] = (statement_tables(statement), _has_entities(statement))
+        tables, entities = info
+        # Результаты основной БД и реплики хранятся отдельно
+        return (bind, sql, _freeze(bound)), tables, entities
+
+    @staticmethod
+    def _versions(tables: Tuple[str, ...]) -> Tuple[int, ...]:
+        return tuple(table_versions.get(table) for table in tables)
+
+    def _drop(self, key: Hashable, reason: str) -> None:
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+        query_cache_evictions_total.inc(reason=reason)
+
+    def _lookup(self, key: Hashable) -> Optional[FrozenResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.versions != self._versions(entry.tables):
+            self._drop(key, "invalidated")
+            return None
+        if entry.expires < time.monotonic():
+            self._drop(key, "expired")
+            return None
+        self._entries.move_to_end(key)
+        return entry.result
+
+    def _store(self, key: Hashable, result: FrozenResult, tables: Tuple[str, ...], versions: Tuple[int, ...]) -> None:
+        size = _estimate_size(result.data)
+        if size > self.max_bytes // MAX_ENTRY_SHARE:
+            return
+        if key in self._entries:
+            self._drop(key, "replaced")
+        self._entries[key] = _Entry(result, size, tables, versions, time.monotonic() + self.ttl)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)), "size")
+
+    @staticmethod
+    def _thaw(db: AsyncSession, statement, result: FrozenResult, entities: bool) -> Result:
+        if entities:
+            # Объекты из кэша переносятся в сессию вызывающего без запроса к БД
+            result = loading.merge_frozen_result(db.sync_session, statement, result, load=False)
+        return result()
+
+    async def execute(self, db: AsyncSession, statement, params: Optional[Dict[str, Any]] = None) -> Result:
+        """Выполнить SELECT с кэшированием результата"""
+        if not self.enabled:
+            return await db.execute(statement, params)
+
+        key, tables, entities = self._describe(db, statement, params)
+        cached = self._lookup(key)
+        if cached is not None:
+            record_cache(CACHE_NAME, hit=True)
+            return self._thaw(db, statement, cached, entities)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Такой же запрос уже выполняется — ждём его результат
+            query_cache_coalesced_total.inc()
+            record_cache(CACHE_NAME, hit=True)
+            frozen, error = await asyncio.shield(inflight)
+            if error is not None:
+                raise error
+            if frozen is not None:
+                return self._thaw(db, statement, frozen, entities)
+            # Выполнявший запрос был отменён — выполняем сами
+            return await db.execute(statement, params)
+
+        record_cache(CACHE_NAME, hit=False)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        # Версии снимаются до запроса: запись, пришедшая во время него, сделает результат устаревшим
+        versions = self._versions(tables)
+        try:
+            frozen = (await db.execute(statement, params)).freeze()
+        except Exception as e:
+            future.set_result((None, e))
+            raise
+        except BaseException:
+            future.set_result((None, None))
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result((frozen, None))
+        self._store(key, frozen, tables, versions)
+        return self._thaw(db, statement, frozen, entities)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+query_cache = QueryCache()
+
+registry.gauge(
+    "query_cache_bytes", "Estimated memory held by the query result cache",
+    collect=lambda: {(): query_cache.size},
+)
+registry.gauge(
+    "query_cache_entries", "Entries in the query result cache",
+    collect=lambda: {(): len(query_cache)},
+)
@@ -0,0 +1,270 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class ORMSchema(BaseModel):
+    """Базовая схема ответа, читается напрямую из ORM-объектов"""
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Схемы ответов по моделям (названия полей совпадают с колонками таблиц)
+
+class SuppliesRead(ORMSchema):
+    id_supplies: int
+    supp_date: Optional[date] = None
+    doc_num: Optional[str] = None
+    commenst: Optional[str] = None
+    id_supply_type: Optional[int] = None
+    id_supplier: Optional[int] = None
+
+
+class SupplyListItemsRead(ORMSchema):
+    id_supply_list_items: int
+    price: Optional[Decimal] = None
+    amount: Optional[int] = None
+    comment: Optional[str] = None
+    id_supplies: Optional[int] = None
+    id_warehous: Optional[int] = None
+    id_products: Optional[int] = None
+    version: Optional[int] = None
+
+
+class OrdersRead(ORMSchema):
+    id_orders: int
+    order_date: Optional[date] = None
+    doc_num: Optional[str] = None
+    comments: Optional[str] = None
+    id_customer: Optional[int] = None
+    id_discounts: Optional[int] = None
+    id_employee: Optional[int] = None
+    id_order_type: Optional[int] = None
+    id_order_status: Optional[int] = None
+    version: Optional[int] = None
+
+
+class OrderListItemsRead(ORMSchema):
+    id_order_list_items: int
+    amount: Optional[int] = None
+    price_with_discount: Optional[Decimal] = None
+    id_orders: Optional[int] = None
+    id_supply_list_items: Optional[int] = None
+
+
+# Составные ответы сервисов
+class PriceListRow(BaseModel):
+    id_products: int
+    products_name: Optional[str] = None
+    category_id: Optional[int] = None
+    current_price: Optional[Decimal] = None
+    price_date: Optional[date] = None
+
+
+class StockRow(BaseModel):
+    id_products: int
+    products_name: Optional[str] = None
+    warehouse_id: Optional[int] = None
+    remaining: Optional[int] = None
+
+
+class OrderItemRow(BaseModel):
+    id: int
+    product_name: Optional[str] = None
+    amount: Optional[int] = None
+    original_price: Optional[Decimal] = None
+    price_with_discount: Optional[Decimal] = None
+    discount_amount: Optional[Decimal] = None
+
+
+class OrderCustomer(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    org_name: Optional[str] = None
+
+
+class OrderWithItems(BaseModel):
+    order_id: int
+    order_date: Optional[date] = None
+    doc_num: Optional[str] = None
+    comments: Optional[str] = None
+    customer: OrderCustomer
+    status_id: Optional[int] = None
+    type_id: Optional[int] = None
+    discount_id: Optional[int] = None
+    employee_id: Optional[int] = None
+    items: List[OrderItemRow]
+    total_amount: int
+    total_sum: Decimal
+
+
+# Запросы
+class AllocationLine(BaseModel):
+    id_products: int
+    id_warehous: int
+    amount: int = Field(gt=0)
+    price_with_discount: Optional[Decimal] = None
+
+
+class AllocatedItem(BaseModel):
+    id_order_list_items: Optional[int] = None
+    id_orders: int
+    id_supply_list_items: int
+    amount: int
+    price_with_discount: Optional[Decimal] = None
+
+
+class OrderCreate(BaseModel):
+    id_customer: int
+    order_date: Optional[date] = None
+    doc_num: Optional[str] = Field(default=None, max_length=50)
+    comments: Optional[str] = Field(default=None, max_length=500)
+    id_discounts: Optional[int] = None
+    id_employee: Optional[int] = None
+    id_order_type: Optional[int] = None
+    id_order_status: Optional[int] = None
+    items: List[AllocationLine] = Field(min_length=1)
+
+
+class OrderUpdate(BaseModel):
+    order_date: Optional[date] = None
+    doc_num: Optional[str] = Field(default=None, max_length=50)
+    comments: Optional[str] = Field(default=None, max_length=500)
+    id_customer: Optional[int] = None
+    id_discounts: Optional[int] = None
+    id_employee: Optional[int] = None
+    id_order_type: Optional[int] = None
+    id_order_status: Optional[int] = None
+    # Версия, которую видел клиент: запись обновится, только если её никто не изменил
+    version: int
+
+
+class PlacedOrder(BaseModel):
+    order: OrdersRead
+    items: List[AllocatedItem]
+
+
+class SupplyLine(BaseModel):
+    id_products: int
+    id_warehous: Optional[int] = None
+    amount: int = Field(gt=0)
+    price: Decimal = Field(ge=0)
+    comment: Optional[str] = Field(default=None, max_length=500)
+
+
+class SupplyCreate(BaseModel):
+    supp_date: Optional[date] = None
+    doc_num: Optional[str] = Field(default=None, max_length=20)
+    commenst: Optional[str] = Field(default=None, max_length=500)
+    id_supply_type: Optional[int] = None
+    id_supplier: Optional[int] = None
+    # Склад по умолчанию для позиций без своего склада
+    id_warehous: Optional[int] = None
+    items: List[SupplyLine] = Field(min_length=1)
+
+
+class CreatedSupply(BaseModel):
+    supply: SuppliesRead
+    items: List[SupplyListItemsRead]
+
+
+class ActivityEvent(BaseModel):
+    name: str = Field(min_length=1, max_length=500)
+    object_id: Optional[int] = None
+
+
+class FormStatsRow(BaseModel):
+    name: str
+    visits: int
+    last_visit: Optional[datetime] = None
+
+
+class FormStats(BaseModel):
+    period: str
+    since: Optional[date] = None
+    total_visits: int
+    forms: List[FormStatsRow]
+
+
+class QuoteLine(BaseModel):
+    id_products: int
+    amount: int = Field(gt=0)
+
+
+class QuoteRequest(BaseModel):
+    id_customer: Optional[int] = None
+    id_customer_type: Optional[int] = None
+    id_event_type: Optional[int] = None
+    id_discounts: Optional[int] = None
+    on_date: Optional[date] = None
+    items: List[QuoteLine] = Field(min_length=1)
+
+
+class QuotedLine(BaseModel):
+    id_products: int
+    amount: int
+    price: Decimal
+    id_discounts: Optional[int] = None
+    discount_amount: Decimal
+    price_with_discount: Decimal
+    line_total: Decimal
+
+
+class Quote(BaseModel):
+    date: date
+    customer_type: Optional[int] = None
+    items: List[QuotedLine]
+    total: Decimal
+    total_discount: Decimal
+
+
+class PromotionRow(BaseModel):
+    id_discounts: int
+    promo_name: Optional[str] = None
+    discount: Decimal
+    fixed: bool
+    id_event_type: Optional[int] = None
+    id_product_category: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+
+class NamedRef(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+
+
+class CustomerContact(BaseModel):
+    id: int
+    type_id: Optional[int] = None
+    type: Optional[str] = None
+    value: Optional[str] = None
+
+
+class CustomerRecentOrder(BaseModel):
+    id_orders: int
+    order_date: Optional[date] = None
+    doc_num: Optional[str] = None
+    status_id: Optional[int] = None
+    status: Optional[str] = None
+    items_amount: int
+    total: Decimal
+
+
+class CustomerSummary(BaseModel):
+    id_customer: int
+    name: str
+    first_name: Optional[str] = None
+    middle_name: Optional[str] = None
+    last_name: Optional[str] = None
+    org_office_name: Optional[str] = None
+    position: Optional[str] = None
+    reg_date: Optional[date] = None
+    district: NamedRef
+    customer_type: NamedRef
+    contacts: List[CustomerContact]
+    order_count: int
+    revenue: Decimal
+    last_order_date: Optional[date] = None
+    recent_orders: List[CustomerRecentOrder]
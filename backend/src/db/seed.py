@@ -0,0 +1,376 @@
+"""
+Генератор синтетических данных для всех таблиц models.py.
+
+Заполняет пустую базу согласованными по внешним ключам данными заданного объёма
+пакетными вставками (executemany по чанкам). Идентификаторы задаются явно, поэтому
+связи строятся без чтения сгенерированных ключей обратно.
+
+Запуск из каталога backend:
+    python -m src.db.seed --scale small [--reset] [--seed 42]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.db_config import engine, create_all
+from src.db.models import *
+from src.db.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+# Объёмы данных по профилям
+SCALES: Dict[str, Dict[str, int]] = {
+    "tiny": {
+        "customers": 200, "employees": 10, "suppliers": 10, "products": 50, "price_changes": 4,
+        "supplies": 200, "lots_per_supply": 5, "orders": 1_000, "items_per_order": 3,
+        "write_off_share_pct": 5, "form_visits": 1_000,
+    },
+    "small": {
+        "customers": 5_000, "employees": 40, "suppliers": 50, "products": 300, "price_changes": 8,
+        "supplies": 5_000, "lots_per_supply": 8, "orders": 50_000, "items_per_order": 3,
+        "write_off_share_pct": 5, "form_visits": 20_000,
+    },
+    "full": {
+        "customers": 100_000, "employees": 200, "suppliers": 300, "products": 2_000, "price_changes": 24,
+        "supplies": 100_000, "lots_per_supply": 10, "orders": 1_250_000, "items_per_order": 4,
+        "write_off_share_pct": 5, "form_visits": 500_000,
+    },
+}
+
+CHUNK_SIZE = 5_000
+START_DATE = date(2022, 1, 1)
+END_DATE = date(2025, 4, 1)
+
+FIRST_NAMES = ["Анна", "Мария", "Елена", "Ольга", "Иван", "Сергей", "Алексей", "Дмитрий", "Наталья", "Ирина"]
+MIDDLE_NAMES = ["Ивановна", "Петровна", "Сергеевна", "Иванович", "Петрович", "Сергеевич", "Алексеевич"]
+LAST_NAMES = ["Иванова", "Петрова", "Смирнова", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлова"]
+FLOWERS = ["Роза", "Тюльпан", "Хризантема", "Лилия", "Гвоздика", "Пион", "Орхидея", "Гербера", "Ирис", "Эустома"]
+COLORS = ["красная", "белая", "розовая", "жёлтая", "кремовая", "бордовая", "сиреневая", "оранжевая"]
+
+DICTIONARIES: Dict[Any, List[Dict[str, Any]]] = {
+    District: [{"district": name} for name in ["Центральный", "Северный", "Южный", "Западный", "Восточный", "Пригород"]],
+    CustomerType: [{"customer_type": name} for name in ["Физическое лицо", "Юридическое лицо", "Оптовый покупатель"]],
+    ContType: [{"cont_type": name} for name in ["Телефон", "Email", "Telegram", "Адрес доставки"]],
+    DiscountType: [{"discount_type": name} for name in ["Процент", "Фиксированная сумма"]],
+    EventType: [{"event_type": name} for name in ["8 Марта", "14 Февраля", "1 Сентября", "Новый год", "Распродажа"]],
+    OrderStatus: [{"order_status": name} for name in ["Новый", "Оплачен", "Собран", "Доставлен", "Отменён"]],
+    OrderType: [{"order_type": name} for name in ["Розница", "Опт", "Корпоративный"]],
+    PaymentType: [{"payment_type": name} for name in ["Наличные", "Карта", "Безналичный перевод"]],
+    EmployeePositions: [{"employee_positions": name} for name in ["Администратор", "Продавец", "Бухгалтер", "Кладовщик", "Флорист"]],
+    RewardType: [{"reward_type": name} for name in ["Оклад", "Премия", "Бонус"]],
+    TaxType: [
+        {"tax_type": "НДС", "tax_rate": 0.12, "comments": None},
+        {"tax_type": "Подоходный налог", "tax_rate": 0.10, "comments": None},
+        {"tax_type": "Социальный налог", "tax_rate": 0.095, "comments": None},
+    ],
+    Warehouse: [{"warehous": name} for name in ["Основной склад", "Холодильная камера", "Склад №2", "Магазин"]],
+    SupplyType: [{"supply_type": name} for name in ["Плановая", "Срочная", "Возврат"]],
+    ProductCategory: [{"product_category": name} for name in ["Срезанные цветы", "Горшечные растения", "Букеты", "Упаковка", "Удобрения"]],
+    WriteOffsType: [{"write_offs_type": name} for name in ["Истёк срок", "Брак", "Повреждение", "Инвентаризация"]],
+}
+
+FORMS = [
+    "/mainpage", "/customer/price-list", "/customer/order-details", "/customer/orders", "/sales/orders",
+    "/sales/client-debts", "/supplies/supplier-debts", "/supplies/create-supply",
+    "/accountant/total-turnover", "/accountant/employee-salary", "/admin/form-stats",
+]
+
+# Порядок удаления: сначала зависимые таблицы
+DELETE_ORDER = [
+    OrderListItems, Orders, WriteOffsList, SupplyListItems, SuppliesPayment, Supplies, CustConts, Customer,
+    Discounts, PromoEvents, EmplSalary, Employee, PriseList, Products, ReportsAndFrorms,
+    *DICTIONARIES.keys(), Supplier,
+]
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _random_date(rnd: random.Random, start: date = START_DATE, end: date = END_DATE) -> date:
+    return start + timedelta(days=rnd.randrange((end - start).days))
+
+
+def _money(rnd: random.Random, low: int, high: int) -> Decimal:
+    return Decimal(rnd.randint(low * 100, high * 100)) / Decimal(100)
+
+
+class DatasetGenerator:
+    """Генерирует строки таблиц по профилю объёма"""
+
+    def __init__(self, scale: Dict[str, int], seed: int = 42):
+        self.scale = scale
+        self.rnd = random.Random(seed)
+        self.counts = {model: len(rows) for model, rows in DICTIONARIES.items()}
+        # Даты поставок и партий (по возрастанию id) — для выбора партии не позже даты заказа
+        self.lot_dates: List[date] = []
+        self.lot_products: List[int] = []
+        self.lot_remaining: List[int] = []
+
+    def _dict_id(self, model) -> int:
+        return self.rnd.randint(1, self.counts[model])
+
+    def dictionaries(self) -> Iterator[tuple]:
+        for model, rows in DICTIONARIES.items():
+            primary_key = model.__table__.primary_key.columns.values()[0].name
+            yield model, [{primary_key: i, **row} for i, row in enumerate(rows, start=1)]
+
+    def suppliers(self) -> Iterator[Dict[str, Any]]:
+        for i in range(1, self.scale["suppliers"] + 1):
+            yield {"id_supplier": i, "supplier_org_name": f"ТОО «Флора-{i}»",
+                   "reg_date": _random_date(self.rnd), "comments": None}
+
+    def products(self) -> Iterator[Dict[str, Any]]:
+        for i in range(1, self.scale["products"] + 1):
+            flower = FLOWERS[i % len(FLOWERS)]
+            color = COLORS[(i // len(FLOWERS)) % len(COLORS)]
+            yield {"id_products": i, "products_name": f"{flower} {color} #{i}", "reg_date": START_DATE,
+                   "prod_description": f"{flower}, {color}", "id_product_category": self._dict_id(ProductCategory)}
+
+    def price_list(self) -> Iterator[Dict[str, Any]]:
+        changes = self.scale["price_changes"]
+        step = (END_DATE - START_DATE).days // changes
+        row_id = 0
+        for product_id in range(1, self.scale["products"] + 1):
+            price = _money(self.rnd, 200, 5000)
+            for change in range(changes):
+                row_id += 1
+                price = (price * Decimal(self.rnd.uniform(0.95, 1.12))).quantize(Decimal("0.01"))
+                yield {"id_prise_list": row_id, "prise_": price,
+                       "date_of_change": START_DATE + timedelta(days=change * step),
+                       "descriptions": None, "id_products": product_id}
+
+    def employees(self) -> Iterator[Dict[str, Any]]:
+        for i in range(1, self.scale["employees"] + 1):
+            yield {"id_employee": i, "first_name": self.rnd.choice(FIRST_NAMES),
+                   "middle_name": self.rnd.choice(MIDDLE_NAMES), "last_name": self.rnd.choice(LAST_NAMES),
+                   "salary_size": _money(self.rnd, 150000, 600000), "reg_date": _random_date(self.rnd),
+                   "phone": f"+7701{self.rnd.randint(1000000, 9999999)}",
+                   "id_employee_positions": self._dict_id(EmployeePositions)}
+
+    def salaries(self) -> Iterator[Dict[str, Any]]:
+        row_id = 0
+        months = (END_DATE.year - START_DATE.year) * 12 + END_DATE.month - START_DATE.month
+        for employee_id in range(1, self.scale["employees"] + 1):
+            for month in range(months):
+                row_id += 1
+                yield {"id_empl_salary": row_id,
+                       "sal_date": date(START_DATE.year + month // 12, month % 12 + 1, 25),
+                       "salary": _money(self.rnd, 150000, 600000), "comments": None,
+                       "id_employee": employee_id, "id_reward_type": self._dict_id(RewardType)}
+
+    def promo_events(self) -> Iterator[Dict[str, Any]]:
+        for i in range(1, self.counts[EventType] * 3 + 1):
+            yield {"id_promo_events": i, "event_name": f"Акция {i}", "evnt_comments": None,
+                   "id_event_type": (i - 1) % self.counts[EventType] + 1}
+
+    def discounts(self) -> Iterator[Dict[str, Any]]:
+        span = (END_DATE - START_DATE).days
+        for i in range(1, self.counts[EventType] * 3 + 1):
+            percent = Decimal(self.rnd.choice([5, 10, 15, 20]))
+            # Условия выводятся из номера, а не из rnd, чтобы не сдвигать остальные данные
+            fixed = i % 5 == 0
+            date_from = START_DATE + timedelta(days=(i * 37) % span) if i % 2 == 0 else None
+            yield {"id_discounts": i, "discount": percent * 50 if fixed else percent,
+                   "id_promo_events": i, "id_event_type": (i - 1) % self.counts[EventType] + 1,
+                   "id_discount_type": 2 if fixed else 1,
+                   "id_customer_type": i % self.counts[CustomerType] + 1 if i % 4 == 0 else None,
+                   "id_product_category": i % self.counts[ProductCategory] + 1 if i % 3 == 0 else None,
+                   "date_from": date_from, "date_to": date_from + timedelta(days=30) if date_from else None}
+
+    def customers(self) -> Iterator[Dict[str, Any]]:
+        for i in range(1, self.scale["customers"] + 1):
+            customer_type = self._dict_id(CustomerType)
+            yield {"id_customer": i, "first_name": self.rnd.choice(FIRST_NAMES),
+                   "middle_name": self.rnd.choice(MIDDLE_NAMES), "last_name": self.rnd.choice(LAST_NAMES),
+                   "reg_date": _random_date(self.rnd),
+                   "org_office_name": f"ТОО «Клиент-{i}»" if customer_type != 1 else None,
+                   "position": None, "pasp_num": f"N{self.rnd.randint(10000000, 99999999)}",
+                   "login_": f"user{i}", "passwrd": f"pass{i}",
+                   "id_district": self._dict_id(District), "id_customer_type": customer_type}
+
+    def customer_contacts(self) -> Iterator[Dict[str, Any]]:
+        row_id = 0
+        for customer_id in range(1, self.scale["customers"] + 1):
+            for cont_type in range(1, self.rnd.randint(1, 3) + 1):
+                row_id += 1
+                value = f"+7701{self.rnd.randint(1000000, 9999999)}" if cont_type == 1 else f"user{customer_id}@mail.kz"
+                yield {"id_cust_conts": row_id, "cust_conts": value,
+                       "id_customer": customer_id, "id_cont_type": cont_type}
+
+    def supplies(self) -> Iterator[Dict[str, Any]]:
+        # Поставки упорядочены по дате, чтобы id партий росли вместе с датой поставки
+        dates = sorted(_random_date(self.rnd) for _ in range(self.scale["supplies"]))
+        self.supply_dates = dates
+        for i, supp_date in enumerate(dates, start=1):
+            yield {"id_supplies": i, "supp_date": supp_date, "doc_num": f"П-{i:07d}", "commenst": None,
+                   "id_supply_type": self._dict_id(SupplyType), "id_supplier": self.rnd.randint(1, self.scale["suppliers"])}
+
+    def supplies_payments(self) -> Iterator[Dict[str, Any]]:
+        for i, supp_date in enumerate(self.supply_dates, start=1):
+            yield {"id_supplies_payment": i, "payment_amount": _money(self.rnd, 50000, 2000000),
+                   "payment_date": supp_date + timedelta(days=self.rnd.randint(0, 30)), "payment_commnets": None,
+                   "id_supplies": i, "id_payment_type": self._dict_id(PaymentType)}
+
+    def supply_list_items(self) -> Iterator[Dict[str, Any]]:
+        row_id = 0
+        for supply_id, supp_date in enumerate(self.supply_dates, start=1):
+            for _ in range(self.scale["lots_per_supply"]):
+                row_id += 1
+                product_id = self.rnd.randint(1, self.scale["products"])
+                amount = self.rnd.randint(20, 500)
+                self.lot_dates.append(supp_date)
+                self.lot_products.append(product_id)
+                self.lot_remaining.append(amount)
+                yield {"id_supply_list_items": row_id, "price": _money(self.rnd, 100, 3000), "amount": amount,
+                       "comment": None, "id_supplies": supply_id, "id_warehous": self._dict_id(Warehouse),
+                       "id_products": product_id}
+
+    def orders(self) -> Iterator[Dict[str, Any]]:
+        # Заказы не раньше первой поставки, чтобы у каждой позиции была доступная партия
+        first_supply = self.supply_dates[0]
+        for i in range(1, self.scale["orders"] + 1):
+            yield {"id_orders": i, "order_date": _random_date(self.rnd, first_supply + timedelta(days=1)),
+                   "doc_num": f"З-{i:08d}", "comments": None,
+                   "id_customer": self.rnd.randint(1, self.scale["customers"]),
+                   "id_discounts": self.rnd.randint(1, self.counts[EventType] * 3) if self.rnd.random() < 0.2 else None,
+                   "id_employee": self.rnd.randint(1, self.scale["employees"]),
+                   "id_order_type": self._dict_id(OrderType), "id_order_status": self._dict_id(OrderStatus)}
+
+    def order_list_items(self, order_dates: List[date]) -> Iterator[Dict[str, Any]]:
+        row_id = 0
+        for order_id, order_date in enumerate(order_dates, start=1):
+            # Партии, поступившие не позже даты заказа
+            available = bisect_right(self.lot_dates, order_date)
+            for _ in range(self.rnd.randint(1, self.scale["items_per_order"] * 2 - 1)):
+                for _attempt in range(5):
+                    lot = self.rnd.randrange(available)
+                    if self.lot_remaining[lot] > 0:
+                        break
+                else:
+                    continue
+                amount = min(self.rnd.randint(1, 25), self.lot_remaining[lot])
+                self.lot_remaining[lot] -= amount
+                row_id += 1
+                yield {"id_order_list_items": row_id, "amount": amount,
+                       "price_with_discount": _money(self.rnd, 200, 6000),
+                       "id_orders": order_id, "id_supply_list_items": lot + 1}
+
+    def write_offs(self) -> Iterator[Dict[str, Any]]:
+        row_id = 0
+        share = self.scale["write_off_share_pct"] / 100
+        for lot, remaining in enumerate(self.lot_remaining):
+            if remaining > 0 and self.rnd.random() < share:
+                row_id += 1
+                amount = self.rnd.randint(1, remaining)
+                self.lot_remaining[lot] -= amount
+                yield {"id_write_offs_list": row_id,
+                       "write_off_date": self.lot_dates[lot] + timedelta(days=self.rnd.randint(3, 20)),
+                       "amount": amount, "comments": None, "id_supply_list_items": lot + 1,
+                       "id_write_offs_type": self._dict_id(WriteOffsType)}
+
+    def form_visits(self) -> Iterator[Dict[str, Any]]:
+        start = datetime.combine(START_DATE, datetime.min.time())
+        span = int((END_DATE - START_DATE).total_seconds())
+        for i in range(1, self.scale["form_visits"] + 1):
+            form_id = self.rnd.randrange(len(FORMS))
+            yield {"id_reports_and_froms": i, "date_time": start + timedelta(seconds=self.rnd.randrange(span)),
+                   "reports_and_froms_name": FORMS[form_id], "reports_and_froms_type": 1,
+                   "reports_and_froms_id": form_id + 1}
+
+
+async def bulk_insert(engine: AsyncEngine, model, rows: Iterable[Dict[str, Any]]) -> int:
+    """Вставить строки чанками в одной транзакции, вернуть количество"""
+    total = 0
+    async with engine.begin() as conn:
+        for chunk in _chunks(rows):
+            await conn.execute(insert(model), chunk)
+            total += len(chunk)
+    table_versions.bump(model.__tablename__)
+    return total
+
+
+async def reset_data(engine: AsyncEngine) -> None:
+    """Удалить все данные (в порядке зависимостей)"""
+    async with engine.begin() as conn:
+        for model in DELETE_ORDER:
+            await conn.execute(delete(model))
+    table_versions.bump(*(model.__tablename__ for model in DELETE_ORDER))
+
+
+async def seed(engine: AsyncEngine, scale: Dict[str, int], seed_value: int = 42) -> Dict[str, int]:
+    """Заполнить базу синтетическими данными, вернуть число строк по таблицам"""
+    generator = DatasetGenerator(scale, seed_value)
+    counts: Dict[str, int] = {}
+
+    async def load(model, rows) -> None:
+        started = time.perf_counter()
+        counts[model.__tablename__] = await bulk_insert(engine, model, rows)
+        logger.info(f"{model.__tablename__}: {counts[model.__tablename__]} строк за {time.perf_counter() - started:.1f} с")
+
+    for model, rows in generator.dictionaries():
+        await load(model, rows)
+    await load(Supplier, generator.suppliers())
+    await load(Products, generator.products())
+    await load(PriseList, generator.price_list())
+    await load(Employee, generator.employees())
+    await load(EmplSalary, generator.salaries())
+    await load(PromoEvents, generator.promo_events())
+    await load(Discounts, generator.discounts())
+    await load(Customer, generator.customers())
+    await load(CustConts, generator.customer_contacts())
+    await load(Supplies, generator.supplies())
+    await load(SuppliesPayment, generator.supplies_payments())
+    await load(SupplyListItems, generator.supply_list_items())
+
+    order_dates: List[date] = []
+
+    def orders_with_dates():
+        for row in generator.orders():
+            order_dates.append(row["order_date"])
+            yield row
+
+    await load(Orders, orders_with_dates())
+    await load(OrderListItems, generator.order_list_items(order_dates))
+    await load(WriteOffsList, generator.write_offs())
+    await load(ReportsAndFrorms, generator.form_visits())
+    return counts
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="удалить существующие данные перед загрузкой")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    try:
+        await create_all()
+        if args.reset:
+            await reset_data(engine)
+        started = time.perf_counter()
+        counts = await seed(engine, SCALES[args.scale], args.seed)
+        logger.info(f"Загружено {sum(counts.values())} строк в {len(counts)} таблиц за {time.perf_counter() - started:.1f} с")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
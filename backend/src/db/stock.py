@@ -0,0 +1,21 @@
+from sqlalchemy import ColumnElement, func, select
+
+from src.db.models import OrderListItems, SupplyListItems, WriteOffsList
+
+
+def remaining_stock_subquery(lot=SupplyListItems, items=OrderListItems, write_offs=WriteOffsList) -> ColumnElement:
+    """
+    Остаток партии: поставлено − продано − списано.
+
+    Продажи и списания считаются коррелированными подзапросами по индексам
+    order_list_items/write_offs_list, так что стоимость выражения зависит от
+    числа выбранных партий, а не от размера таблиц. lot, items и write_offs —
+    модели или их псевдонимы (например, архивные таблицы).
+    """
+    sold = select(func.coalesce(func.sum(items.amount), 0)).where(
+        items.id_supply_list_items == lot.id_supply_list_items
+    ).scalar_subquery()
+    written_off = select(func.coalesce(func.sum(write_offs.amount), 0)).where(
+        write_offs.id_supply_list_items == lot.id_supply_list_items
+    ).scalar_subquery()
+    return func.coalesce(lot.amount, 0) - sold - written_off
@@ -0,0 +1,61 @@
+import time
+import uuid
+import hashlib
+from email.utils import formatdate
+from typing import Dict, Iterable, Optional
+
+
+class TableVersions:
+    """
+    Счётчики версий таблиц.
+
+    Каждая запись через DBService увеличивает версию своей таблицы,
+    поэтому по набору версий можно понять, изменились ли данные эндпоинта,
+    не обращаясь к базе.
+    """
+
+    def __init__(self):
+        # Идентификатор запуска: после рестарта процесса старые ETag недействительны
+        self._boot_id = uuid.uuid4().hex
+        self._started_at = time.time()
+        self._versions: Dict[str, int] = {}
+        self._modified_at: Dict[str, float] = {}
+
+    def bump(self, *tables: str) -> None:
+        """Увеличить версию таблиц после записи"""
+        now = time.time()
+        for table in tables:
+            self._versions[table] = self._versions.get(table, 0) + 1
+            self._modified_at[table] = now
+
+    def get(self, table: str) -> int:
+        """Текущая версия таблицы"""
+        return self._versions.get(table, 0)
+
+    def etag(self, tables: Iterable[str], extra: Optional[str] = None) -> str:
+        """Сформировать ETag по версиям таблиц (и доп. ключу, например параметрам запроса)"""
+        parts = [self._boot_id]
+        parts.extend(f"{table}:{self.get(table)}" for table in sorted(set(tables)))
+        if extra:
+            parts.append(extra)
+        digest = hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest()
+        return f'W/"{digest}"'
+
+    def last_modified(self, tables: Iterable[str]) -> float:
+        """Время последнего изменения любой из таблиц (unix time)"""
+        return max(
+            (self._modified_at.get(table, self._started_at) for table in tables),
+            default=self._started_at,
+        )
+
+    def modified_within(self, tables: Iterable[str], seconds: float) -> bool:
+        """Менялась ли какая-то из таблиц за последние seconds секунд (после запуска)"""
+        since = time.time() - seconds
+        return any(self._modified_at.get(table, 0.0) > since for table in tables)
+
+    def last_modified_http(self, tables: Iterable[str]) -> str:
+        """Время последнего изменения в формате заголовка Last-Modified"""
+        return formatdate(self.last_modified(tables), usegmt=True)
+
+
+table_versions = TableVersions()
@@ -1,14 +1,28 @@
 import asyncio
 import logging
 import contextlib
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
-from src.core.db_config import get_db, create_all
+from src.api.compression import CompressionMiddleware
+from src.api.responses import ORJSONDecimalResponse, ORJSONDecimalRoute
+from src.core.config import (
+    COMPRESSION_MIN_SIZE,
+    PROFILING_ENABLED,
+    EXPIRY_SCAN_INTERVAL_SECONDS,
+    EXPIRY_WRITE_OFF_TYPE_ID,
+)
+from src.core.profiling import ProfilingMiddleware
+from src.core.db_config import async_session, db_probe, read_probe, read_router
+from src.core.db_routing import ReadYourWritesMiddleware
+from src.core.metrics import MetricsMiddleware, registry
 from src.db.init_db import initialize_database
+from src.db.expiry import run_expiry_scanner
+from src.db.activity_log import activity_buffer
+from src.db.order_events import order_events
 from uvicorn import Config, Server
 
-# from src.api.routes import v1
+from src.api.routes import v1
 
 # Настройка логирования
 logging.basicConfig(
@@ -29,16 +43,35 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Ошибка при инициализации базы данных: {e}")
         raise
+
+    # Фоновые задачи
+    activity_buffer.start(async_session)
+    background_tasks = []
+    if EXPIRY_SCAN_INTERVAL_SECONDS > 0 and EXPIRY_WRITE_OFF_TYPE_ID is None:
+        logger.warning("EXPIRY_SCAN_INTERVAL_SECONDS задан без EXPIRY_WRITE_OFF_TYPE_ID, фоновое списание не запущено")
+    elif EXPIRY_SCAN_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_expiry_scanner(async_session, EXPIRY_SCAN_INTERVAL_SECONDS)))
+
     yield
     # Код, выполняемый при завершении приложения
+    # Закрыть потоки событий, иначе сервер будет ждать отключения клиентов
+    order_events.close()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    # Дописать накопленный журнал форм до закрытия соединений
+    await activity_buffer.stop()
     logger.info("Завершение работы приложения")
 
 app = FastAPI(
     title="Flowers DB API",
     description="API для работы с базой данных цветочного магазина",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONDecimalResponse
 )
+# Маршруты самого приложения тоже рендерят Decimal по DECIMAL_MODE
+app.router.route_class = ORJSONDecimalRoute
 
 # Настройка CORS
 app.add_middleware(
@@ -49,24 +82,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие больших ответов (brotli, если доступен, иначе gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+# Профилирование: Server-Timing, число SQL-запросов и время в БД по маршрутам
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Чтения клиента после его записи идут в основную БД, а не в реплику
+app.add_middleware(ReadYourWritesMiddleware, router=read_router)
+
+# Метрики запросов: латентность по маршрутам и запросы в обработке
+app.add_middleware(MetricsMiddleware)
+
 # Подключение роутеров
-# app.include_router(v1.router, prefix="/api/v1")
+app.include_router(v1.router, prefix="/api/v1")
 
 # Проверка соединения с базой данных
 @app.get("/health", tags=["Health"])
-async def health_check(db: AsyncSession = Depends(get_db)):
-    try:
-        # Пробуем выполнить запрос к базе данных
-        await db.execute("SELECT 1")
-        return {"status": "ok", "database": "connected"}
-    except Exception as e:
-        logger.error(f"Ошибка подключения к базе данных: {e}")
-        return {"status": "error", "database": "disconnected", "error": str(e)}
+async def health_check():
+    result = await db_probe.check()
+    status = "ok" if result["database"] == "connected" else "error"
+    if read_probe is not None:
+        # Недоступная реплика не делает сервис нездоровым: чтения уходят в основную БД
+        result = {**result, "replica": await read_probe.check()}
+    return {"status": status, **result}
+
+
+# Готовность принимать трафик: 503, пока БД недоступна
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    result = await db_probe.check()
+    if result["database"] == "connected":
+        return {"status": "ready", **result}
+    return ORJSONDecimalResponse(status_code=503, content={"status": "not ready", **result})
+
+
+# Метрики в формате Prometheus
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 
 async def start_fastapi():
     print("Запуск FastAPI сервера...")
-    config = Config(app=app, host="0.0.0.0", port=8000, log_level="info", reload=True)
+    # Открытые потоки событий (SSE) не закрываются сами, поэтому ожидание при остановке ограничено
+    config = Config(app=app, host="0.0.0.0", port=8000, log_level="info", reload=True, timeout_graceful_shutdown=5)
     server = Server(config)
     return server
 
@@ -0,0 +1,101 @@
+import os
+
+# Модули приложения создают движок при импорте: тестам не нужны ни MSSQL, ни файл базы
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.pop("READ_SQLITE_PATH", None)
+
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator, Optional
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.db_backends import configure_engine
+from src.db.init_db import create_tables_with_sqlalchemy
+from src.db.models import Orders, OrderListItems, Products, ProductCategory, Supplies, SupplyListItems, Warehouse
+from src.db.query_cache import query_cache
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def engine() -> AsyncIterator[AsyncEngine]:
+    """Пустая база в памяти со схемой из моделей (одно соединение на весь тест)"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    configure_engine(engine)
+    await create_tables_with_sqlalchemy(engine)
+    query_cache.clear()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine: AsyncEngine) -> sessionmaker:
+    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+async def db(session_factory: sessionmaker) -> AsyncIterator[AsyncSession]:
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+async def catalog(db: AsyncSession) -> None:
+    """Склады 1–2 и продукты 1–2 категории 1"""
+    db.add_all([
+        Warehouse(id_warehous=1, warehous="Основной"),
+        Warehouse(id_warehous=2, warehous="Холодильник"),
+        ProductCategory(id_product_category=1, product_category="Розы"),
+    ])
+    await db.flush()
+    db.add_all([
+        Products(id_products=1, products_name="Роза красная", id_product_category=1),
+        Products(id_products=2, products_name="Роза белая", id_product_category=1),
+    ])
+    await db.commit()
+
+
+@pytest.fixture
+def add_lot(db: AsyncSession, catalog: None):
+    """Создать поставку с одной партией; возвращает id партии"""
+    async def add_lot(
+        supp_date: date, amount: int, product_id: int = 1, warehouse_id: int = 1, price: Decimal = Decimal("10")
+    ) -> int:
+        supply = Supplies(supp_date=supp_date)
+        db.add(supply)
+        await db.flush()
+        lot = SupplyListItems(
+            id_supplies=supply.id_supplies, id_products=product_id, id_warehous=warehouse_id,
+            amount=amount, price=price,
+        )
+        db.add(lot)
+        await db.commit()
+        return lot.id_supply_list_items
+
+    return add_lot
+
+
+@pytest.fixture
+def add_order(db: AsyncSession):
+    """Создать заказ, при lot_id — с одной позицией из этой партии; возвращает id заказа"""
+    async def add_order(order_date: date, lot_id: Optional[int] = None, amount: int = 0) -> int:
+        order = Orders(order_date=order_date)
+        db.add(order)
+        await db.flush()
+        if lot_id is not None:
+            db.add(OrderListItems(
+                id_orders=order.id_orders, id_supply_list_items=lot_id, amount=amount,
+                price_with_discount=Decimal("10"),
+            ))
+        await db.commit()
+        return order.id_orders
+
+    return add_order
@@ -0,0 +1,86 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from src.db.allocation import FifoAllocator, InsufficientStockError, LotHeap
+from src.db.models import OrderListItems, SupplyListItems
+
+pytestmark = pytest.mark.anyio
+
+
+def test_lot_heap_takes_oldest_lots_first():
+    heap = LotHeap([(date(2025, 3, 1), 3, 5), (date(2025, 1, 1), 1, 2), (date(2025, 2, 1), 2, 4)])
+
+    assert heap.take(5) == [(1, 2, date(2025, 1, 1)), (2, 3, date(2025, 2, 1))]
+    assert heap.available == 6
+    assert heap.remaining == {2: 1, 3: 5}
+
+
+def test_lot_heap_leaves_heap_intact_when_short():
+    heap = LotHeap([(date(2025, 1, 1), 1, 2)])
+
+    assert heap.take(3) == []
+    assert heap.available == 2
+
+
+async def test_allocate_splits_line_across_lots_by_supply_date(db, add_lot, add_order):
+    newest = await add_lot(date(2025, 3, 1), 10)
+    oldest = await add_lot(date(2025, 1, 1), 4)
+    sold_out = await add_lot(date(2024, 12, 1), 3)
+    await add_order(date(2025, 1, 5), sold_out, 3)
+    order_id = await add_order(date(2025, 4, 1))
+
+    rows = await FifoAllocator().allocate(db, order_id, [
+        {"id_products": 1, "id_warehous": 1, "amount": 6, "price_with_discount": None},
+    ])
+
+    assert [(row["id_supply_list_items"], row["amount"]) for row in rows] == [(oldest, 4), (newest, 2)]
+    written = (await db.execute(
+        select(OrderListItems.id_supply_list_items, OrderListItems.amount)
+        .where(OrderListItems.id_orders == order_id).order_by(OrderListItems.id_order_list_items)
+    )).all()
+    assert written == [(oldest, 4), (newest, 2)]
+
+
+async def test_allocate_keeps_warehouses_apart(db, add_lot, add_order):
+    await add_lot(date(2025, 1, 1), 5, warehouse_id=1)
+    other = await add_lot(date(2025, 2, 1), 5, warehouse_id=2)
+    order_id = await add_order(date(2025, 4, 1))
+
+    rows = await FifoAllocator().allocate(db, order_id, [
+        {"id_products": 1, "id_warehous": 2, "amount": 3, "price_with_discount": None},
+    ])
+
+    assert [(row["id_supply_list_items"], row["amount"]) for row in rows] == [(other, 3)]
+
+
+async def test_allocate_writes_nothing_when_any_line_is_short(db, add_lot, add_order):
+    await add_lot(date(2025, 1, 1), 5, product_id=1)
+    await add_lot(date(2025, 1, 1), 1, product_id=2)
+    order_id = await add_order(date(2025, 4, 1))
+    allocator = FifoAllocator()
+
+    with pytest.raises(InsufficientStockError) as error:
+        await allocator.allocate(db, order_id, [
+            {"id_products": 1, "id_warehous": 1, "amount": 2, "price_with_discount": None},
+            {"id_products": 2, "id_warehous": 1, "amount": 2, "price_with_discount": None},
+        ])
+
+    assert (error.value.requested, error.value.available) == (2, 1)
+    assert (await db.execute(select(OrderListItems))).first() is None
+    # Частично взятое по первой позиции вернулось в кэш
+    assert await allocator.available(db, 1, 1) == 5
+
+
+async def test_allocate_bumps_versions_of_consumed_lots(db, add_lot, add_order):
+    used = await add_lot(date(2025, 1, 1), 5)
+    untouched = await add_lot(date(2025, 2, 1), 5)
+    order_id = await add_order(date(2025, 4, 1))
+
+    await FifoAllocator().allocate(db, order_id, [
+        {"id_products": 1, "id_warehous": 1, "amount": 5, "price_with_discount": None},
+    ])
+
+    versions = dict((await db.execute(select(SupplyListItems.id_supply_list_items, SupplyListItems.version))).all())
+    assert versions == {used: 2, untouched: 1}
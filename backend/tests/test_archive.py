@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from src.db.archive import ArchiveCatalog, ArchiveMover, archive_table
+from src.db.models import ArchivePeriod, Orders, Supplies, SupplyListItems
+
+pytestmark = pytest.mark.anyio
+
+# keep_years=1: на эту дату последний закрытый год — 2022
+TODAY = date(2024, 6, 1)
+
+
+@pytest.fixture
+async def history(add_lot, add_order):
+    """
+    Документы 2022 года и что из них можно перенести:
+    closed_lot продан целиком заказом closed_order — переносятся оба (и поставка);
+    open_lot не распродан — остаётся вместе с заказом open_order;
+    late_lot распродан заказом 2023 года — остаются оба;
+    empty_order без позиций — переносится.
+    Документы 2024 года — самые новые строки таблиц, они в любом случае остаются.
+    """
+    ids = {}
+    ids["closed_lot"] = await add_lot(date(2022, 3, 1), 5)
+    ids["closed_order"] = await add_order(date(2022, 4, 1), ids["closed_lot"], 5)
+    ids["open_lot"] = await add_lot(date(2022, 5, 1), 5)
+    ids["open_order"] = await add_order(date(2022, 6, 1), ids["open_lot"], 2)
+    ids["late_lot"] = await add_lot(date(2022, 7, 1), 4)
+    ids["late_order"] = await add_order(date(2023, 2, 1), ids["late_lot"], 4)
+    ids["empty_order"] = await add_order(date(2022, 8, 1))
+    ids["new_lot"] = await add_lot(date(2024, 1, 10), 10)
+    ids["new_order"] = await add_order(date(2024, 2, 1), ids["new_lot"], 1)
+    return ids
+
+
+def moved(result):
+    return result["orders"], result["lots"], result["supplies"]
+
+
+async def test_dry_run_counts_without_moving(db, history):
+    result = await ArchiveMover(keep_years=1).run(db, today=TODAY, dry_run=True)
+
+    assert moved(result) == (2, 1, 1)
+    assert (await db.execute(select(func.count()).select_from(Orders))).scalar() == 5
+    assert (await db.execute(select(ArchivePeriod))).first() is None
+
+
+async def test_run_moves_closed_documents_and_keeps_them_readable(db, history):
+    result = await ArchiveMover(keep_years=1, batch_size=2).run(db, today=TODAY)
+
+    assert moved(result) == (2, 1, 1)
+    hot_orders = set((await db.execute(select(Orders.id_orders))).scalars())
+    assert hot_orders == {history[name] for name in ("open_order", "late_order", "new_order")}
+    archived_orders = set((await db.execute(select(archive_table(Orders, 2022).c.id_orders))).scalars())
+    assert archived_orders == {history["closed_order"], history["empty_order"]}
+    assert (await db.execute(select(archive_table(SupplyListItems, 2022).c.id_supply_list_items))).scalars().all() \
+        == [history["closed_lot"]]
+    assert (await db.execute(select(func.count()).select_from(Supplies))).scalar() == 3
+
+    period = (await db.execute(select(ArchivePeriod))).scalar_one()
+    assert (period.status, period.cursor_phase, period.cursor_id) == ("done", None, None)
+    assert (period.moved_orders, period.moved_lots, period.moved_supplies) == (2, 1, 1)
+
+    # Запрос за все годы читает оперативную таблицу вместе с архивом
+    orders = await ArchiveCatalog().entity(db, Orders, all_years=True)
+    assert (await db.execute(select(func.count()).select_from(orders))).scalar() == 5
+
+
+async def test_second_run_has_nothing_to_move(db, history):
+    mover = ArchiveMover(keep_years=1)
+    await mover.run(db, today=TODAY)
+
+    assert moved(await mover.run(db, today=TODAY)) == (0, 0, 0)
+
+
+async def test_run_resumes_from_saved_cursor(db, history):
+    # Прерванный перенос уже прошёл заказы до closed_order включительно
+    db.add(ArchivePeriod(year=2022, status="running", cursor_phase="orders", cursor_id=history["closed_order"]))
+    await db.commit()
+
+    result = await ArchiveMover(keep_years=1, batch_size=1).run(db, year=2022, today=TODAY)
+
+    # Группа closed_order не проходится повторно; empty_order идёт после курсора
+    assert moved(result) == (1, 0, 0)
+    assert (await db.execute(select(archive_table(Orders, 2022).c.id_orders))).scalars().all() \
+        == [history["empty_order"]]
+
+
+async def test_groups_above_the_size_limit_stay(db, history):
+    result = await ArchiveMover(keep_years=1, batch_size=1, max_group_size=1).run(db, today=TODAY, dry_run=True)
+
+    # Пачка из closed_order тянет за собой closed_lot — два документа больше лимита
+    assert moved(result) == (1, 0, 0)
+
+
+async def test_open_year_is_rejected(db):
+    with pytest.raises(ValueError):
+        await ArchiveMover(keep_years=1).run(db, year=2023, today=TODAY)
@@ -0,0 +1,99 @@
+import io
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from src.db.bulk_import import REFERENCES, BulkImporter, reference_maps
+from src.db.models import PriseList, Products, Supplier, Supplies, SupplyListItems
+from src.db.table_versions import table_versions
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def references(db, catalog):
+    db.add(Supplier(id_supplier=1, supplier_org_name="ООО Цветы"))
+    await db.commit()
+    # Справочники импорта держатся в памяти между загрузками — в новой базе их нужно перечитать
+    table_versions.bump(*REFERENCES)
+
+
+def csv_file(*lines: str) -> io.BytesIO:
+    return io.BytesIO("\n".join(lines).encode("utf-8"))
+
+
+async def count(db, model) -> int:
+    return (await db.execute(select(func.count()).select_from(model))).scalar()
+
+
+async def test_price_list_is_written_in_chunks_and_bad_rows_reported(db, references):
+    file = csv_file(
+        "products_name;prise_;date_of_change",
+        "Роза красная;120,50;01.03.2025",
+        "Роза белая;95;2025-03-01",
+        "Роза синяя;100;2025-03-01",
+        "Роза красная;дорого;2025-03-01",
+        "роза белая;1 000,00;",
+    )
+
+    report = await BulkImporter(chunk_rows=2).import_price_list(db, file)
+
+    assert (report["rows"], report["imported"], report["rejected"]) == (5, 3, 2)
+    assert [(error["row"], error["column"]) for error in report["errors"]] == [(4, "products_name"), (5, "prise_")]
+    prices = (await db.execute(
+        select(PriseList.id_products, PriseList.prise_).order_by(PriseList.id_prise_list)
+    )).all()
+    assert prices == [(1, Decimal("120.5")), (2, Decimal("95")), (2, Decimal("1000"))]
+
+
+async def test_dry_run_only_validates(db, references):
+    file = csv_file("id_products,prise_", "1,10", "2,20")
+
+    report = await BulkImporter().import_price_list(db, file, dry_run=True)
+
+    assert (report["dry_run"], report["imported"]) == (True, 2)
+    assert await count(db, PriseList) == 0
+
+
+async def test_supply_rows_split_across_chunks_join_one_supply(db, references):
+    lines = (
+        "doc_num,supp_date,id_supplier,id_products,id_warehous,amount,price",
+        "П-1,2025-03-01,1,1,1,10,50",
+        "П-1,2025-03-01,1,2,1,5,40",
+        "П-1,2025-03-01,1,1,2,7,50",
+        "П-2,2025-03-02,1,1,1,0,50",
+    )
+
+    report = await BulkImporter(chunk_rows=2).import_supplies(db, csv_file(*lines))
+
+    assert (report["imported"], report["rejected"], report["supplies"]) == (3, 1, 1)
+    assert report["errors"][0]["column"] == "amount"
+    assert await count(db, Supplies) == 1
+    items = (await db.execute(select(SupplyListItems.id_supplies, SupplyListItems.amount))).all()
+    assert sorted(amount for _, amount in items) == [5, 7, 10]
+    assert len({supply_id for supply_id, _ in items}) == 1
+
+    # Повторная загрузка того же файла поставки не дублирует
+    again = await BulkImporter(chunk_rows=2).import_supplies(db, csv_file(*lines))
+    assert (again["imported"], again["rejected"], again["supplies"]) == (0, 4, 0)
+    assert await count(db, SupplyListItems) == 3
+
+
+async def test_failed_chunk_keeps_earlier_chunks_and_reports(db, references):
+    await reference_maps.refresh(db, ["products"])
+    # Продукт удалён в обход DBService: справочник импорта о нём не знает, и запись пачки упадёт на внешнем ключе
+    await db.execute(delete(Products).where(Products.id_products == 2))
+    await db.commit()
+    file = csv_file("id_products,prise_", "1,10", "1,11", "2,20", "1,12")
+
+    report = await BulkImporter(chunk_rows=2).import_price_list(db, file)
+
+    assert report["imported"] == 2
+    assert report["aborted"].startswith("Ошибка записи строк 4–5")
+    assert await count(db, PriseList) == 2
+
+
+async def test_missing_required_column_is_rejected(db, references):
+    with pytest.raises(ValueError, match="prise_"):
+        await BulkImporter().import_price_list(db, csv_file("id_products,price", "1,10"))
@@ -0,0 +1,94 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select, update
+
+from src.db.allocation import retry_on_conflict
+from src.db.db_service import VersionConflictError, orders_service
+from src.db.models import OrderListItems, Orders, SupplyListItems
+from src.db.order_placement import OrderPlacement
+
+pytestmark = pytest.mark.anyio
+
+LINE = {"id_products": 1, "id_warehous": 1, "amount": 2, "price_with_discount": None}
+
+
+async def bump_version(session_factory, lot_id: int) -> None:
+    """Изменить партию из другой сессии, как это сделал бы параллельный заказ"""
+    async with session_factory() as other:
+        await other.execute(
+            update(SupplyListItems).where(SupplyListItems.id_supply_list_items == lot_id)
+            .values(version=SupplyListItems.version + 1)
+        )
+        await other.commit()
+
+
+def interfere(placement: OrderPlacement, session_factory, lot_id: int, times: int) -> None:
+    """Менять версию партии сразу после того, как OrderPlacement её прочитал, первые times попыток"""
+    read_lots = placement._read_lots
+    attempts = {"left": times}
+
+    async def read_then_interfere(db, keys):
+        result = await read_lots(db, keys)
+        if attempts["left"] > 0:
+            attempts["left"] -= 1
+            await bump_version(session_factory, lot_id)
+        return result
+
+    placement._read_lots = read_then_interfere
+
+
+async def test_update_with_stale_version_raises_conflict(db, add_order):
+    order_id = await add_order(date(2025, 1, 1))
+    await orders_service.update(db, order_id, {"comments": "первая правка"}, expected_version=1)
+
+    with pytest.raises(VersionConflictError) as error:
+        await orders_service.update(db, order_id, {"comments": "вторая правка"}, expected_version=1)
+
+    assert (error.value.expected, error.value.actual) == (1, 2)
+    assert (await db.execute(select(Orders.comments))).scalar() == "первая правка"
+
+
+async def test_place_retries_after_version_conflict(db, session_factory, add_lot):
+    lot_id = await add_lot(date(2025, 1, 1), 5)
+    placement = OrderPlacement(max_retries=3, backoff_ms=0)
+    interfere(placement, session_factory, lot_id, times=1)
+
+    order, items = await placement.place(db, {"order_date": date(2025, 2, 1)}, [dict(LINE)])
+
+    assert [(item["id_supply_list_items"], item["amount"]) for item in items] == [(lot_id, 2)]
+    # Версия выросла от чужой правки и от самого заказа
+    assert (await db.execute(select(SupplyListItems.version))).scalar() == 3
+    assert (await db.execute(select(func.count()).select_from(Orders))).scalar() == 1
+
+
+async def test_place_gives_up_after_max_retries_without_writing(db, session_factory, add_lot):
+    lot_id = await add_lot(date(2025, 1, 1), 5)
+    placement = OrderPlacement(max_retries=2, backoff_ms=0)
+    interfere(placement, session_factory, lot_id, times=3)
+
+    with pytest.raises(VersionConflictError):
+        await placement.place(db, {"order_date": date(2025, 2, 1)}, [dict(LINE)])
+
+    assert (await db.execute(select(func.count()).select_from(Orders))).scalar() == 0
+    assert (await db.execute(select(func.count()).select_from(OrderListItems))).scalar() == 0
+
+
+async def test_retry_on_conflict_releases_locks_between_attempts():
+    lock = asyncio.Lock()
+    conflicts = []
+    calls = {"count": 0}
+
+    async def attempt() -> str:
+        assert lock.locked()
+        calls["count"] += 1
+        if calls["count"] < 3:
+            raise VersionConflictError("orders", 1, 1, 2)
+        return "готово"
+
+    result = await retry_on_conflict(attempt, max_retries=3, backoff=0, locks=[lock], on_conflict=conflicts.append)
+
+    assert result == "готово"
+    assert len(conflicts) == 2
+    assert not lock.locked()
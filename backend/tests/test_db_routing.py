@@ -0,0 +1,100 @@
+from typing import AsyncIterator
+
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from src.core.db_routing import ReadRouter, ReadYourWritesMiddleware
+from src.core.health import DatabaseProbe
+from src.db.init_db import create_tables_with_sqlalchemy
+from src.db.models import Warehouse
+from src.db.table_versions import table_versions
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def replica_engine() -> AsyncIterator[AsyncEngine]:
+    """Реплика — отдельная база в памяти, отличить её можно по данным"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    await create_tables_with_sqlalchemy(engine)
+    async with engine.begin() as conn:
+        await conn.execute(Warehouse.__table__.insert().values(id_warehous=1, warehous="реплика"))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def router(session_factory, replica_engine) -> ReadRouter:
+    replica = sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    return ReadRouter(session_factory, replica, DatabaseProbe(replica_engine, ttl=0), read_after_write=60)
+
+
+async def read_from(router: ReadRouter, key: str, tables=()) -> str:
+    async for session in router.session(key, tables):
+        name = (await session.execute(select(Warehouse.warehous).where(Warehouse.id_warehous == 1))).scalar()
+        return "replica" if name == "реплика" else "primary"
+
+
+async def test_without_replica_reads_go_to_primary(session_factory):
+    router = ReadRouter(session_factory)
+
+    assert not router.enabled
+    assert await router.choose("client") == "primary"
+
+
+async def test_reads_go_to_replica(router, catalog):
+    assert await read_from(router, "client") == "replica"
+
+
+async def test_client_reads_own_writes_from_primary(router, catalog):
+    router.record_write("writer")
+
+    assert await read_from(router, "writer") == "primary"
+    assert await read_from(router, "reader") == "replica"
+
+
+async def test_recently_changed_tables_are_read_from_primary(router, catalog):
+    table_versions.bump("warehouse")
+
+    assert await read_from(router, "client", ["warehouse"]) == "primary"
+    assert await read_from(router, "client", ["district"]) == "replica"
+
+
+async def test_unreachable_replica_is_skipped(session_factory, catalog):
+    broken = create_async_engine("sqlite+aiosqlite:////nonexistent/replica.sqlite3")
+    replica = sessionmaker(broken, class_=AsyncSession)
+    router = ReadRouter(session_factory, replica, DatabaseProbe(broken, ttl=0))
+
+    assert await read_from(router, "client") == "primary"
+    await broken.dispose()
+
+
+async def test_connection_error_on_replica_switches_reads_to_primary(router, catalog):
+    sessions = router.session("client")
+    await sessions.__anext__()
+    with pytest.raises(OperationalError):
+        await sessions.athrow(OperationalError("SELECT 1", {}, Exception("connection lost")))
+
+    assert await read_from(router, "client") == "primary"
+
+
+async def test_middleware_records_writes_by_client_header(router):
+    async def endpoint(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/", endpoint, methods=["GET", "POST"])])
+    transport = httpx.ASGITransport(app=ReadYourWritesMiddleware(app, router))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/", headers={"x-client-id": "reader"})
+        await client.post("/", headers={"x-client-id": "writer"})
+
+    assert router.wrote_recently("writer")
+    assert not router.wrote_recently("reader")
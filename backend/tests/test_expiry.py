@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from src.db.expiry import ExpiryScanner
+from src.db.models import SupplyListItems, WriteOffsList, WriteOffsType
+
+pytestmark = pytest.mark.anyio
+
+TODAY = date(2025, 3, 31)
+
+
+@pytest.fixture
+async def write_off_type(db, catalog) -> int:
+    db.add(WriteOffsType(id_write_offs_type=1, write_offs_type="Просрочка"))
+    await db.commit()
+    return 1
+
+
+def scanner(**kwargs) -> ExpiryScanner:
+    options = {"shelf_life_days": 10, "shelf_life_by_category": {}, "lookback_days": 30, "write_off_type_id": 1}
+    options.update(kwargs)
+    return ExpiryScanner(**options)
+
+
+async def test_find_expired_takes_open_lots_inside_the_window(db, add_lot, add_order):
+    expired = await add_lot(date(2025, 3, 10), 5)
+    await add_lot(date(2025, 3, 25), 5)                     # срок ещё не истёк
+    await add_lot(date(2025, 1, 10), 5)                     # истёк раньше окна lookback_days
+    sold_out = await add_lot(date(2025, 3, 5), 2)
+    await add_order(date(2025, 3, 6), sold_out, 2)
+    partly_sold = await add_lot(date(2025, 3, 1), 4)
+    await add_order(date(2025, 3, 2), partly_sold, 1)
+
+    found = await scanner().find_expired(db, TODAY)
+
+    assert {lot["id_supply_list_items"]: lot["remaining"] for lot in found} == {expired: 5, partly_sold: 3}
+
+
+async def test_find_expired_uses_category_shelf_life(db, add_lot):
+    lot_id = await add_lot(date(2025, 3, 25), 5)
+
+    assert await scanner().find_expired(db, TODAY) == []
+    found = await scanner(shelf_life_by_category={1: 3}).find_expired(db, TODAY)
+    assert [lot["id_supply_list_items"] for lot in found] == [lot_id]
+
+
+async def test_scan_writes_off_in_batches_and_bumps_versions(db, add_lot, write_off_type):
+    lot_ids = [await add_lot(date(2025, 3, day), 2) for day in (1, 2, 3)]
+
+    result = await scanner(batch_size=2).scan(db, TODAY)
+
+    assert (result["dry_run"], result["lots"], result["amount"]) == (False, 3, 6)
+    written = dict((await db.execute(
+        select(WriteOffsList.id_supply_list_items, WriteOffsList.amount)
+    )).all())
+    assert written == {lot_id: 2 for lot_id in lot_ids}
+    versions = (await db.execute(select(SupplyListItems.version))).scalars().all()
+    assert versions == [2, 2, 2]
+    # Списанные партии больше не находятся
+    assert (await scanner().scan(db, TODAY))["lots"] == 0
+
+
+async def test_scan_without_write_off_type_is_dry_run(db, add_lot):
+    await add_lot(date(2025, 3, 1), 2)
+
+    result = await scanner(write_off_type_id=None).scan(db, TODAY)
+
+    assert (result["dry_run"], result["lots"]) == (True, 1)
+    assert (await db.execute(select(func.count()).select_from(WriteOffsList))).scalar() == 0
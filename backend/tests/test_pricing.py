@@ -0,0 +1,99 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from src.db.models import (
+    CustomerType, Discounts, DiscountType, EventType, PriseList, ProductCategory, Products,
+)
+from src.db.pricing import PriceNotFoundError, PricingEngine
+from src.db.table_versions import table_versions
+
+pytestmark = pytest.mark.anyio
+
+ON_DATE = date(2025, 3, 8)
+PERCENT, FIXED = 1, 2
+
+
+@pytest.fixture
+async def discounts(db, catalog):
+    """Цены: продукт 1 (категория 1) — 100, продукт 3 (категория 2) — 50; набор скидок по id"""
+    db.add_all([
+        ProductCategory(id_product_category=2, product_category="Тюльпаны"),
+        DiscountType(id_discount_type=PERCENT, discount_type="Процент"),
+        DiscountType(id_discount_type=FIXED, discount_type="Сумма"),
+        EventType(id_event_type=1, event_type="8 марта"),
+        CustomerType(id_customer_type=2, customer_type="Оптовый"),
+    ])
+    await db.flush()
+    db.add(Products(id_products=3, products_name="Тюльпан жёлтый", id_product_category=2))
+    await db.flush()
+    db.add_all([
+        PriseList(id_products=1, prise_=Decimal("100"), date_of_change=date(2025, 1, 1)),
+        PriseList(id_products=3, prise_=Decimal("50"), date_of_change=date(2025, 1, 1)),
+        Discounts(id_discounts=1, discount=Decimal("10"), id_discount_type=PERCENT),
+        Discounts(id_discounts=2, discount=Decimal("15"), id_discount_type=PERCENT, id_product_category=1,
+                  date_from=date(2025, 3, 1), date_to=date(2025, 3, 31)),
+        Discounts(id_discounts=3, discount=Decimal("30"), id_discount_type=PERCENT, id_product_category=1,
+                  date_to=date(2025, 2, 28)),
+        Discounts(id_discounts=4, discount=Decimal("20"), id_discount_type=FIXED, id_customer_type=2),
+        Discounts(id_discounts=5, discount=Decimal("50"), id_discount_type=PERCENT, id_event_type=1),
+    ])
+    await db.commit()
+    table_versions.bump("discounts", "prise_list")
+
+
+def applied(quote):
+    return [(item["id_products"], item["id_discounts"], item["price_with_discount"]) for item in quote["items"]]
+
+
+LINES = [{"id_products": 1, "amount": 1}, {"id_products": 3, "amount": 2}]
+
+
+async def test_quote_takes_best_active_discount_per_category(db, discounts):
+    quote = await PricingEngine().quote(db, LINES, on_date=ON_DATE)
+
+    # Категория 1: 15% вместо 10% на всё; просроченная 30% не действует
+    assert applied(quote) == [(1, 2, Decimal("85.00")), (3, 1, Decimal("45.00"))]
+    assert quote["total"] == Decimal("175.00")
+
+
+async def test_quote_compares_fixed_and_percent_discounts(db, discounts):
+    quote = await PricingEngine().quote(db, LINES, customer_type=2, on_date=ON_DATE)
+
+    assert applied(quote) == [(1, 4, Decimal("80.00")), (3, 4, Decimal("30.00"))]
+
+
+async def test_event_discount_applies_only_with_its_event(db, discounts):
+    engine = PricingEngine()
+
+    with_event = await engine.quote(db, LINES, event_type=1, on_date=ON_DATE)
+    without_event = await engine.quote(db, LINES, on_date=ON_DATE)
+
+    assert [item["id_discounts"] for item in with_event["items"]] == [5, 5]
+    assert [item["id_discounts"] for item in without_event["items"]] == [2, 1]
+
+
+async def test_quote_order_keeps_the_single_most_profitable_discount(db, discounts):
+    quote = await PricingEngine().quote_order(db, LINES, on_date=ON_DATE)
+
+    # 15% на розу (15) выгоднее 10% на тюльпаны (2 × 5): заказ получает одну скидку 2
+    assert quote["id_discounts"] == 2
+    assert applied(quote) == [(1, 2, Decimal("85.00")), (3, None, Decimal("50.00"))]
+
+
+async def test_changed_rules_are_picked_up(db, discounts):
+    engine = PricingEngine()
+    await engine.quote(db, LINES, on_date=ON_DATE)
+
+    db.add(Discounts(id_discounts=6, discount=Decimal("40"), id_discount_type=PERCENT))
+    await db.commit()
+    table_versions.bump("discounts")
+
+    quote = await engine.quote(db, LINES, on_date=ON_DATE)
+    assert [item["id_discounts"] for item in quote["items"]] == [6, 6]
+
+
+async def test_quote_without_price_raises(db, discounts):
+    with pytest.raises(PriceNotFoundError):
+        await PricingEngine().quote(db, [{"id_products": 2, "amount": 1}], on_date=ON_DATE)
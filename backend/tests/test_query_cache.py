@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, insert, select
+
+from src.db.db_service import warehouse_service
+from src.db.models import Products, PriseList, Warehouse
+from src.db.query_cache import QueryCache, statement_tables
+from src.db.table_versions import table_versions
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def cache() -> QueryCache:
+    return QueryCache(max_bytes=1024 * 1024, ttl_seconds=60, enabled=True)
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL, дошедшие до БД"""
+    executed = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: executed.append(statement))
+    return executed
+
+
+async def names(cache: QueryCache, db) -> list:
+    query = select(Warehouse.warehous).order_by(Warehouse.id_warehous)
+    return (await cache.execute(db, query)).scalars().all()
+
+
+async def test_repeated_query_is_served_from_cache(db, cache, catalog, statements):
+    first = await names(cache, db)
+    executed = len(statements)
+
+    assert await names(cache, db) == first
+    assert len(statements) == executed
+
+
+async def test_write_through_service_invalidates_entry(db, cache, catalog):
+    assert await names(cache, db) == ["Основной", "Холодильник"]
+
+    # Запись в обход DBService версию таблицы не меняет — кэш её не видит
+    await db.execute(insert(Warehouse).values(id_warehous=3, warehous="Витрина"))
+    await db.commit()
+    assert await names(cache, db) == ["Основной", "Холодильник"]
+
+    await warehouse_service.create(db, {"id_warehous": 4, "warehous": "Склад у метро"})
+    assert await names(cache, db) == ["Основной", "Холодильник", "Витрина", "Склад у метро"]
+
+
+async def test_subquery_tables_take_part_in_invalidation(db, cache, catalog):
+    priced = select(PriseList.id_products).scalar_subquery()
+    query = select(Products.id_products).where(Products.id_products.in_(priced))
+    assert statement_tables(query) == ("prise_list", "products")
+
+    assert (await cache.execute(db, query)).scalars().all() == []
+    await db.execute(insert(PriseList).values(id_products=1, prise_=10))
+    await db.commit()
+    table_versions.bump("prise_list")
+
+    assert (await cache.execute(db, query)).scalars().all() == [1]
+
+
+async def test_parameters_are_part_of_the_key(db, cache, catalog):
+    query = select(Warehouse.warehous).where(Warehouse.id_warehous == 1)
+
+    assert (await cache.execute(db, query)).scalar() == "Основной"
+    assert (await cache.execute(db, query, {"id_warehous_1": 2})).scalar() == "Холодильник"
+    assert len(cache) == 2
+
+
+async def test_least_recently_used_entries_are_evicted(db, catalog, statements):
+    # Запросы с одинаковым результатом (и объёмом записи), но разными ключами
+    queries = [
+        select(Warehouse.warehous).where(Warehouse.id_warehous == 1, Warehouse.id_warehous < bound)
+        for bound in range(10, 15)
+    ]
+    probe = QueryCache(enabled=True)
+    await probe.execute(db, queries[0])
+    # Бюджет на четыре записи: больше одна запись занимать не может
+    cache = QueryCache(max_bytes=probe.size * 4, ttl_seconds=60, enabled=True)
+    for query in queries[:4]:
+        await cache.execute(db, query)
+    await cache.execute(db, queries[0])
+
+    await cache.execute(db, queries[4])
+
+    assert len(cache) == 4
+    executed = len(statements)
+    await cache.execute(db, queries[0])
+    assert len(statements) == executed
+    await cache.execute(db, queries[1])
+    assert len(statements) == executed + 1
+
+
+async def test_concurrent_misses_share_one_query(session_factory, cache, catalog, statements):
+    query = select(Warehouse.warehous).order_by(Warehouse.id_warehous)
+    executed = len(statements)
+
+    async def run():
+        async with session_factory() as db:
+            return (await cache.execute(db, query)).scalars().all()
+
+    first, second = await asyncio.gather(run(), run())
+
+    assert first == second == ["Основной", "Холодильник"]
+    assert len(statements) == executed + 1
+
+
+async def test_orm_entities_are_merged_into_the_callers_session(session_factory, cache, catalog):
+    query = select(Warehouse).where(Warehouse.id_warehous == 1)
+    async with session_factory() as first:
+        await cache.execute(first, query)
+
+    async with session_factory() as second:
+        warehouse = (await cache.execute(second, query)).scalar_one()
+        assert warehouse in second
+        assert warehouse.warehous == "Основной"